@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import sys
+import logging
+import argparse
+
+import src.config as cfg
+from src.log_handlers import QueueLogging
+from src.formatters import ReportFormat
+from src.utils import ComparisonMode
+from src.batch import BatchReports, parse_month, parse_month_pair, get_range_month_pairs
+
+
+logger = logging.getLogger(cfg.LOGGER_NAME)
+
+
+def parse_args(args: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Generate the month reports into files, the data is loaded once and the reports are computed '
+                    'by a pool of worker processes.'
+    )
+    months = parser.add_mutually_exclusive_group(required=True)
+    months.add_argument('--pairs', nargs='+', type=parse_month_pair, metavar='FIRST:SECOND',
+                        help='The months of the reports, e.g. 2020-06:2020-05')
+    months.add_argument('--range', nargs=2, type=parse_month, metavar=('FIRST', 'LAST'),
+                        help='Every month of the range compared with the month given by --mode, e.g. 2020-02 2020-12')
+
+    parser.add_argument('--mode', choices=[ComparisonMode.PREVIOUS_MONTH, ComparisonMode.PREVIOUS_YEAR],
+                        default=ComparisonMode.PREVIOUS_MONTH, help='The comparison of the months of --range')
+    parser.add_argument('--output', required=True, help='The folder of the report files')
+    parser.add_argument('--format', choices=list(ReportFormat.MEDIA_TYPES), default=ReportFormat.CSV)
+    parser.add_argument('--engine', help='The report engine, APP_REPORT_ENGINE by default')
+    parser.add_argument('--workers', type=int, help='The number of worker processes, APP_BATCH_WORKERS by default')
+
+    return parser.parse_args(args)
+
+
+def main(args: list[str] = None) -> int:
+    args = parse_args(args)
+
+    month_pairs = args.pairs or get_range_month_pairs(*args.range, mode=args.mode)
+
+    try:
+        stats = BatchReports.run(month_pairs, args.output, args.format, args.engine, args.workers)
+    except Exception:
+        logger.exception('Batch failed')
+        return 1
+    finally:
+        QueueLogging.stop()
+
+    print(f'Generated {stats} into {args.output}')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import os
+import time
+import logging
+import multiprocessing
+import multiprocessing.util
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import src.config as cfg
+from src.log_handlers import QueueLogging
+from src.utils import ComparisonMode, add_months
+from src.formatters import ReportFormat, get_report_formatter
+from src.data_adapters import DataLoader, SQLEngine, ACCOUNTS_FILE, TRANSACTIONS_FILE
+from src.engines import ReportEngines
+
+
+logger = logging.getLogger(cfg.LOGGER_NAME)
+
+
+class BatchStats:
+    """
+    Counters and throughput of a batch of reports.
+    """
+    def __init__(self):
+        self.reports: int = 0
+        self.bytes: int = 0
+        self._started_at: float = time.perf_counter()
+        self.seconds: float = 0
+
+    def add(self, reports: int, written_bytes: int) -> None:
+        self.reports += reports
+        self.bytes += written_bytes
+        self.seconds = time.perf_counter() - self._started_at
+
+    def reports_per_second(self) -> float:
+        return self.reports / self.seconds if self.seconds > 0 else 0
+
+    def __str__(self):
+        return (f'{self.reports} reports ({self.bytes / 1024 / 1024:.1f} MB) in {self.seconds:.2f}s, '
+                f'{self.reports_per_second():.0f} reports/s')
+
+
+class BatchReports:
+    """
+    Offline generation of the month reports into files, without the HTTP service.
+
+    The data is loaded once in the parent process, then the workers are forked from it and share the loaded
+    pages copy-on-write, as the workers of the production server do. The month pairs are split into chunks,
+    a worker computes the reports of a chunk with the controller of the report engine and the finance report
+    formatter, then writes them all to the output folder at once.
+    """
+    WORKERS: int = cfg.BATCH_WORKERS
+    CHUNK_PAIRS: int = cfg.BATCH_CHUNK_PAIRS
+
+    @classmethod
+    def run(cls,
+            month_pairs: list[tuple[date, date]],
+            output_folder: str,
+            report_format: str = ReportFormat.CSV,
+            engine: str | None = None,
+            workers: int = None) -> BatchStats:
+        """
+        Generate the reports of the month pairs, a file per pair: report_<first month>_<second month>.<format>.
+
+        Parameters:
+        - month_pairs (list[tuple[date, date]]): The first and the second month of every report.
+        - output_folder (str): The folder of the report files, created if missing.
+        - report_format (str): The output format, one of the ReportFormat values.
+        - engine (str | None): One of the ReportEngines names, the configured engine by default.
+        - workers (int): The number of the worker processes, WORKERS by default, 1 computes in this process.
+
+        Returns:
+        - BatchStats: The counters and the throughput.
+        """
+        # Fail before loading the data
+        get_report_formatter(report_format)
+        workers = workers or cls.WORKERS
+
+        os.makedirs(output_folder, exist_ok=True)
+
+        DataLoader.load(engine=SQLEngine, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+        # The auto engine measured by the load is resolved once, before the fork
+        engine = ReportEngines.get(engine).name
+
+        chunks = [month_pairs[i:i + cls.CHUNK_PAIRS] for i in range(0, len(month_pairs), cls.CHUNK_PAIRS)]
+
+        logger.info(f'Generating {len(month_pairs)} reports in {len(chunks)} chunks with {workers} workers')
+
+        stats = BatchStats()
+
+        if workers == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                stats.add(*_generate_reports(chunk, output_folder, report_format, engine))
+                logger.info(f'Batch progress: {stats}')
+            return stats
+
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                                       initializer=_init_worker)
+
+        try:
+            futures = [
+                executor.submit(_generate_reports, chunk, output_folder, report_format, engine) for chunk in chunks
+            ]
+
+            for future in as_completed(futures):
+                stats.add(*future.result())
+                logger.info(f'Batch progress: {stats}')
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+        return stats
+
+    @staticmethod
+    def get_file_name(first_date: date, second_date: date, report_format: str) -> str:
+        return f'report_{first_date:%Y-%m}_{second_date:%Y-%m}.{report_format}'
+
+
+def _init_worker() -> None:
+    # The pool workers exit with os._exit, which skips atexit: the queued log records are written by the
+    # finalizers of multiprocessing instead
+    multiprocessing.util.Finalize(None, QueueLogging.stop, exitpriority=0)
+
+
+def _generate_reports(month_pairs: list[tuple[date, date]],
+                      output_folder: str,
+                      report_format: str,
+                      engine: str) -> tuple[int, int]:
+    """
+    Compute the reports of the month pairs and write them to the output folder, run by the batch workers.
+
+    Returns:
+    - tuple[int, int]: The number of the reports and of the bytes written.
+    """
+    report_controller = ReportEngines.get(engine).create_controller()
+    formatter = get_report_formatter(report_format)
+
+    reports = []
+    for first_date, second_date in month_pairs:
+        raw_data = formatter.format(report_controller.calculate_metrics(first_date, second_date))
+        if isinstance(raw_data, str):
+            raw_data = raw_data.encode()
+
+        reports.append((BatchReports.get_file_name(first_date, second_date, report_format), raw_data))
+
+    written_bytes = 0
+    for file_name, raw_data in reports:
+        with open(os.path.join(output_folder, file_name), 'wb') as f:
+            written_bytes += f.write(raw_data)
+
+    return len(reports), written_bytes
+
+
+def parse_month_pair(value: str) -> tuple[date, date]:
+    """
+    Parse a month pair given as FIRST:SECOND, e.g. 2020-06:2020-05 or 2020-06-15:2020-05-15.
+
+    Raises:
+    - ValueError: if the pair is malformed.
+    """
+    first_month, separator, second_month = value.partition(':')
+    if not separator:
+        raise ValueError(f'Invalid month pair "{value}", expected FIRST:SECOND')
+
+    return parse_month(first_month), parse_month(second_month)
+
+
+def parse_month(value: str) -> date:
+    """
+    Parse a month given as YYYY-MM or as a date within it into its first day.
+
+    Raises:
+    - ValueError: if the month is malformed.
+    """
+    value = value.strip()
+    return date.fromisoformat(value if len(value) > 7 else f'{value}-01').replace(day=1)
+
+
+def get_range_month_pairs(first_month: date, last_month: date, mode: str = ComparisonMode.PREVIOUS_MONTH) -> list[tuple[date, date]]:
+    """
+    Get the pairs of every month of the range with its previous month or with the same month of the previous year.
+
+    Parameters:
+    - first_month (date): A date within the first month of the range.
+    - last_month (date): A date within the last month of the range.
+    - mode (str): ComparisonMode.PREVIOUS_MONTH or ComparisonMode.PREVIOUS_YEAR.
+
+    Returns:
+    - list[tuple[date, date]]: The month and the month it is compared with, the first days of the months.
+    """
+    offsets = {ComparisonMode.PREVIOUS_MONTH: 1, ComparisonMode.PREVIOUS_YEAR: 12}
+    if mode not in offsets:
+        raise ValueError(f'Unsupported comparison mode "{mode}"')
+
+    months_count = (last_month.year - first_month.year) * 12 + last_month.month - first_month.month + 1
+    months = [add_months(first_month, i) for i in range(months_count)]
+
+    return [(month, add_months(month, -offsets[mode])) for month in months]
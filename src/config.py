@@ -3,6 +3,8 @@ import os
 from pathlib import Path
 from logging.config import dictConfig
 
+from src.log_handlers import QueueLogging, RateLimitFilter
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 LOG_FOLDER = os.path.join(BASE_DIR, 'logs')
@@ -15,6 +17,43 @@ LOG_FORMAT: str = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
 DATE_FORMAT: str = '%d-%m-%Y %H:%M:%S'
 # LOG_LEVEL: str = 'DEBUG'
 LOG_LEVEL: str = 'INFO'
+LOG_FILE_SIZE: int = int(os.getenv('APP_LOG_FILE_MAX_MB', 10)) * 1024 * 1024
+LOG_FILE_BACKUP_COUNT: int = int(os.getenv('APP_LOG_FILE_BACKUP_COUNT', 7))
+# The INFO and DEBUG records of a logger above that many per second are dropped, 0 - no limit
+LOG_RATE_LIMIT: float = float(os.getenv('APP_LOG_RATE_LIMIT', 100))
+LOG_RATE_BURST: int = int(os.getenv('APP_LOG_RATE_BURST', 200))
+
+# The bookings are ingested chunk by chunk, the memory used by the ingest is bounded by the chunk size
+INGEST_CHUNK_ROWS: int = int(os.getenv('APP_INGEST_CHUNK_ROWS', 100000))
+# The bookings are parsed in a process pool when there is more than one worker and the files are big enough
+INGEST_WORKERS: int = int(os.getenv('APP_INGEST_WORKERS', 1))
+INGEST_PARALLEL_MIN_BYTES: int = int(os.getenv('APP_INGEST_PARALLEL_MIN_MB', 64)) * 1024 * 1024
+
+# The batch reports (src/batch.py) are computed by that many forked processes, in chunks of that many month pairs
+BATCH_WORKERS: int = int(os.getenv('APP_BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_CHUNK_PAIRS: int = int(os.getenv('APP_BATCH_CHUNK_PAIRS', 50))
+
+# Every tenant has its own bookings.csv and chart-of-accounts.csv in TENANTS_FOLDER/<tenant>/
+TENANTS_FOLDER: str = os.getenv('APP_TENANTS_FOLDER', os.path.join(BASE_DIR, 'data', 'tenants'))
+# Loaded tenant stores above the budget are evicted, least recently used first
+TENANTS_MEMORY_BUDGET: int = int(os.getenv('APP_TENANTS_MEMORY_BUDGET_MB', 256)) * 1024 * 1024
+
+# The engine of the month reports, one of ReportEngines (src/engines.py): sql, transactions, daily_totals,
+# daily_index or auto - the fastest one measured on the loaded data, sql for the small datasets
+REPORT_ENGINE: str = os.getenv('APP_REPORT_ENGINE', 'sql')
+REPORT_ENGINE_AUTO_MIN_ROWS: int = int(os.getenv('APP_REPORT_ENGINE_AUTO_MIN_ROWS', 10000))
+
+# A sample of the finance reports is computed again by a second engine on a background thread and compared
+SHADOW_SAMPLE_RATE: float = float(os.getenv('APP_SHADOW_SAMPLE_RATE', 0))
+SHADOW_ENGINE: str = os.getenv('APP_SHADOW_ENGINE', 'transactions')
+SHADOW_TOLERANCE: float = float(os.getenv('APP_SHADOW_TOLERANCE', 1e-9))
+# The sampled reports above that many waiting for the shadow engine are not compared
+SHADOW_MAX_PENDING: int = int(os.getenv('APP_SHADOW_MAX_PENDING', 16))
+
+# The memory of the load and request stages is profiled with tracemalloc and RSS sampling, it slows the service down
+MEMORY_PROFILING: bool = os.getenv('APP_MEMORY_PROFILING', '0') == '1'
+# The memory profile is written to that JSON file at exit, none if empty
+MEMORY_PROFILE_FILE: str = os.getenv('APP_MEMORY_PROFILE_FILE', '')
 
 
 logger_config = {
@@ -35,10 +74,9 @@ logger_config = {
         },
         'file': {
             'formatter': 'default',
-            'class': 'logging.FileHandler',
-            # 'class': 'logging.handlers.RotatingFileHandler',
-            # 'maxBytes': LOG_FILE_SIZE, #1024 * 1024 * 10, # 10 MB,
-            # 'backupCount': 7,
+            'class': 'src.log_handlers.SharedRotatingFileHandler',
+            'maxBytes': LOG_FILE_SIZE,
+            'backupCount': LOG_FILE_BACKUP_COUNT,
             'filename': LOG_FILE_NAME,
             'delay': True,
             # 'mode': 'a',
@@ -55,6 +93,9 @@ logger_config = {
     },
 }
 
+# Applied on the logging threads, before the records are formatted and queued
+log_rate_limit_filter = RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_BURST)
+
 
 def _create_logs_folder(logs_folder: str) -> bool:
     def has_file_handler() -> bool:
@@ -80,3 +121,5 @@ def _create_logs_folder(logs_folder: str) -> bool:
 def init_logging():
     _create_logs_folder(LOG_FOLDER)
     dictConfig(logger_config)
+    # The console and the file are written by a background thread, the logging threads only queue the records
+    QueueLogging.start(list(logger_config['loggers']), filters=[log_rate_limit_filter])
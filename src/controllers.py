@@ -2,7 +2,7 @@ from datetime import date
 from typing import List
 from abc import ABC, abstractmethod
 
-from src.utils import log_function_call
+from src.utils import log_function_call, DateRange, get_comparison_periods, get_last_day_of_the_month
 import src.models as models
 import src.metrics as fm
 import src.data_helpers as dh
@@ -43,3 +43,180 @@ class FinanceReportServiceController:
         )
 
         return metrics
+
+    @log_function_call
+    def calculate_periods_metrics(self, first_period: DateRange, second_period: DateRange) -> fm.FinanceReportMetrics:
+        """
+        Calculates finance metrics for two arbitrary ranges of days, the data source gets the ranges.
+
+        Returns:
+        - fm.FinanceReportMetrics: The calculated finance metrics.
+        """
+        metrics: fm.FinanceReportMetrics = fm.FinanceReportMetricsBuilder.create_periods_object(
+            first_period,
+            second_period
+        )
+
+        self.__calculator_class.execute(
+            self.__data_source.get(first_period),
+            self.__data_source.get(second_period),
+            metrics
+        )
+
+        return metrics
+
+
+class AccountsReportServiceController:
+    def __init__(self, data_source_class: dh.AccountsMetricsMonthsData, metrics_calculator_calc: fm.BaseMetricsCalculator):
+        """
+        Initializes the AccountsReportServiceController.
+
+        Parameters:
+        - data_source_class (dh.AccountsMetricsMonthsData): The source of per-account month metrics.
+        - metrics_calculator_calc (fm.BaseMetricsCalculator): The calculator of the month differences.
+        """
+        self.__calculator_class = metrics_calculator_calc
+        self.__data_source = data_source_class
+
+    @log_function_call
+    def calculate_metrics(self, first_date: date, second_date: date) -> fm.AccountsReportMetrics:
+        """
+        Calculates finance metrics per account.
+
+        Returns:
+        - fm.AccountsReportMetrics: The calculated finance metrics, one item per account.
+        """
+        accounts_metrics = fm.AccountsReportMetrics(first_date, second_date)
+
+        for account_code, account_nature, first_month_data, second_month_data in self.__data_source.get(first_date, second_date):
+            metrics: fm.AccountReportMetrics = fm.FinanceReportMetricsBuilder.create_object(
+                first_date,
+                second_date,
+                fm.AccountReportMetrics
+            )
+            metrics.account_code = account_code
+            metrics.account_nature = account_nature
+
+            self.__calculator_class.execute(
+                first_month_data,
+                second_month_data,
+                metrics
+            )
+
+            accounts_metrics.accounts.append(metrics)
+
+        return accounts_metrics
+
+
+class AccountsMoversServiceController:
+    def __init__(self, data_source_class: dh.AccountsAmountsMonthsData, metrics_calculator_calc: fm.MoversMetricsCalculator):
+        """
+        Initializes the AccountsMoversServiceController.
+
+        Parameters:
+        - data_source_class (dh.AccountsAmountsMonthsData): The source of per-account month amounts.
+        - metrics_calculator_calc (fm.MoversMetricsCalculator): The selector of the largest changes.
+        """
+        self.__calculator_class = metrics_calculator_calc
+        self.__data_source = data_source_class
+
+    @log_function_call
+    def calculate_metrics(self, first_date: date, second_date: date, count: int) -> fm.AccountsMoversMetrics:
+        """
+        Calculates the accounts with the largest changes between the two months.
+
+        Parameters:
+        - first_date (date): The first month.
+        - second_date (date): The second month.
+        - count (int): The number of the accounts selected by each change.
+
+        Returns:
+        - fm.AccountsMoversMetrics: The metrics of the selected accounts.
+        """
+        movers_metrics = fm.AccountsMoversMetrics(first_date, second_date)
+
+        self.__calculator_class.execute(
+            self.__data_source.get(first_date, second_date),
+            movers_metrics,
+            count
+        )
+
+        return movers_metrics
+
+
+class ComparisonReportServiceController:
+    def __init__(self, data_source_class: dh.PeriodsMetricsMonthsData, metrics_calculator_calc: fm.BaseMetricsCalculator):
+        """
+        Initializes the ComparisonReportServiceController.
+
+        Parameters:
+        - data_source_class (dh.PeriodsMetricsMonthsData): The source of the metrics of whole-month periods.
+        - metrics_calculator_calc (fm.BaseMetricsCalculator): The calculator of the period differences.
+        """
+        self.__calculator_class = metrics_calculator_calc
+        self.__data_source = data_source_class
+
+    @log_function_call
+    def calculate_metrics(self, month_date: date, mode: str, months_count: int = 1) -> fm.FinanceReportMetrics:
+        """
+        Calculates finance metrics of the month (or the trailing months) compared in the given mode.
+
+        Parameters:
+        - month_date (date): A date within the month of the report.
+        - mode (str): One of the ComparisonMode values.
+        - months_count (int): The number of months in the periods of the trailing mode.
+
+        Returns:
+        - fm.FinanceReportMetrics: The calculated finance metrics.
+        """
+        first_period, second_period = get_comparison_periods(month_date, mode, months_count)
+
+        metrics: fm.FinanceReportMetrics = fm.FinanceReportMetricsBuilder.create_periods_object(
+            first_period,
+            second_period
+        )
+
+        first_period_data, second_period_data = self.__data_source.get(first_period, second_period)
+
+        self.__calculator_class.execute(
+            first_period_data,
+            second_period_data,
+            metrics
+        )
+
+        return metrics
+
+
+class MatrixReportServiceController:
+    def __init__(self, data_source_class: dh.PeriodsMetricsMonthsData, metrics_calculator_calc: fm.MatrixMetricsCalculator):
+        """
+        Initializes the MatrixReportServiceController.
+
+        Parameters:
+        - data_source_class (dh.PeriodsMetricsMonthsData): The source of the metrics of whole-month periods.
+        - metrics_calculator_calc (fm.MatrixMetricsCalculator): The calculator of the differences of all the pairs.
+        """
+        self.__calculator_class = metrics_calculator_calc
+        self.__data_source = data_source_class
+
+    @log_function_call
+    def calculate_metrics(self, month_dates: List[date]) -> fm.MonthsMatrixFinanceMetrics:
+        """
+        Calculates the differences of the finance metrics between every pair of the months.
+
+        Parameters:
+        - month_dates (List[date]): The first days of the months.
+
+        Returns:
+        - fm.MonthsMatrixFinanceMetrics: The calculated finance metrics.
+        """
+        metrics = fm.MonthsMatrixFinanceMetrics(months=[fm.MonthFinanceMetrics(month_date) for month_date in month_dates])
+
+        # The metrics of all the months come from one aggregation
+        months_data = self.__data_source.get(*[
+            DateRange(month_date, get_last_day_of_the_month(month_date).date()) for month_date in month_dates
+        ])
+
+        self.__calculator_class.execute(months_data, metrics)
+
+        return metrics
@@ -1,16 +1,39 @@
+from __future__ import annotations
+
+import io
 import os
+import csv
+import glob
+import itertools
 from pathlib import Path
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 import threading
 import logging
-from sqlalchemy import create_engine, Engine, text
+import time
+from collections import deque
+from typing import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from sqlalchemy import create_engine, Engine, Connection, text
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # import src.models as models
-from src.models import AppTables, TransactionModelColumns
-from src.utils import log_function_call
+from src.models import (AppTables, AccountModelColumns, TransactionModelColumns, AccountDataColumns,
+                        TransactionDataColumns, TransactionPartitionsColumns, DailyTotalsColumns, AccountNature,
+                        TransactionType, metadata, AMOUNT_DECIMALS,
+                        ACCOUNT_VIEW_SQL, TRANSACTION_VIEW_SQL,
+                        transaction_partition_name, transaction_partition_table, transaction_data_view_sql)
+from src.utils import log_function_call, lazy_import, ReadWriteLock
+from src.service_metrics import ServiceMetrics
+from src.profiling import MemoryProfiler
 import src.config as cfg
 
+# pandas and numpy are loaded on the first use: the service starts without them and loads them with the data
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
 
 logger = logging.getLogger(cfg.LOGGER_NAME)
 
@@ -23,115 +46,1020 @@ ACCOUNTS_FILE = 'chart-of-accounts.csv'
 TRANSACTIONS_FILE = 'bookings.csv'
 
 
+class DailyTotalsIndex:
+    """
+    Cumulative revenues and expenses per calendar day, built from the daily totals at load.
+
+    The days without bookings are filled in, so the totals of any range of days are the difference
+    of two array items whatever the length of the range.
+    """
+    def __init__(self, first_day: date | None, revenues: np.ndarray, expenses: np.ndarray):
+        self._first_ordinal: int = first_day.toordinal() if first_day is not None else 0
+        # The item i holds the totals of the days before first_day + i
+        self._revenues: np.ndarray = revenues
+        self._expenses: np.ndarray = expenses
+
+    @classmethod
+    def build(cls, conn: Connection) -> 'DailyTotalsIndex':
+        rows = conn.execute(text(
+            f'select {DailyTotalsColumns.MONTH_KEY}, {DailyTotalsColumns.DAY}, '
+                f'{DailyTotalsColumns.REVENUES}, {DailyTotalsColumns.EXPENSES} '
+            f'from {AppTables.DAILY_TOTALS}'
+        )).all()
+
+        if not rows:
+            return cls(None, np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64))
+
+        ordinals = np.array([date(month_key // 100, month_key % 100, day).toordinal() for month_key, day, _, _ in rows])
+        first_ordinal = int(ordinals.min())
+        positions = ordinals - first_ordinal + 1
+
+        revenues = np.zeros(positions.max() + 1, dtype=np.int64)
+        expenses = np.zeros(positions.max() + 1, dtype=np.int64)
+        revenues[positions] = [row[2] for row in rows]
+        expenses[positions] = [row[3] for row in rows]
+
+        return cls(date.fromordinal(first_ordinal), np.cumsum(revenues), np.cumsum(expenses))
+
+    def get(self, start_date: date, end_date: date) -> tuple[int, int]:
+        """
+        Get the revenues and expenses of the days from start_date to end_date inclusive.
+
+        Returns:
+            tuple[int, int]: The revenues and expenses in minor units.
+        """
+        start = min(max(start_date.toordinal() - self._first_ordinal, 0), len(self._revenues) - 1)
+        end = min(max(end_date.toordinal() - self._first_ordinal + 1, 0), len(self._revenues) - 1)
+
+        if end <= start:
+            return 0, 0
+
+        return (int(self._revenues[end] - self._revenues[start]),
+                int(self._expenses[end] - self._expenses[start]))
+
+
+class SerializedStaticPool(StaticPool):
+    """
+    The single connection of an in-memory DB, checked out by one thread at a time.
+
+    The connection is shared by the request threads (check_same_thread=False), a thread waits until the connection
+    is returned by the thread using it, so the transactions of the threads never interleave. The connection is
+    returned by the first close, so a thread must not check it out again before returning it.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkout_lock = threading.Lock()
+        self._owner: int | None = None
+
+    def _do_get(self):
+        if self._owner == threading.get_ident():
+            raise RuntimeError('The connection of the in-memory DB is already checked out by this thread')
+
+        self._checkout_lock.acquire()
+        self._owner = threading.get_ident()
+        try:
+            return super()._do_get()
+        except BaseException:
+            self._release()
+            raise
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._release()
+
+    def _release(self):
+        self._owner = None
+        self._checkout_lock.release()
+
+
+class DataStore:
+    """
+    A dataset (chart of accounts and bookings from one data folder) loaded into its own in-memory SQLite DB
+
+    Every load and reload of the data gets a new data version, unique across the stores of the process.
+    The requests read the store under its read lock, the loads and reloads change it under its write lock.
+
+    A store replaced by a newly loaded one is retired: it is cleared once released by all its users
+    (see retain and retire).
+    """
+    _versions = itertools.count(1)
+
+    def __init__(self, data_folder: str = DATA_FOLDER):
+        self._lock = ReadWriteLock()
+        self._users_lock = threading.Lock()
+        self._users: int = 0
+        self._retired: bool = False
+        self._data_folder: str = data_folder
+        self._engine: Engine = None
+        self._session: sessionmaker = None
+        self._daily_index: DailyTotalsIndex = None
+        self._auto_engine: str = None
+        self._version: int = None
+        self._loaded_at: float = None
+
+    def get(self) -> Engine:
+        return self._engine
+
+    def get_daily_index(self) -> DailyTotalsIndex:
+        return self._daily_index
+
+    def get_auto_engine(self) -> str | None:
+        """
+        Get the report engine selected for the auto engine when the data was loaded (None if the store is not loaded).
+        """
+        return self._auto_engine
+
+    def get_version(self) -> int | None:
+        """
+        Get the version of the loaded data (None if the store is not loaded).
+        """
+        return self._version
+
+    def get_loaded_at(self) -> float | None:
+        """
+        Get the time the data has been loaded or reloaded at, as a POSIX timestamp.
+        """
+        return self._loaded_at
+
+    def set_loaded(self):
+        """
+        Mark the data as (re)loaded: a new data version starts.
+        """
+        self._loaded_at = time.time()
+        self._version = next(self._versions)
+
+    def set_daily_index(self, daily_index: DailyTotalsIndex):
+        self._daily_index = daily_index
+
+    def set_auto_engine(self, name: str):
+        self._auto_engine = name
+
+    def get_session(self) -> Session:
+        return self._session()
+
+    def get_data_folder(self) -> str:
+        return self._data_folder
+
+    def reading(self):
+        return self._lock.reading()
+
+    def writing(self):
+        return self._lock.writing()
+
+    def retain(self) -> bool:
+        """
+        Keep the store from being cleared by retire until it is released.
+
+        Returns:
+        - bool: False if the store is retired, it must not be used.
+        """
+        with self._users_lock:
+            if self._retired:
+                return False
+
+            self._users += 1
+            return True
+
+    def in_use(self) -> bool:
+        """
+        Check whether the store is retained, e.g. by a request or by a background thread querying it.
+        """
+        with self._users_lock:
+            return self._users > 0
+
+    def release(self):
+        with self._users_lock:
+            self._users -= 1
+            cleared = self._retired and self._users == 0
+
+        # The last user of a retired store clears it
+        if cleared:
+            self.clear()
+
+    def retire(self):
+        """
+        Retire the store without waiting for its users: it is cleared now if it is not used,
+        otherwise by the release of its last user.
+        """
+        with self._users_lock:
+            self._retired = True
+            cleared = self._users == 0
+
+        if cleared:
+            self.clear()
+
+    def init(self):
+        # The in-memory DB lives in a single connection: share it between the request threads, one at a time
+        engine = create_engine("sqlite+pysqlite:///:memory:", echo=False,
+                               connect_args={'check_same_thread': False}, poolclass=SerializedStaticPool)
+        # engine = create_engine(f'sqlite+pysqlite:///{DB_DATA_FULL_PATH}', echo=False)
+        self._set(engine)
+
+    def _set(self, engine: Engine):
+        self._engine = engine
+        self._session = sessionmaker(bind=engine)
+
+    def clear(self):
+        if self._engine is not None:
+            self._engine.dispose()
+
+        self._engine = None
+        self._session = None
+        self._daily_index = None
+        self._auto_engine = None
+        self._version = None
+        self._loaded_at = None
+
+    def memory_size(self) -> int:
+        """
+        Get the size of the loaded in-memory DB in bytes (0 if the store is not loaded).
+        """
+        if self._engine is None:
+            return 0
+
+        with self._engine.connect() as conn:
+            page_count = conn.execute(text('pragma page_count')).scalar()
+            page_size = conn.execute(text('pragma page_size')).scalar()
+
+        return page_count * page_size
+
+
 class SQLEngine:
-    _engine: Engine = None
-    _session: Session = None
+    """
+    Process-wide access point to the data store used by the current request.
+
+    By default it is the store of the data folder. A tenant store can be activated for the current context
+    with SQLEngine.use(), the data sources then transparently query it.
+    """
+    _store: DataStore = None
 
     _instance = None
     _lock = threading.Lock()
 
+    _active_store: ContextVar[DataStore | None] = ContextVar('active_store', default=None)
+
     def __new__(cls):
         if cls._instance is None:
             # cls._instance = super().__new__(cls)
             with cls._lock:
                 if not cls._instance:
                     cls._instance = super().__new__(cls)
+                    cls._instance._store = DataStore(DATA_FOLDER)
         return cls._instance
 
+    @classmethod
+    def store(cls) -> DataStore:
+        store = cls._active_store.get()
+        if store is None:
+            store = cls._instance._store
+        return store
+
+    @classmethod
+    def default_store(cls) -> DataStore:
+        """
+        Get the store of the data folder, whatever the store active for the current context.
+        """
+        return cls._instance._store
+
+    @classmethod
+    def swap(cls, store: DataStore) -> DataStore:
+        """
+        Replace the store of the data folder, the requests started after the swap use the new store.
+
+        Returns:
+        - DataStore: The replaced store.
+        """
+        with cls._lock:
+            old_store, cls._instance._store = cls._instance._store, store
+
+        return old_store
+
+    @classmethod
+    @contextmanager
+    def use(cls, store: DataStore):
+        """
+        Activate the given store for the current context.
+        """
+        token = cls._active_store.set(store)
+        try:
+            yield store
+        finally:
+            cls._active_store.reset(token)
+
     @classmethod
     def get(cls) -> Engine:
-        return cls._instance._engine
+        return cls.store().get()
 
     @classmethod
     def get_session(cls) -> Session:
-        return cls._instance._session()
+        return cls.store().get_session()
 
     @classmethod
-    def init(cls):
-        engine = create_engine("sqlite+pysqlite:///:memory:", echo=False)
-        # engine = create_engine(f'sqlite+pysqlite:///{DB_DATA_FULL_PATH}', echo=False)
-        cls._instance._set(engine)
+    def get_daily_index(cls) -> DailyTotalsIndex:
+        return cls.store().get_daily_index()
+
+    @classmethod
+    def set_daily_index(cls, daily_index: DailyTotalsIndex):
+        cls.store().set_daily_index(daily_index)
+
+    @classmethod
+    def get_auto_engine(cls) -> str | None:
+        return cls.store().get_auto_engine()
 
     @classmethod
-    def _set(cls, engine: Engine):
-        cls._instance._engine = engine
-        cls._instance._session = sessionmaker(bind=engine)
+    def set_auto_engine(cls, name: str):
+        cls.store().set_auto_engine(name)
+
+    @classmethod
+    def set_loaded(cls):
+        cls.store().set_loaded()
+
+    @classmethod
+    def get_version(cls) -> int | None:
+        return cls.store().get_version()
+
+    @classmethod
+    def writing(cls):
+        return cls.store().writing()
+
+    @classmethod
+    def get_data_folder(cls) -> str:
+        return cls.store().get_data_folder()
+
+    @classmethod
+    def init(cls):
+        cls.store().init()
 
     @classmethod
     def clear(cls):
-        cls._instance._engine = None
-        cls._instance._session = None
+        cls.store().clear()
 
 
 SQLEngine()
 
 
+class TransactionPartitions:
+    """
+    The month partitions of the bookings and their catalog.
+
+    Every month is stored in its own table, a month query touches only the partitions of its months and
+    replacing a month does not touch the others. The transact_data view over all the partitions is rebuilt
+    when the set of the partitions changes.
+    """
+    @staticmethod
+    def get(conn: Connection, month_keys: list[int]) -> dict[int, str]:
+        """
+        Look up the partitions of the months in the catalog.
+
+        Returns:
+            dict[int, str]: The partition table names by month key, the months without bookings are missing.
+        """
+        if not month_keys:
+            return {}
+
+        params = {f'month_key_{i}': month_key for i, month_key in enumerate(month_keys)}
+        stmt = text(f'select {TransactionPartitionsColumns.MONTH_KEY}, {TransactionPartitionsColumns.TABLE_NAME} '
+                    f'from {AppTables.TRANSACTION_PARTITIONS} '
+                    f'where {TransactionPartitionsColumns.MONTH_KEY} in ({", ".join(":" + key for key in params)})')
+
+        return dict(conn.execute(stmt, params).all())
+
+    @staticmethod
+    def month_keys(conn: Connection) -> list[int]:
+        stmt = text(f'select {TransactionPartitionsColumns.MONTH_KEY} from {AppTables.TRANSACTION_PARTITIONS} '
+                    f'order by {TransactionPartitionsColumns.MONTH_KEY}')
+        return conn.execute(stmt).scalars().all()
+
+    @staticmethod
+    def sizes(conn: Connection) -> dict[int, int]:
+        """
+        Get the numbers of the bookings of the months.
+
+        Returns:
+            dict[int, int]: The numbers of the bookings by month key.
+        """
+        stmt = text(f'select {TransactionPartitionsColumns.MONTH_KEY}, {TransactionPartitionsColumns.ROWS} '
+                    f'from {AppTables.TRANSACTION_PARTITIONS} '
+                    f'order by {TransactionPartitionsColumns.MONTH_KEY}')
+        return dict(conn.execute(stmt).all())
+
+    @classmethod
+    def append(cls, conn: Connection, month_key: int, transactions: pd.DataFrame) -> bool:
+        """
+        Append the bookings of the month to its partition, the partition is created if missing.
+
+        Returns:
+            bool: True if the partition has been created.
+        """
+        created = cls._create(conn, month_key)
+
+        DataLoader._insert(conn, transaction_partition_name(month_key), transactions)
+
+        conn.execute(text(f'update {AppTables.TRANSACTION_PARTITIONS} '
+                          f'set {TransactionPartitionsColumns.ROWS} = {TransactionPartitionsColumns.ROWS} + :rows '
+                          f'where {TransactionPartitionsColumns.MONTH_KEY} = :month_key'),
+                     {'rows': len(transactions), 'month_key': month_key})
+
+        return created
+
+    @classmethod
+    def replace(cls, conn: Connection, month_key: int, transactions: pd.DataFrame) -> None:
+        """
+        Replace the bookings of the month, the other partitions are not touched.
+        """
+        cls.drop(conn, month_key)
+
+        if not transactions.empty:
+            cls.append(conn, month_key, transactions)
+
+        cls.rebuild_view(conn)
+
+    @staticmethod
+    def drop(conn: Connection, month_key: int) -> None:
+        transaction_partition_table(month_key).drop(conn, checkfirst=True)
+        conn.execute(text(f'delete from {AppTables.TRANSACTION_PARTITIONS} '
+                          f'where {TransactionPartitionsColumns.MONTH_KEY} = :month_key'),
+                     {'month_key': month_key})
+
+    @classmethod
+    def rebuild_view(cls, conn: Connection) -> None:
+        conn.execute(text(f'drop view if exists {AppTables.TRANSACTION_DATA}'))
+        conn.execute(text(transaction_data_view_sql(cls.month_keys(conn))))
+
+    @staticmethod
+    def _create(conn: Connection, month_key: int) -> bool:
+        stmt = text(f'insert or ignore into {AppTables.TRANSACTION_PARTITIONS} '
+                    f'values (:month_key, :table_name, 0)')
+        created = conn.execute(stmt, {'month_key': month_key,
+                                      'table_name': transaction_partition_name(month_key)}).rowcount > 0
+
+        if created:
+            transaction_partition_table(month_key).create(conn)
+
+        return created
+
+
+class IngestStats:
+    """
+    Counters and throughput of a bookings ingest.
+    """
+    def __init__(self):
+        self.rows: int = 0
+        self.orphan_rows: int = 0
+        self._started_at: float = time.perf_counter()
+        self.seconds: float = 0
+
+    def add(self, rows: int, orphan_rows: int) -> None:
+        self.rows += rows
+        self.orphan_rows += orphan_rows
+        self.seconds = time.perf_counter() - self._started_at
+
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0
+
+    def __str__(self):
+        return (f'{self.rows} bookings ({self.orphan_rows} orphans dropped) in {self.seconds:.2f}s, '
+                f'{self.rows_per_second():.0f} rows/s')
+
+
 class DataLoader:
     """
     A class responsible for initial data loading from CSV files and load the data into SQLite in-memory DB
+
+    The bookings are streamed: every chunk is read, converted, stripped of bookings of unknown accounts,
+    inserted into the month partitions and added to the daily totals, then discarded. The peak memory is bounded
+    by the chunk size (or by the in-flight byte ranges in parallel mode) whatever the ledger size.
     """
+    CHUNK_ROWS: int = cfg.INGEST_CHUNK_ROWS
+    WORKERS: int = cfg.INGEST_WORKERS
+    PARALLEL_MIN_BYTES: int = cfg.INGEST_PARALLEL_MIN_BYTES
+
+    PARALLEL_RANGES_PER_WORKER: int = 4
+    PARALLEL_RANGES_IN_FLIGHT_PER_WORKER: int = 2
+    PARALLEL_MIN_RANGE_BYTES: int = 1024 * 1024
+    PARALLEL_MAX_RANGE_BYTES: int = 4 * 1024 * 1024
+
     @classmethod
     @log_function_call
     def load(cls,
-             engine: SQLEngine() = None,
+             engine: SQLEngine | DataStore = SQLEngine,
              acc_file: str = ACCOUNTS_FILE,
-             trans_file: str = TRANSACTIONS_FILE) -> None:
-        if engine.get() is not None:
-            return
+             trans_file: str = TRANSACTIONS_FILE) -> IngestStats | None:
+        # Double-checked: the loaded store is not locked, the concurrent first loads wait for one of them
+        if engine.get_version() is not None:
+            return None
 
-        engine.init()
-        sql_engine = engine.get()
+        with engine.writing():
+            if engine.get_version() is not None:
+                return None
 
-        accounts, transactions = cls._load_csv_data(acc_file, trans_file)
+            return cls._load(engine, acc_file, trans_file)
 
-        accounts.to_sql(AppTables.ACCOUNT, sql_engine, index=True)
-        transactions.to_sql(AppTables.TRANSACTION, sql_engine, index=True)
+    @classmethod
+    def _load(cls, engine: SQLEngine | DataStore, acc_file: str, trans_file: str) -> IngestStats:
+        data_folder = engine.get_data_folder()
 
-        with sql_engine.connect() as conn:
-            stmt = text(f'alter table {AppTables.ACCOUNT} rename column "index" to id')
-            result = conn.execute(stmt)
+        with MemoryProfiler.stage('load'):
+            engine.init()
+            sql_engine = engine.get()
+
+            try:
+                with MemoryProfiler.stage('schema'):
+                    cls._create_schema(sql_engine)
+
+                with MemoryProfiler.stage('accounts'):
+                    accounts = cls._encode_accounts(cls._read_file(acc_file, data_folder))
+                    with sql_engine.begin() as conn:
+                        cls._insert(conn, AppTables.ACCOUNT_DATA, accounts)
+
+                with MemoryProfiler.stage('transactions'):
+                    stats = cls._load_transactions(sql_engine, cls._get_account_natures(accounts), trans_file,
+                                                   data_folder)
+
+                with MemoryProfiler.stage('daily_index'), sql_engine.connect() as conn:
+                    engine.set_daily_index(DailyTotalsIndex.build(conn))
 
-            stmt = text(f'alter table {AppTables.TRANSACTION} rename column "index" to id')
-            result = conn.execute(stmt)
+                with MemoryProfiler.stage('auto_engine'):
+                    engine.set_auto_engine(cls._select_auto_engine(engine))
+
+                engine.set_loaded()
+            except Exception:
+                # Do not leave a half loaded store behind, the next call will load it again
+                engine.clear()
+                raise
+
+        return stats
+
+    @staticmethod
+    def _select_auto_engine(engine: SQLEngine | DataStore) -> str:
+        # The auto engine is measured once per load, the requests only read the selected engine
+        from src.engines import ReportEngines
+
+        store = engine if isinstance(engine, DataStore) else engine.store()
+        with SQLEngine.use(store):
+            return ReportEngines.select_auto_name()
 
     @classmethod
     @log_function_call
-    def _load_csv_data(cls,
-                       acc_file: str = ACCOUNTS_FILE,
-                       trans_file: str = TRANSACTIONS_FILE) -> tuple[pd.DataFrame, pd.DataFrame]:
-        accounts = cls._read_file(acc_file)
-        transactions = cls._read_file(trans_file)
+    def reload_month(cls,
+                     month_key: int,
+                     engine: SQLEngine | DataStore = SQLEngine,
+                     trans_file: str = TRANSACTIONS_FILE) -> int:
+        """
+        Reload the bookings of one month into a loaded store, the partitions of the other months are not touched.
+
+        Only the month shard of the bookings (e.g. bookings-2020-06.csv for bookings.csv) is read, so the cost
+        depends on the month size: the bookings of a month reloaded alone are kept in its month shard. The reloaded
+        bookings get new ids, following the ids of the loaded bookings.
+
+        Parameters:
+        - month_key (int): The month as yyyymm.
+        - engine (SQLEngine | DataStore): The loaded store.
+        - trans_file (str): The bookings file name.
+
+        Raises:
+        - FileNotFoundError: if there is no month shard of the month.
+
+        Returns:
+        - int: The number of the bookings of the month.
+        """
+        data_folder = engine.get_data_folder()
+        month_file = cls.get_month_file(month_key, trans_file)
+        if not os.path.isfile(os.path.join(data_folder, month_file)):
+            raise FileNotFoundError(f'There is no bookings file {month_file} of the month')
+
+        sql_engine = engine.get()
+
+        with sql_engine.connect() as conn:
+            accounts = pd.DataFrame(conn.execute(text(
+                f'select {AccountDataColumns.CODE}, {AccountDataColumns.NATURE_CODE} from {AppTables.ACCOUNT_DATA}'
+            )).all(), columns=[AccountDataColumns.CODE, AccountDataColumns.NATURE_CODE])
+            first_id = conn.execute(text(
+                f'select coalesce(max(id), -1) + 1 from {AppTables.TRANSACTION_DATA}'
+            )).scalar()
+
+        stats = IngestStats()
+        month_parts, daily_totals = [], None
+
+        chunks = (cls._convert_transactions(transactions)
+                  for transactions in cls._read_file_chunks(month_file, data_folder, cls.CHUNK_ROWS))
+
+        for transactions in cls._iter_known_transactions(cls._get_account_natures(accounts), chunks, stats, first_id):
+            # The bookings of the other months found in the month shard are not the bookings of the month
+            month_transactions = transactions[transactions[TransactionDataColumns.MONTH_KEY] == month_key]
+            month_parts.append(month_transactions)
+            daily_totals = cls._add_daily_totals(daily_totals, month_transactions)
+
+        month_transactions = pd.concat(month_parts)
+
+        # The requests wait while the month is replaced, they never see it partly replaced
+        with engine.writing(), sql_engine.begin() as conn:
+            TransactionPartitions.replace(conn, month_key, month_transactions)
+
+            conn.execute(text(f'delete from {AppTables.DAILY_TOTALS} where {DailyTotalsColumns.MONTH_KEY} = :month_key'),
+                         {'month_key': month_key})
+            cls._insert(conn, AppTables.DAILY_TOTALS, daily_totals.reset_index(), index_label=None)
+
+            engine.set_daily_index(DailyTotalsIndex.build(conn))
+            engine.set_loaded()
+
+        logger.info(f'Reloaded {len(month_transactions)} bookings of {month_key} from {month_file}')
+
+        return len(month_transactions)
+
+    @staticmethod
+    def get_month_file(month_key: int, trans_file: str = TRANSACTIONS_FILE) -> str:
+        """
+        Get the name of the month shard of the bookings, e.g. bookings-2020-06.csv for bookings.csv.
+        """
+        stem, ext = os.path.splitext(trans_file)
+        return f'{stem}-{month_key // 100:04d}-{month_key % 100:02d}{ext}'
+
+    @staticmethod
+    def _get_account_natures(accounts: pd.DataFrame) -> pd.Series:
+        """
+        The nature codes of the accounts by account code.
+        """
+        return (accounts.drop_duplicates(AccountDataColumns.CODE)
+                .set_index(AccountDataColumns.CODE)[AccountDataColumns.NATURE_CODE])
+
+    @classmethod
+    def _iter_known_transactions(cls,
+                                 account_natures: pd.Series,
+                                 chunks: Iterator[pd.DataFrame],
+                                 stats: IngestStats,
+                                 first_id: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Resolve the natures of the accounts of the converted bookings chunks, the bookings of the accounts
+        missing in the chart of accounts are dropped.
+
+        Yields:
+            pd.DataFrame: The bookings indexed by their ids, with the nature codes of their accounts.
+        """
+        for transactions in chunks:
+            # The ids are the positions of the bookings in the files, from first_id on
+            transactions.index = pd.RangeIndex(first_id + stats.rows, first_id + stats.rows + len(transactions))
+
+            natures = transactions[TransactionDataColumns.CODE].map(account_natures)
+            known = natures.notna()
+
+            stats.add(len(transactions), len(transactions) - int(known.sum()))
+
+            if not known.all():
+                transactions = transactions[known]
+                natures = natures[known]
+
+            transactions[TransactionDataColumns.NATURE_CODE] = natures.astype('int8')
+
+            yield transactions
+
+    @classmethod
+    def _load_transactions(cls,
+                           sql_engine: Engine,
+                           account_natures: pd.Series,
+                           trans_file: str,
+                           data_folder: str) -> IngestStats:
+        """
+        Stream the bookings into the month partitions and the daily totals table.
+
+        Returns:
+            IngestStats: The ingest counters.
+        """
+        stats = IngestStats()
+        daily_totals = None
+
+        files_chunks = cls._iter_transactions(trans_file, data_folder)
+        chunks = cls._iter_known_transactions(account_natures, files_chunks, stats)
+
+        while True:
+            # The chunks are parsed into pandas frames, then copied into SQLite
+            with MemoryProfiler.stage('read'):
+                transactions = next(chunks, None)
+            if transactions is None:
+                break
+
+            with MemoryProfiler.stage('insert'), sql_engine.begin() as conn:
+                for month_key, month_transactions in transactions.groupby(TransactionDataColumns.MONTH_KEY, sort=False):
+                    TransactionPartitions.append(conn, int(month_key), month_transactions)
+
+            daily_totals = cls._add_daily_totals(daily_totals, transactions)
+
+            logger.info(f'Ingest progress: {stats}')
+
+        with MemoryProfiler.stage('daily_totals'), sql_engine.begin() as conn:
+            TransactionPartitions.rebuild_view(conn)
+
+            if daily_totals is not None:
+                cls._insert(conn, AppTables.DAILY_TOTALS, daily_totals.reset_index(), index_label=None)
+
+        logger.info(f'Ingested {stats}')
+        if stats.orphan_rows:
+            logger.warning(f'Dropped {stats.orphan_rows} bookings of accounts missing in the chart of accounts')
+
+        ServiceMetrics.increment(ServiceMetrics.INGEST_ROWS, stats.rows)
+        ServiceMetrics.increment(ServiceMetrics.INGEST_ORPHAN_ROWS, stats.orphan_rows)
+
+        return stats
+
+    @staticmethod
+    def _add_daily_totals(daily_totals: pd.DataFrame | None, transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the revenues and expenses of the bookings chunk to the daily totals.
+        """
+        signed_amounts = transactions[TransactionDataColumns.TYPE_CODE].astype('int64') * transactions[TransactionDataColumns.AMOUNT]
+        natures = transactions[TransactionDataColumns.NATURE_CODE]
+
+        chunk_totals = pd.DataFrame({
+            DailyTotalsColumns.MONTH_KEY: transactions[TransactionDataColumns.MONTH_KEY],
+            DailyTotalsColumns.DAY:       transactions[TransactionDataColumns.DAY],
+            DailyTotalsColumns.REVENUES:  signed_amounts.where(natures == AccountNature.CODES[AccountNature.INCOME], 0),
+            DailyTotalsColumns.EXPENSES:  signed_amounts.where(natures == AccountNature.CODES[AccountNature.EXPENSE], 0),
+        }).groupby([DailyTotalsColumns.MONTH_KEY, DailyTotalsColumns.DAY]).sum()
+
+        if daily_totals is None:
+            return chunk_totals
+
+        return pd.concat([daily_totals, chunk_totals]).groupby(level=[0, 1]).sum()
+
+    @staticmethod
+    def _insert(conn: Connection, table_name: str, data: pd.DataFrame, index_label: str | None = 'id') -> None:
+        """
+        Insert the rows of the DataFrame into the table, the index is inserted as the index_label column.
+        """
+        if data.empty:
+            return
+
+        columns = list(data.columns)
+        values = [data[column_name].tolist() for column_name in columns]
+
+        if index_label is not None:
+            columns.insert(0, index_label)
+            values.insert(0, data.index.tolist())
+
+        stmt = f'insert into {table_name} ({", ".join(columns)}) values ({", ".join("?" * len(columns))})'
+
+        conn.exec_driver_sql(stmt, list(zip(*values)))
+
+    @classmethod
+    def _create_schema(cls, sql_engine: Engine) -> None:
+        """
+        Create the compact physical tables and the decoding views the ORM models are mapped to.
+        """
+        metadata.create_all(sql_engine)
+
+        with sql_engine.begin() as conn:
+            TransactionPartitions.rebuild_view(conn)
+            conn.execute(text(ACCOUNT_VIEW_SQL))
+            conn.execute(text(TRANSACTION_VIEW_SQL))
 
+    @classmethod
+    def _encode_accounts(cls, accounts: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert the chart of accounts into the physical account table columns.
+        """
+        return pd.DataFrame({
+            AccountDataColumns.CODE:        accounts[AccountModelColumns.CODE],
+            AccountDataColumns.NATURE_CODE: cls._encode_codes(accounts[AccountModelColumns.NATURE], AccountNature.CODES),
+        })
+
+    @classmethod
+    def _convert_transactions(cls, transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert the bookings as read from CSV into the physical transaction table columns.
+        """
         trans_date_col = TransactionModelColumns.DATE
         amount_col = TransactionModelColumns.AMOUNT
 
         transactions[trans_date_col] = pd.to_datetime(transactions[trans_date_col], format='%Y-%m-%d')
-        transactions[amount_col] = pd.to_numeric(transactions[amount_col])
+        transactions[amount_col] = cls._parse_minor_units(transactions[amount_col])
+
+        return cls._encode_transactions(transactions)
+
+    @classmethod
+    def _encode_transactions(cls, transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert the typed bookings into the physical transaction table columns.
+        """
+        trans_dates = transactions[TransactionModelColumns.DATE].dt
+
+        return pd.DataFrame({
+            TransactionDataColumns.CODE:      transactions[TransactionModelColumns.CODE],
+            TransactionDataColumns.TYPE_CODE: cls._encode_codes(transactions[TransactionModelColumns.TYPE], TransactionType.CODES),
+            TransactionDataColumns.AMOUNT:    transactions[TransactionModelColumns.AMOUNT],
+            TransactionDataColumns.MONTH_KEY: trans_dates.year * 100 + trans_dates.month,
+            TransactionDataColumns.DAY:       trans_dates.day,
+        })
+
+    @staticmethod
+    def _encode_codes(values: pd.Series, codes: dict) -> pd.Series:
+        """
+        Replace the values by their small-int codes, unknown values get the code 0.
+        """
+        return values.map(codes).fillna(0).astype('int8')
+
+    @classmethod
+    def _iter_transactions(cls,
+                           trans_file: str = TRANSACTIONS_FILE,
+                           data_folder: str = DATA_FOLDER,
+                           workers: int = None,
+                           parallel_min_bytes: int = None) -> Iterator[pd.DataFrame]:
+        """
+        Read the bookings file and its shards chunk by chunk, converted into the physical transaction table columns.
+
+        The files are parsed in a process pool when more than one worker is configured and the files
+        are big enough to pay off the pool start-up.
+
+        Yields:
+            pd.DataFrame: The converted bookings chunks, at least one (possibly empty).
+        """
+        workers = cls.WORKERS if workers is None else workers
+        parallel_min_bytes = cls.PARALLEL_MIN_BYTES if parallel_min_bytes is None else parallel_min_bytes
+
+        trans_files = cls._get_transactions_files(trans_file, data_folder)
+        full_file_paths = [os.path.join(data_folder, data_file) for data_file in trans_files]
+
+        if workers > 1 and sum(os.path.getsize(file_path) for file_path in full_file_paths) >= parallel_min_bytes:
+            yield from cls._iter_transactions_parallel(full_file_paths, workers)
+            return
+
+        for data_file in trans_files:
+            for transactions in cls._read_file_chunks(data_file, data_folder, cls.CHUNK_ROWS):
+                yield cls._convert_transactions(transactions)
+
+    @staticmethod
+    def _get_transactions_files(trans_file: str, data_folder: str) -> list[str]:
+        """
+        Get the bookings file and its shards (e.g. bookings-2021.csv for bookings.csv) existing in the data folder.
+        """
+        stem, ext = os.path.splitext(trans_file)
+        shards = sorted(
+            os.path.basename(shard_path) for shard_path in glob.glob(os.path.join(data_folder, f'{stem}-*{ext}'))
+        )
 
-        return accounts, transactions
+        if shards and not os.path.isfile(os.path.join(data_folder, trans_file)):
+            return shards
+
+        return [trans_file] + shards
+
+    @classmethod
+    def _iter_transactions_parallel(cls, full_file_paths: list[str], workers: int) -> Iterator[pd.DataFrame]:
+        """
+        Parse the bookings files in a process pool, every worker converts a newline-aligned byte range of a file.
+
+        The ranges are yielded in the file order. Only a few ranges per worker are in flight at a time,
+        so the parsed but not yet consumed data stays bounded.
+        """
+        ranges = []
+        for file_path in full_file_paths:
+            ranges.extend(cls._split_file(file_path, workers * cls.PARALLEL_RANGES_PER_WORKER))
+
+        logger.info(f'Parsing {len(full_file_paths)} bookings file(s) in {len(ranges)} ranges with {workers} workers')
+
+        if not ranges:
+            yield cls._convert_transactions(pd.DataFrame(columns=TRANSACTIONS_CSV_COLUMNS))
+            return
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+        in_flight = deque()
+
+        try:
+            for file_range in ranges:
+                in_flight.append(executor.submit(_read_transactions_range, *file_range))
+
+                if len(in_flight) >= workers * cls.PARALLEL_RANGES_IN_FLIGHT_PER_WORKER:
+                    yield pd.DataFrame(in_flight.popleft().result(), copy=False)
+
+            while in_flight:
+                yield pd.DataFrame(in_flight.popleft().result(), copy=False)
+        except (pd.errors.DataError, pd.errors.EmptyDataError, pd.errors.ParserError) as ex:
+            logger.critical(f'Issue with loading data from csv files {full_file_paths}')
+            raise pd.errors.DataError(f'Issue with loading bookings data from csv files: {ex}')
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def _split_file(file_path: str, ranges_count: int) -> list[tuple[str, list[str], int, int]]:
+        """
+        Split a CSV file into byte ranges aligned to the line starts, the header line is excluded.
+
+        The rows must not contain quoted line breaks.
+
+        Returns:
+            list[tuple[str, list[str], int, int]]: The file path, the column names, the start and the end offset
+            of every range.
+        """
+        file_size = os.path.getsize(file_path)
+
+        with open(file_path, 'rb') as f:
+            header = f.readline()
+            columns = next(csv.reader([header.decode().strip()]), [])
+
+            bounds = [f.tell()]
+            step = (file_size - bounds[0]) // max(ranges_count, 1)
+            step = max(min(step, DataLoader.PARALLEL_MAX_RANGE_BYTES), DataLoader.PARALLEL_MIN_RANGE_BYTES, 1)
+
+            while bounds[-1] + step < file_size:
+                f.seek(bounds[-1] + step)
+                f.readline()
+                bounds.append(f.tell())
+
+            if bounds[-1] < file_size:
+                bounds.append(file_size)
+
+        return [(file_path, columns, start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    @staticmethod
+    def _parse_minor_units(amounts: pd.Series) -> pd.Series:
+        """
+        Parse decimal-comma amounts (e.g. "353,22", "-0,58", "14") into integer minor units (35322, -58, 1400).
+
+        Raises:
+            pd.errors.DataError: if an amount is not a number with at most AMOUNT_DECIMALS decimal places.
+        """
+        if amounts.empty:
+            return amounts.astype('int64')
+
+        amounts = amounts.astype(str).str.strip()
+
+        valid = amounts.str.fullmatch(rf'-?\d+(?:,\d{{1,{AMOUNT_DECIMALS}}})?')
+        if not valid.all():
+            raise pd.errors.DataError(f'Invalid amount "{amounts[~valid].iloc[0]}"')
+
+        # "427,9" -> 4279 * 10, "14" -> 14 * 100
+        comma_pos = amounts.str.find(',')
+        decimals = np.where(comma_pos >= 0, amounts.str.len() - comma_pos - 1, 0)
+        digits = pd.to_numeric(amounts.str.replace(',', '', regex=False))
+
+        return digits * 10 ** (AMOUNT_DECIMALS - decimals)
 
     @classmethod
     @log_function_call
-    def _read_file(cls, data_file: str) -> pd.DataFrame:
+    def _read_file(cls, data_file: str, data_folder: str = DATA_FOLDER) -> pd.DataFrame:
         """
         Read data from a CSV file in chunks and concatenate into a DataFrame.
 
         Args:
             data_file (str): The path to the CSV file.
+            data_folder (str): The folder the path is relative to.
 
         Returns:
             pd.DataFrame: The concatenated DataFrame.
         """
-        full_file_path = os.path.join(DATA_FOLDER, data_file)
+        CHUNK_SIZE = 1000
+        data = pd.concat(cls._read_file_chunks(data_file, data_folder, CHUNK_SIZE))
+
+        return data
+
+    @staticmethod
+    def _read_file_chunks(data_file: str, data_folder: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Read data from a CSV file chunk by chunk.
+
+        Args:
+            data_file (str): The path to the CSV file.
+            data_folder (str): The folder the path is relative to.
+            chunk_size (int): The number of rows in a chunk.
+
+        Yields:
+            pd.DataFrame: The chunks, the index continues from chunk to chunk.
+        """
+        full_file_path = os.path.join(data_folder, data_file)
 
         try:
-            CHUNK_SIZE = 1000
-            chunks = pd.read_csv(full_file_path, chunksize=CHUNK_SIZE, decimal=',')
-            data = pd.concat(chunks)
+            # Amounts are kept as strings to be parsed into exact minor units
+            with pd.read_csv(full_file_path, chunksize=chunk_size, decimal=',',
+                             dtype={TransactionModelColumns.AMOUNT: str}) as chunks:
+                yield from chunks
         except (pd.errors.DataError, pd.errors.EmptyDataError, pd.errors.ParserError) as ex:
             logger.critical(f'Issue with loading data from csv file "{full_file_path}"')
             err_msg = f'Issue with loading data from csv file "{data_file}": {ex}'
             raise pd.errors.DataError(err_msg)
 
-        return data
 
+TRANSACTIONS_CSV_COLUMNS = [
+    TransactionModelColumns.CODE,
+    TransactionModelColumns.TYPE,
+    TransactionModelColumns.AMOUNT,
+    TransactionModelColumns.DATE,
+]
+
+
+def _read_transactions_range(file_path: str, columns: list[str], start: int, end: int) -> dict[str, np.ndarray]:
+    """
+    Parse a byte range of a bookings CSV file into the physical transaction table columns (process pool worker).
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    if not data.strip():
+        transactions = pd.DataFrame(columns=columns)
+    else:
+        transactions = pd.read_csv(io.BytesIO(data), header=None, names=columns, decimal=',',
+                                   dtype={TransactionModelColumns.AMOUNT: str})
+
+    transactions = DataLoader._convert_transactions(transactions)
+
+    return {column_name: transactions[column_name].to_numpy() for column_name in transactions.columns}
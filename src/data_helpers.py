@@ -1,14 +1,18 @@
 import logging
-from typing import List
+import itertools
+from typing import List, Tuple, Iterator
 from datetime import date
 from abc import ABC, abstractmethod
-from sqlalchemy import text
+from sqlalchemy import Engine, select, text
 
 import src.utils as utils
-from src.models import TransactionWithAccount, Transaction, AppTables, TransactionType, AccountNature
-from src.data_adapters import SQLEngine
-from src.metrics import BaseFinanceMetrics
-from src.utils import log_function_call
+from src.models import (TransactionWithAccount, Transaction, AppTables, TransactionType, AccountNature,
+                        DailyTotalsColumns, TransactionDataColumns, transaction_select_sql)
+from src.data_adapters import SQLEngine, TransactionPartitions
+from src.metrics import BaseFinanceMetrics, create_account_metrics
+from src.utils import log_function_call, lazy_import
+
+np = lazy_import('numpy')
 
 
 class MonthDataBaseDataSource(ABC):
@@ -22,17 +26,19 @@ class TransactionsMonthData(MonthDataBaseDataSource):
     @classmethod
     @log_function_call
     def get(cls, date_info: date) -> List[TransactionWithAccount]:
-        date_start = utils.get_first_day_of_the_month(date_info)
-        date_end = utils.get_last_day_of_the_month(date_info)
+        month_key = utils.get_month_key(date_info)
 
         session = SQLEngine.get_session()
 
         with session:
-            result = (session.query(TransactionWithAccount)
-                      .filter(Transaction.transaction_date >= date_start,
-                              Transaction.transaction_date <= date_end))
+            partitions = TransactionPartitions.get(session.connection(), [month_key])
+            if not partitions:
+                return []
+
+            # Only the partition of the month is read, the columns are mapped to the model by position
+            stmt = text(transaction_select_sql(partitions[month_key])).columns(*Transaction.__table__.c)
 
-            month_transactions = [row for row in result]
+            month_transactions = session.scalars(select(TransactionWithAccount).from_statement(stmt)).all()
 
         return month_transactions
 
@@ -41,46 +47,31 @@ class MetricsMonthData(MonthDataBaseDataSource):
     @classmethod
     @log_function_call
     def get(cls, date_info: date) -> BaseFinanceMetrics:
-        date_start = utils.get_first_day_of_the_month(date_info)
-        date_end = utils.get_last_day_of_the_month(date_info)
-
         values = {
-            'income':     AccountNature.INCOME,
-            'expense':    AccountNature.EXPENSE,
-            'credit':     TransactionType.CREDIT,
-            'debit':      TransactionType.DEBIT,
-            'date_start': date_start,
-            'date_end':   date_end,
+            'income':    AccountNature.CODES[AccountNature.INCOME],
+            'expense':   AccountNature.CODES[AccountNature.EXPENSE],
         }
 
         engine = SQLEngine.get()
 
+        # The transaction type codes are the signs of the amounts, the amounts are integer minor units
         with engine.connect() as conn:
+            partitions = TransactionPartitions.get(conn, [utils.get_month_key(date_info)])
+            if not partitions:
+                return BaseFinanceMetrics()
+
             stmt = text(f'select '
                             f'basic_metrics.revenues,	'
                             f'basic_metrics.expenses,	'
                             f'(basic_metrics.revenues + basic_metrics.expenses) as profits, '
                             f'iif(basic_metrics.revenues != 0, '
-                                f'(basic_metrics.revenues + basic_metrics.expenses) * 100/basic_metrics.revenues, '
+                                f'(basic_metrics.revenues + basic_metrics.expenses) * 100.0/basic_metrics.revenues, '
                                 f'0) as margins '
                         f'from ('
                             f'select '
-                                f'sum(iif(month_trans.account_nature == :income and month_trans.transaction_type == :credit, '
-                                    f'month_trans.amount, '
-                                    f'iif(month_trans.account_nature == :income and month_trans.transaction_type == :debit, '
-                                        f'-month_trans.amount, 0))) as revenues, '
-                                f'sum(iif(month_trans.account_nature == :expense and month_trans.transaction_type == :credit, '
-                                    f'month_trans.amount, '
-                                    f'iif(month_trans.account_nature == :expense and month_trans.transaction_type == :debit, '
-                                        f'-month_trans.amount, 0))) as expenses '
-                            f'from ('
-                                f'select ts.*, ac.account_nature '
-                                f'from {AppTables.TRANSACTION} ts, {AppTables.ACCOUNT} ac '
-                                f'where '
-                                    f'ts.account_code = ac.account_code '
-                                    f'and ts.transaction_date >= :date_start '
-                                    f'and ts.transaction_date <= :date_end'
-                            f') month_trans'
+                                f'coalesce(sum(iif(ts.nature_code == :income, ts.type_code * ts.amount, 0)), 0) as revenues, '
+                                f'coalesce(sum(iif(ts.nature_code == :expense, ts.type_code * ts.amount, 0)), 0) as expenses '
+                            f'from {next(iter(partitions.values()))} ts'
                         f') basic_metrics')
 
             row = conn.execute(stmt, values).first()
@@ -93,3 +84,313 @@ class MetricsMonthData(MonthDataBaseDataSource):
 
         return metrics
 
+
+class DailyTotalsMonthData(MonthDataBaseDataSource):
+    """
+    Month metrics summed up from the daily totals aggregated at ingest, the bookings are not scanned.
+    """
+    @classmethod
+    @log_function_call
+    def get(cls, date_info: date) -> BaseFinanceMetrics:
+        values = {
+            'month_key': utils.get_month_key(date_info),
+        }
+
+        engine = SQLEngine.get()
+
+        with engine.connect() as conn:
+            stmt = text(f'select '
+                            f'coalesce(sum({DailyTotalsColumns.REVENUES}), 0) as revenues, '
+                            f'coalesce(sum({DailyTotalsColumns.EXPENSES}), 0) as expenses '
+                        f'from {AppTables.DAILY_TOTALS} '
+                        f'where {DailyTotalsColumns.MONTH_KEY} = :month_key')
+
+            row = conn.execute(stmt, values).first()
+
+        return _create_totals_metrics(row[0], row[1])
+
+
+class DailyIndexMonthData(MonthDataBaseDataSource):
+    """
+    Month metrics from the in-memory cumulative daily totals index, the database is not queried.
+    """
+    @classmethod
+    @log_function_call
+    def get(cls, date_info: date) -> BaseFinanceMetrics:
+        month_start = date_info.replace(day=1)
+        month_end = utils.get_last_day_of_the_month(month_start).date()
+
+        revenues, expenses = SQLEngine.get_daily_index().get(month_start, month_end)
+
+        return _create_totals_metrics(revenues, expenses)
+
+
+class RangeMetricsData:
+    """
+    Metrics of an arbitrary range of days from the cumulative daily totals index, two lookups per range.
+    """
+    @classmethod
+    @log_function_call
+    def get(cls, period: utils.DateRange) -> BaseFinanceMetrics:
+        revenues, expenses = SQLEngine.get_daily_index().get(period.start_date, period.end_date)
+
+        return _create_totals_metrics(revenues, expenses)
+
+
+class PeriodsMetricsMonthsData:
+    """
+    Metrics of whole-month periods from one grouped aggregation of the daily totals over all their months.
+    """
+    @classmethod
+    @log_function_call
+    def get(cls, *periods: utils.DateRange) -> List[BaseFinanceMetrics]:
+        """
+        Get the metrics of the periods, every period covers whole months.
+
+        Parameters:
+        - periods (utils.DateRange): The periods.
+
+        Returns:
+        - List[BaseFinanceMetrics]: The metrics of the periods in the same order.
+        """
+        periods_month_keys = [
+            range(utils.get_month_key(period.start_date), utils.get_month_key(period.end_date) + 1)
+            for period in periods
+        ]
+
+        values = {
+            'first_month_key': min(month_keys.start for month_keys in periods_month_keys),
+            'last_month_key':  max(month_keys.stop for month_keys in periods_month_keys) - 1,
+        }
+
+        engine = SQLEngine.get()
+
+        with engine.connect() as conn:
+            stmt = text(f'select '
+                            f'{DailyTotalsColumns.MONTH_KEY}, '
+                            f'sum({DailyTotalsColumns.REVENUES}) as revenues, '
+                            f'sum({DailyTotalsColumns.EXPENSES}) as expenses '
+                        f'from {AppTables.DAILY_TOTALS} '
+                        f'where {DailyTotalsColumns.MONTH_KEY} between :first_month_key and :last_month_key '
+                        f'group by {DailyTotalsColumns.MONTH_KEY}')
+
+            months_totals = {month_key: (revenues, expenses) for month_key, revenues, expenses in conn.execute(stmt, values)}
+
+        periods_metrics = []
+        for month_keys in periods_month_keys:
+            # The month key ranges include the keys like 202013, they are never found
+            totals = [months_totals[month_key] for month_key in month_keys if month_key in months_totals]
+            periods_metrics.append(_create_totals_metrics(sum(revenues for revenues, _ in totals),
+                                                          sum(expenses for _, expenses in totals)))
+
+        return periods_metrics
+
+
+def _create_totals_metrics(revenues: int, expenses: int) -> BaseFinanceMetrics:
+    metrics = BaseFinanceMetrics()
+    metrics.revenue = revenues
+    metrics.expenses = expenses
+    metrics.profit = metrics.revenue + metrics.expenses
+    if metrics.revenue != 0:
+        metrics.margin = metrics.profit * 100.0 / metrics.revenue
+
+    return metrics
+
+
+class AccountsMetricsMonthsData:
+    """
+    Per-account revenues and expenses for two months, computed with one grouped aggregation over both months.
+    """
+    @classmethod
+    @log_function_call
+    def get(cls, first_date: date, second_date: date) -> List[Tuple[int, str, BaseFinanceMetrics, BaseFinanceMetrics]]:
+        """
+        Get the metrics of every account with bookings in either of the two months.
+
+        Parameters:
+        - first_date (date): A date within the first month.
+        - second_date (date): A date within the second month.
+
+        Returns:
+        - List[Tuple[int, str, BaseFinanceMetrics, BaseFinanceMetrics]]: account code, account nature and
+          the metrics for the first and the second month, ordered by account code.
+        """
+        natures = {code: nature for nature, code in AccountNature.CODES.items()}
+
+        accounts = [
+            (account_code,
+             natures[nature_code],
+             create_account_metrics(natures[nature_code], first_amount),
+             create_account_metrics(natures[nature_code], second_amount))
+            for account_code, nature_code, first_amount, second_amount in get_accounts_amounts(first_date, second_date)
+        ]
+
+        return accounts
+
+
+class AccountsAmountsMonthsData:
+    """
+    Per-account amounts for two months as arrays, for the selections over all the accounts.
+    """
+    @classmethod
+    @log_function_call
+    def get(cls, first_date: date, second_date: date) -> 'np.ndarray':
+        """
+        Get the amounts of every account with bookings in either of the two months.
+
+        Parameters:
+        - first_date (date): A date within the first month.
+        - second_date (date): A date within the second month.
+
+        Returns:
+        - np.ndarray: A row per account ordered by account code, the columns are the account code, the account nature
+          code and the amounts of the first and the second month in minor units.
+        """
+        rows = get_accounts_amounts(first_date, second_date)
+
+        return np.array(rows, dtype=np.int64).reshape(len(rows), 4)
+
+
+def get_accounts_amounts(first_date: date, second_date: date) -> List[Tuple[int, int, int, int]]:
+    """
+    Get the amounts of every income and expense account with bookings in either of the two months, with one grouped
+    aggregation over the partitions of both months.
+
+    Returns:
+    - List[Tuple[int, int, int, int]]: account code, account nature code and the amounts of the first and the second
+      month in minor units, ordered by account code.
+    """
+    values = {
+        'income':           AccountNature.CODES[AccountNature.INCOME],
+        'expense':          AccountNature.CODES[AccountNature.EXPENSE],
+        'first_month_key':  utils.get_month_key(first_date),
+        'second_month_key': utils.get_month_key(second_date),
+    }
+
+    engine = SQLEngine.get()
+
+    # The transaction type codes are the signs of the amounts, the amounts are integer minor units
+    with engine.connect() as conn:
+        partitions = TransactionPartitions.get(conn, list({values['first_month_key'], values['second_month_key']}))
+        if not partitions:
+            return []
+
+        # Only the partitions of the two months are read
+        month_transactions = ' union all '.join(
+            f'select account_code, nature_code, type_code, amount, month_key from {partition}'
+            for partition in partitions.values()
+        )
+
+        stmt = text(f'select '
+                        f'ts.account_code, '
+                        f'ts.nature_code, '
+                        f'sum(iif(ts.month_key = :first_month_key, ts.type_code * ts.amount, 0)) as first_amount, '
+                        f'sum(iif(ts.month_key = :second_month_key, ts.type_code * ts.amount, 0)) as second_amount '
+                    f'from ({month_transactions}) ts '
+                    f'where '
+                        f'ts.nature_code in (:income, :expense) '
+                    f'group by ts.account_code, ts.nature_code '
+                    f'order by ts.account_code')
+
+        rows = conn.execute(stmt, values).all()
+
+    return [tuple(row) for row in rows]
+
+
+class TransactionsListData:
+    """
+    The bookings ordered by (transaction_date, id) with keyset pagination.
+
+    A page starts right after the (transaction_date, id) of the last booking of the previous page, it is read
+    from the (day, id) index of the month partition, so the deep pages cost the same as the first one.
+    """
+    # The columns of the rows: the transaction date is stored as the month key and the day
+    COLUMNS = ('id', TransactionDataColumns.MONTH_KEY, TransactionDataColumns.DAY, TransactionDataColumns.CODE,
+               TransactionDataColumns.NATURE_CODE, TransactionDataColumns.TYPE_CODE, TransactionDataColumns.AMOUNT)
+
+    @classmethod
+    @log_function_call
+    def get(cls,
+            month_date: date | None = None,
+            account_code: int | None = None,
+            nature: str | None = None,
+            after: Tuple[date, int] | None = None,
+            limit: int = 100) -> List[tuple]:
+        """
+        Get a page of the bookings.
+
+        Parameters:
+        - month_date (date | None): A date within the month of the bookings, all the months if None.
+        - account_code (int | None): The account of the bookings.
+        - nature (str | None): The nature of the accounts of the bookings, one of the AccountNature values.
+        - after (Tuple[date, int] | None): The transaction date and the id of the last booking of the previous page.
+        - limit (int): The page size.
+
+        Returns:
+        - List[tuple]: The bookings as rows of COLUMNS.
+        """
+        return list(itertools.islice(cls.iter(month_date, account_code, nature, after, batch_rows=limit), limit))
+
+    @classmethod
+    def iter(cls,
+             month_date: date | None = None,
+             account_code: int | None = None,
+             nature: str | None = None,
+             after: Tuple[date, int] | None = None,
+             batch_rows: int = 10000,
+             sql_engine: Engine | None = None) -> Iterator[tuple]:
+        """
+        Iterate over the bookings, they are read batch by batch with the keyset of the last booking read,
+        the memory used does not depend on the number of the bookings.
+
+        Parameters:
+        - batch_rows (int): The number of the bookings read at once.
+        - sql_engine (Engine | None): The engine of the store, of the store of the current context if None.
+
+        Yields:
+        - tuple: The bookings as rows of COLUMNS.
+        """
+        sql_engine = sql_engine or SQLEngine.get()
+
+        conditions = []
+        values = {'limit': batch_rows}
+
+        if account_code is not None:
+            conditions.append(f'{TransactionDataColumns.CODE} = :account_code')
+            values['account_code'] = account_code
+        if nature is not None:
+            conditions.append(f'{TransactionDataColumns.NATURE_CODE} = :nature_code')
+            values['nature_code'] = AccountNature.CODES.get(nature, 0)
+
+        with sql_engine.connect() as conn:
+            month_keys = TransactionPartitions.month_keys(conn)
+            if month_date is not None:
+                month_keys = [month_key for month_key in month_keys if month_key == utils.get_month_key(month_date)]
+            if after is not None:
+                month_keys = [month_key for month_key in month_keys if month_key >= utils.get_month_key(after[0])]
+
+            partitions = TransactionPartitions.get(conn, month_keys)
+
+        keyset = f'{TransactionDataColumns.DAY}, id'
+
+        for month_key in month_keys:
+            last = (after[0].day, after[1]) if after is not None and utils.get_month_key(after[0]) == month_key else None
+
+            while True:
+                stmt = text(f'select {", ".join(cls.COLUMNS)} '
+                            f'from {partitions[month_key]} '
+                            f'where {" and ".join(conditions + [f"({keyset}) > (:last_day, :last_id)"])} '
+                            f'order by {keyset} '
+                            f'limit :limit')
+
+                last_day, last_id = last if last is not None else (0, -1)
+
+                with sql_engine.connect() as conn:
+                    rows = conn.execute(stmt, dict(values, last_day=last_day, last_id=last_id)).all()
+
+                yield from (tuple(row) for row in rows)
+
+                if len(rows) < batch_rows:
+                    break
+
+                last = (rows[-1][2], rows[-1][0])
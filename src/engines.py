@@ -0,0 +1,148 @@
+import time
+import logging
+from datetime import date
+from dataclasses import dataclass
+
+import src.config as cfg
+import src.metrics as fm
+import src.data_helpers as dh
+from src.controllers import FinanceReportServiceController
+from src.data_adapters import SQLEngine, TransactionPartitions
+from src.utils import log_function_call, add_months
+
+
+logger = logging.getLogger(cfg.LOGGER_NAME)
+
+
+@dataclass(frozen=True)
+class ReportEngine:
+    """
+    A month data source with the metrics calculator of its data.
+    """
+    name: str
+    data_source: type[dh.MonthDataBaseDataSource]
+    calculator: type[fm.BaseMetricsCalculator]
+
+    def create_controller(self) -> FinanceReportServiceController:
+        return FinanceReportServiceController(
+            data_source_class=self.data_source,
+            metrics_calculator_calc=self.calculator
+        )
+
+
+class ReportEngines:
+    """
+    Registry of the engines of the month reports, selected by name.
+
+    The engine is configured with APP_REPORT_ENGINE and can be overridden per request. The auto engine is the
+    fastest of AUTO_CANDIDATES measured on the largest month of the data when the data is loaded (see
+    DataLoader.load), the requests use the engine selected for their store; the datasets below AUTO_MIN_ROWS
+    bookings use the SQL aggregate without measuring.
+    """
+    SQL = 'sql'
+    TRANSACTIONS = 'transactions'
+    DAILY_TOTALS = 'daily_totals'
+    DAILY_INDEX = 'daily_index'
+    AUTO = 'auto'
+
+    AUTO_CANDIDATES = (SQL, DAILY_TOTALS, DAILY_INDEX)
+    AUTO_MIN_ROWS: int = cfg.REPORT_ENGINE_AUTO_MIN_ROWS
+    AUTO_MEASURE_RUNS: int = 3
+
+    _default: str = cfg.REPORT_ENGINE
+    _engines: dict[str, ReportEngine] = {}
+
+    @classmethod
+    def register(cls, name: str, data_source: type[dh.MonthDataBaseDataSource],
+                 calculator: type[fm.BaseMetricsCalculator]) -> None:
+        cls._engines[name] = ReportEngine(name, data_source, calculator)
+
+    @classmethod
+    def names(cls) -> list[str]:
+        return list(cls._engines) + [cls.AUTO]
+
+    @classmethod
+    def configure(cls, name: str) -> None:
+        """
+        Change the engine used by the requests without an override.
+
+        Raises:
+        - ValueError: if there is no such engine.
+        """
+        cls._check_name(name)
+        cls._default = name
+
+    @classmethod
+    def get(cls, name: str | None = None) -> ReportEngine:
+        """
+        Get the engine by name, the configured engine without a name. The auto engine is resolved for the data
+        store of the current context.
+
+        Raises:
+        - ValueError: if there is no such engine.
+        """
+        name = name or cls._default
+        cls._check_name(name)
+
+        if name == cls.AUTO:
+            name = cls._get_auto_name()
+
+        return cls._engines[name]
+
+    @classmethod
+    def _check_name(cls, name: str) -> None:
+        if name not in cls._engines and name != cls.AUTO:
+            raise ValueError(f'Unknown report engine "{name}", expected one of: {", ".join(cls.names())}')
+
+    @classmethod
+    def _get_auto_name(cls) -> str:
+        # A store loaded before the engine was measured on load serves the SQL aggregate
+        return SQLEngine.store().get_auto_engine() or cls.SQL
+
+    @classmethod
+    @log_function_call
+    def select_auto_name(cls) -> str:
+        """
+        Measure the candidate engines on the data store of the current context and get the fastest one.
+        """
+        with SQLEngine.get().connect() as conn:
+            month_sizes = TransactionPartitions.sizes(conn)
+
+        rows = sum(month_sizes.values())
+        if rows < cls.AUTO_MIN_ROWS:
+            logger.info(f'Report engine: {cls.SQL} for {rows} bookings')
+            return cls.SQL
+
+        # The largest month against the month before it, the costliest report of the data
+        month_key = max(month_sizes, key=month_sizes.get)
+        first_date = date(month_key // 100, month_key % 100, 1)
+        second_date = add_months(first_date, -1)
+
+        seconds = {name: cls._measure(cls._engines[name], first_date, second_date) for name in cls.AUTO_CANDIDATES}
+        name = min(seconds, key=seconds.get)
+
+        logger.info(f'Report engine: {name} for {rows} bookings, measured seconds: {seconds}')
+
+        return name
+
+    @classmethod
+    def _measure(cls, engine: ReportEngine, first_date: date, second_date: date) -> float:
+        controller = engine.create_controller()
+
+        best = float('inf')
+        for _ in range(cls.AUTO_MEASURE_RUNS):
+            start = time.perf_counter()
+            controller.calculate_metrics(first_date, second_date)
+            best = min(best, time.perf_counter() - start)
+
+        return best
+
+
+# SQL aggregate over the month partition
+ReportEngines.register(ReportEngines.SQL, dh.MetricsMonthData, fm.FinanceMetricsSimpleCalculator)
+# The bookings of the month summed up row by row in Python
+ReportEngines.register(ReportEngines.TRANSACTIONS, dh.TransactionsMonthData, fm.FinanceMetricsExtCalculator)
+# SQL aggregate over the daily totals of the month
+ReportEngines.register(ReportEngines.DAILY_TOTALS, dh.DailyTotalsMonthData, fm.FinanceMetricsSimpleCalculator)
+# Two lookups in the in-memory cumulative daily totals
+ReportEngines.register(ReportEngines.DAILY_INDEX, dh.DailyIndexMonthData, fm.FinanceMetricsSimpleCalculator)
@@ -1,19 +1,167 @@
 from datetime import date
+from decimal import Decimal
+from typing import List, Optional, Union
+from abc import ABC, abstractmethod
+
+import orjson
+
 import src.utils as utils
 import src.metrics as fm
+from src.models import AMOUNT_DECIMALS, AMOUNT_MINOR_UNITS, AccountNature, TransactionType
 from src.utils import log_function_call
 
 
-class FinanceReportFormatter:
+class ReportFormat:
     """
-    A class responsible for formatting finance report metrics into a raw data string.
+    Enumeration defining supported report output formats.
+    """
+    CSV = 'csv'
+    JSON = 'json'
+    ARROW = 'arrow'
+
+    MEDIA_TYPES = {
+        CSV:   'text/csv',
+        JSON:  'application/json',
+        ARROW: 'application/vnd.apache.arrow.stream',
+    }
+
+    @classmethod
+    def negotiate(cls, accept: Optional[str] = None, requested: Optional[str] = None) -> Optional[str]:
+        """
+        Choose the report format for a request.
+
+        An explicitly requested format (e.g. the `format` query parameter) wins over the Accept header.
+        Accept header entries are honoured by their q-value, CSV is used for wildcards and missing header.
+
+        Parameters:
+        - accept (str): The value of the Accept request header.
+        - requested (str): The explicitly requested format name.
+
+        Returns:
+        - str: One of the format names, or None if none of the formats is acceptable.
+        """
+        if requested:
+            requested = requested.lower()
+            return requested if requested in cls.MEDIA_TYPES else None
+
+        if not accept:
+            return cls.CSV
+
+        media_formats = {media_type: report_format for report_format, media_type in cls.MEDIA_TYPES.items()}
+
+        candidates = []
+        for position, item in enumerate(accept.split(',')):
+            media_type, *params = [part.strip() for part in item.split(';')]
+            quality = 1.0
+            for param in params:
+                name, _, value = param.partition('=')
+                if name.strip() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+
+            if quality <= 0:
+                continue
+
+            if media_type in media_formats:
+                candidates.append((-quality, position, media_formats[media_type]))
+            elif media_type in ('*/*', 'text/*'):
+                candidates.append((-quality, position, cls.CSV))
+            elif media_type == 'application/*':
+                candidates.append((-quality, position, cls.JSON))
+
+        if not candidates:
+            return None
+
+        return min(candidates)[2]
+
+
+class BaseReportFormatter(ABC):
+    """
+    Base class for formatting finance report metrics into a response body.
     """
+    REPORT_FORMAT: str = None
 
     REVENUES: str = 'Revenues'
     EXPENSES: str = 'Expenses'
     PROFITS: str = 'Profits'
     MARGINS: str = 'Margins'
 
+    @classmethod
+    def media_type(cls) -> str:
+        return ReportFormat.MEDIA_TYPES[cls.REPORT_FORMAT]
+
+    @classmethod
+    @abstractmethod
+    def format(cls, metrics: fm.FinanceReportMetrics) -> Union[str, bytes]:
+        pass
+
+    @staticmethod
+    def _to_decimal(minor_units: int) -> Decimal:
+        """
+        Convert an amount in minor units into an exact decimal number, e.g. 35322 into 353.22.
+        """
+        return Decimal(minor_units).scaleb(-AMOUNT_DECIMALS)
+
+    @staticmethod
+    def _to_number(minor_units: int) -> float:
+        """
+        Convert an amount in minor units into the nearest float, e.g. 35322 into 353.22.
+        """
+        return minor_units / AMOUNT_MINOR_UNITS
+
+    @classmethod
+    def _metric_values(cls, metrics: fm.BaseFinanceMetrics, percentages: bool = False) -> List[float]:
+        """
+        Get the metric values in the report row order (Revenues, Expenses, Profits, Margins).
+
+        The amounts are converted from minor units unless all the values are percentages.
+        """
+        if percentages:
+            return [metrics.revenue, metrics.expenses, metrics.profit, metrics.margin]
+
+        return [cls._to_number(metrics.revenue), cls._to_number(metrics.expenses), cls._to_number(metrics.profit),
+                metrics.margin]
+
+    @classmethod
+    def _period_label(cls, metrics: fm.MonthFinanceMetrics | fm.PeriodFinanceMetrics) -> str:
+        """
+        Get the label of the report period, e.g. 2020-06 for a month, 2020-04..2020-06 for whole months
+        or 2020-06-01..2020-06-15 for a range of days.
+        """
+        if isinstance(metrics, fm.PeriodFinanceMetrics):
+            months = cls._get_whole_months(metrics.period)
+            if months is None:
+                return str(metrics.period)
+
+            first_month, last_month = (month.strftime('%Y-%m') for month in months)
+            return first_month if first_month == last_month else f'{first_month}..{last_month}'
+
+        return metrics.month_date.strftime('%Y-%m')
+
+    @staticmethod
+    def _get_whole_months(period: utils.DateRange) -> tuple[date, date] | None:
+        """
+        Get the first and the last month of a range of whole months, None if the range is not made of whole months.
+        """
+        if (period.start_date.day != 1 or
+                period.end_date != utils.get_last_day_of_the_month(period.end_date.replace(day=1)).date()):
+            return None
+
+        return period.start_date, period.end_date.replace(day=1)
+
+    @staticmethod
+    def _is_single_month(months: tuple[date, date] | None) -> bool:
+        return months is not None and months[0] == months[1]
+
+
+class FinanceReportFormatter(BaseReportFormatter):
+    """
+    A class responsible for formatting finance report metrics into a raw data string.
+    """
+    REPORT_FORMAT: str = ReportFormat.CSV
+
     @classmethod
     @log_function_call
     def format(cls, metrics: fm.FinanceReportMetrics) -> str:
@@ -26,29 +174,42 @@ class FinanceReportFormatter:
         Returns:
             str: The formatted raw data string.
         """
-        header = cls._format_header(
-            metrics.first_month.month_date,
-            metrics.second_month.month_date
-        )
+        if isinstance(metrics.first_month, fm.PeriodFinanceMetrics):
+            first_months = cls._get_whole_months(metrics.first_month.period)
+            second_months = cls._get_whole_months(metrics.second_month.period)
+
+            if cls._is_single_month(first_months) and cls._is_single_month(second_months):
+                # The whole months are labelled as in the month report
+                header = cls._format_header(first_months[0], second_months[0])
+            else:
+                header = cls._format_periods_header(
+                    cls._period_label(metrics.first_month),
+                    cls._period_label(metrics.second_month)
+                )
+        else:
+            header = cls._format_header(
+                metrics.first_month.month_date,
+                metrics.second_month.month_date
+            )
 
         revenues = cls._format_revenues(
-            metrics.first_month.revenue,
-            metrics.second_month.revenue,
-            metrics.absolute_diff.revenue,
+            cls._to_decimal(metrics.first_month.revenue),
+            cls._to_decimal(metrics.second_month.revenue),
+            cls._to_decimal(metrics.absolute_diff.revenue),
             metrics.percent_diff.revenue
         )
 
         expenses = cls._format_expenses(
-            metrics.first_month.expenses,
-            metrics.second_month.expenses,
-            metrics.absolute_diff.expenses,
+            cls._to_decimal(metrics.first_month.expenses),
+            cls._to_decimal(metrics.second_month.expenses),
+            cls._to_decimal(metrics.absolute_diff.expenses),
             metrics.percent_diff.expenses,
         )
 
         profits = cls._format_profits(
-            metrics.first_month.profit,
-            metrics.second_month.profit,
-            metrics.absolute_diff.profit,
+            cls._to_decimal(metrics.first_month.profit),
+            cls._to_decimal(metrics.second_month.profit),
+            cls._to_decimal(metrics.absolute_diff.profit),
             metrics.percent_diff.profit
         )
 
@@ -85,6 +246,25 @@ class FinanceReportFormatter:
 
         return val
 
+    @classmethod
+    def _format_periods_header(cls, first_period: str, second_period: str):
+        """
+        Format the header of the finance report for two ranges of days.
+
+        Args:
+            first_period (str): The label of the first range of days.
+            second_period (str): The label of the second range of days.
+
+        Returns:
+            str: The formatted header string.
+        """
+        val = (f',"{first_period}"'
+               f',"{second_period}"'
+               f',"{first_period} vs {second_period} (Abs)"'
+               f',"{first_period} vs {second_period} (%)"\n')
+
+        return val
+
     @classmethod
     def _format_revenues(cls, col1, col2, col3, col4):
         """
@@ -185,3 +365,642 @@ class FinanceReportFormatter:
                f',{col4:.1f}%\n')
 
         return val
+
+
+class FinanceReportJSONFormatter(BaseReportFormatter):
+    """
+    A class responsible for serializing finance report metrics into JSON.
+
+    The metric values are written as JSON numbers, so clients do not have to parse them back from strings.
+    """
+    REPORT_FORMAT: str = ReportFormat.JSON
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.FinanceReportMetrics) -> bytes:
+        """
+        Format the given finance report metrics into a JSON document.
+
+        Args:
+            metrics (fm.FinanceReportMetrics): The finance report metrics.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        obj = {
+            'first_month':   cls._period_as_dict(metrics.first_month),
+            'second_month':  cls._period_as_dict(metrics.second_month),
+            'absolute_diff': cls._metrics_as_dict(metrics.absolute_diff),
+            'percent_diff':  cls._metrics_as_dict(metrics.percent_diff, percentages=True),
+        }
+
+        return orjson.dumps(obj)
+
+    @classmethod
+    def _period_as_dict(cls, metrics: fm.MonthFinanceMetrics | fm.PeriodFinanceMetrics) -> dict:
+        if isinstance(metrics, fm.PeriodFinanceMetrics):
+            obj = {'start': metrics.period.start_date.isoformat(), 'end': metrics.period.end_date.isoformat()}
+            if cls._get_whole_months(metrics.period) is not None:
+                obj = {'month': cls._period_label(metrics), **obj}
+        else:
+            obj = {'month': metrics.month_date.strftime('%Y-%m')}
+        obj.update(cls._metrics_as_dict(metrics))
+        return obj
+
+    @classmethod
+    def _metrics_as_dict(cls, metrics: fm.BaseFinanceMetrics, percentages: bool = False) -> dict:
+        revenue, expenses, profit, margin = cls._metric_values(metrics, percentages)
+        obj = {
+            'revenue':  revenue,
+            'expenses': expenses,
+            'profit':   profit,
+            'margin':   margin,
+        }
+        return obj
+
+
+class FinanceReportArrowFormatter(BaseReportFormatter):
+    """
+    A class responsible for serializing finance report metrics into an Arrow IPC stream.
+
+    The table has the same layout as the CSV report: one row per metric and one float64 column per report column.
+    """
+    REPORT_FORMAT: str = ReportFormat.ARROW
+
+    FIRST_MONTH: str = 'first_month'
+    SECOND_MONTH: str = 'second_month'
+    ABSOLUTE_DIFF: str = 'absolute_diff'
+    PERCENT_DIFF: str = 'percent_diff'
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.FinanceReportMetrics) -> bytes:
+        """
+        Format the given finance report metrics into an Arrow IPC stream.
+
+        Args:
+            metrics (fm.FinanceReportMetrics): The finance report metrics.
+
+        Returns:
+            bytes: The Arrow IPC stream.
+        """
+        import pyarrow as pa
+
+        table = pa.table(
+            {
+                'metric':          [cls.REVENUES, cls.EXPENSES, cls.PROFITS, cls.MARGINS],
+                cls.FIRST_MONTH:   pa.array(cls._metric_values(metrics.first_month), type=pa.float64()),
+                cls.SECOND_MONTH:  pa.array(cls._metric_values(metrics.second_month), type=pa.float64()),
+                cls.ABSOLUTE_DIFF: pa.array(cls._metric_values(metrics.absolute_diff), type=pa.float64()),
+                cls.PERCENT_DIFF:  pa.array(cls._metric_values(metrics.percent_diff, percentages=True), type=pa.float64()),
+            },
+            metadata={
+                cls.FIRST_MONTH:  cls._period_label(metrics.first_month),
+                cls.SECOND_MONTH: cls._period_label(metrics.second_month),
+            }
+        )
+
+        return cls._to_ipc_stream(table)
+
+    @staticmethod
+    def _to_ipc_stream(table) -> bytes:
+        import pyarrow as pa
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        return sink.getvalue().to_pybytes()
+
+
+class AccountsReportFormatter(BaseReportFormatter):
+    """
+    A class responsible for formatting per-account finance report metrics into a CSV string.
+
+    Every row holds the revenues and the expenses columns of one account.
+    """
+    REPORT_FORMAT: str = ReportFormat.CSV
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.AccountsReportMetrics) -> str:
+        """
+        Format the given per-account finance report metrics into a raw data string.
+
+        Args:
+            metrics (fm.AccountsReportMetrics): The per-account finance report metrics.
+
+        Returns:
+            str: The formatted raw data string.
+        """
+        rows = [cls._format_header(metrics.first_month_date, metrics.second_month_date)]
+
+        for account in metrics.accounts:
+            revenues = FinanceReportFormatter._format_by_default(
+                cls._to_decimal(account.first_month.revenue),
+                cls._to_decimal(account.second_month.revenue),
+                cls._to_decimal(account.absolute_diff.revenue),
+                account.percent_diff.revenue
+            )
+            expenses = FinanceReportFormatter._format_by_default(
+                cls._to_decimal(account.first_month.expenses),
+                cls._to_decimal(account.second_month.expenses),
+                cls._to_decimal(account.absolute_diff.expenses),
+                account.percent_diff.expenses
+            )
+            rows.append(f'{account.account_code},{account.account_nature}{revenues.rstrip()}{expenses}')
+
+        return ''.join(rows)
+
+    @classmethod
+    def _format_header(cls, first_month_date: date, second_month_date: date) -> str:
+        """
+        Format the header of the per-account finance report.
+
+        Args:
+            first_month_date (date): The date of the first month.
+            second_month_date (date): The date of the second month.
+
+        Returns:
+            str: The formatted header string.
+        """
+        first_month_name = utils.get_month_name(first_month_date)
+        second_month_name = utils.get_month_name(second_month_date)
+
+        val = 'account_code,account_nature'
+        for metric_name in (cls.REVENUES, cls.EXPENSES):
+            val += (f',"{first_month_name}, {first_month_date.year} {metric_name}"'
+                    f',"{second_month_name}, {second_month_date.year} {metric_name}"'
+                    f',"{first_month_name} vs {second_month_name}, {first_month_date.year} {metric_name} (Abs)"'
+                    f',"{first_month_name} vs {second_month_name}, {first_month_date.year} {metric_name} (%)"')
+
+        return val + '\n'
+
+
+class AccountsReportJSONFormatter(BaseReportFormatter):
+    """
+    A class responsible for serializing per-account finance report metrics into JSON.
+    """
+    REPORT_FORMAT: str = ReportFormat.JSON
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.AccountsReportMetrics) -> bytes:
+        """
+        Format the given per-account finance report metrics into a JSON document.
+
+        Args:
+            metrics (fm.AccountsReportMetrics): The per-account finance report metrics.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        obj = {
+            'first_month':  metrics.first_month_date.strftime('%Y-%m'),
+            'second_month': metrics.second_month_date.strftime('%Y-%m'),
+            'accounts': [
+                {
+                    'account_code':   account.account_code,
+                    'account_nature': account.account_nature,
+                    'first_month':    cls._account_metrics_as_dict(account.first_month),
+                    'second_month':   cls._account_metrics_as_dict(account.second_month),
+                    'absolute_diff':  cls._account_metrics_as_dict(account.absolute_diff),
+                    'percent_diff':   cls._account_metrics_as_dict(account.percent_diff, percentages=True),
+                }
+                for account in metrics.accounts
+            ],
+        }
+
+        return orjson.dumps(obj)
+
+    @classmethod
+    def _account_metrics_as_dict(cls, metrics: fm.BaseFinanceMetrics, percentages: bool = False) -> dict:
+        if percentages:
+            return {'revenue': metrics.revenue, 'expenses': metrics.expenses}
+
+        return {'revenue': cls._to_number(metrics.revenue), 'expenses': cls._to_number(metrics.expenses)}
+
+
+class AccountsReportArrowFormatter(BaseReportFormatter):
+    """
+    A class responsible for serializing per-account finance report metrics into an Arrow IPC stream.
+
+    The table has one row per account, the columns are named `<report column>_<metric>`, e.g. `first_month_revenue`.
+    """
+    REPORT_FORMAT: str = ReportFormat.ARROW
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.AccountsReportMetrics) -> bytes:
+        """
+        Format the given per-account finance report metrics into an Arrow IPC stream.
+
+        Args:
+            metrics (fm.AccountsReportMetrics): The per-account finance report metrics.
+
+        Returns:
+            bytes: The Arrow IPC stream.
+        """
+        import pyarrow as pa
+
+        columns = {
+            'account_code':   pa.array([account.account_code for account in metrics.accounts], type=pa.int64()),
+            'account_nature': pa.array([account.account_nature for account in metrics.accounts], type=pa.string()),
+        }
+
+        for column_name in (FinanceReportArrowFormatter.FIRST_MONTH, FinanceReportArrowFormatter.SECOND_MONTH,
+                            FinanceReportArrowFormatter.ABSOLUTE_DIFF, FinanceReportArrowFormatter.PERCENT_DIFF):
+            for metric_name in ('revenue', 'expenses'):
+                values = [getattr(getattr(account, column_name), metric_name) for account in metrics.accounts]
+                if column_name != FinanceReportArrowFormatter.PERCENT_DIFF:
+                    values = [cls._to_number(value) for value in values]
+
+                columns[f'{column_name}_{metric_name}'] = pa.array(values, type=pa.float64())
+
+        table = pa.table(
+            columns,
+            metadata={
+                FinanceReportArrowFormatter.FIRST_MONTH:  metrics.first_month_date.strftime('%Y-%m'),
+                FinanceReportArrowFormatter.SECOND_MONTH: metrics.second_month_date.strftime('%Y-%m'),
+            }
+        )
+
+        return FinanceReportArrowFormatter._to_ipc_stream(table)
+
+
+class BaseMoversReportFormatter(BaseReportFormatter):
+    """
+    Base class for formatting the movers: a row per selected account, the accounts selected by the absolute change
+    first, then the ones selected by the percentage change. The amount of an account is its revenue or its expenses.
+    """
+    BY_ABSOLUTE_DIFF: str = 'abs'
+    BY_PERCENT_DIFF: str = 'pct'
+
+    COLUMNS = ('ranking', 'account_code', 'account_nature', 'first_month', 'second_month', 'absolute_diff',
+               'percent_diff')
+
+    @classmethod
+    def _rows(cls, metrics: fm.AccountsMoversMetrics):
+        """
+        Yield the rows of COLUMNS, the amounts in minor units.
+        """
+        for ranking, accounts in ((cls.BY_ABSOLUTE_DIFF, metrics.by_absolute_diff),
+                                  (cls.BY_PERCENT_DIFF, metrics.by_percent_diff)):
+            for account in accounts:
+                name = 'revenue' if account.account_nature == AccountNature.INCOME else 'expenses'
+                yield (ranking, account.account_code, account.account_nature,
+                       getattr(account.first_month, name), getattr(account.second_month, name),
+                       getattr(account.absolute_diff, name), getattr(account.percent_diff, name))
+
+
+class MoversReportFormatter(BaseMoversReportFormatter):
+    """
+    A class responsible for formatting the movers into a CSV string.
+    """
+    REPORT_FORMAT: str = ReportFormat.CSV
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.AccountsMoversMetrics) -> str:
+        """
+        Format the movers into a raw data string.
+
+        Args:
+            metrics (fm.AccountsMoversMetrics): The movers.
+
+        Returns:
+            str: The formatted raw data string.
+        """
+        lines = [f'{",".join(cls.COLUMNS)}\n']
+
+        lines.extend(
+            f'{ranking},{account_code},{account_nature},{cls._to_decimal(first_amount)},'
+            f'{cls._to_decimal(second_amount)},{cls._to_decimal(absolute_diff)},{percent_diff:.1f}%\n'
+            for ranking, account_code, account_nature, first_amount, second_amount, absolute_diff, percent_diff
+            in cls._rows(metrics)
+        )
+
+        return ''.join(lines)
+
+
+class MoversReportJSONFormatter(BaseMoversReportFormatter):
+    """
+    A class responsible for serializing the movers into JSON.
+    """
+    REPORT_FORMAT: str = ReportFormat.JSON
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.AccountsMoversMetrics) -> bytes:
+        """
+        Format the movers into a JSON document.
+
+        Args:
+            metrics (fm.AccountsMoversMetrics): The movers.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        rankings = {cls.BY_ABSOLUTE_DIFF: [], cls.BY_PERCENT_DIFF: []}
+
+        for ranking, account_code, account_nature, first_amount, second_amount, absolute_diff, percent_diff \
+                in cls._rows(metrics):
+            rankings[ranking].append({
+                'account_code':   account_code,
+                'account_nature': account_nature,
+                'first_month':    cls._to_number(first_amount),
+                'second_month':   cls._to_number(second_amount),
+                'absolute_diff':  cls._to_number(absolute_diff),
+                'percent_diff':   percent_diff,
+            })
+
+        obj = {
+            'first_month':      metrics.first_month_date.strftime('%Y-%m'),
+            'second_month':     metrics.second_month_date.strftime('%Y-%m'),
+            'by_absolute_diff': rankings[cls.BY_ABSOLUTE_DIFF],
+            'by_percent_diff':  rankings[cls.BY_PERCENT_DIFF],
+        }
+
+        return orjson.dumps(obj)
+
+
+class MoversReportArrowFormatter(BaseMoversReportFormatter):
+    """
+    A class responsible for serializing the movers into an Arrow IPC stream, with the layout of the CSV report.
+    """
+    REPORT_FORMAT: str = ReportFormat.ARROW
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.AccountsMoversMetrics) -> bytes:
+        """
+        Format the movers into an Arrow IPC stream.
+
+        Args:
+            metrics (fm.AccountsMoversMetrics): The movers.
+
+        Returns:
+            bytes: The Arrow IPC stream.
+        """
+        import pyarrow as pa
+
+        rows = list(cls._rows(metrics))
+        ranking, account_code, account_nature, first_amount, second_amount, absolute_diff, percent_diff = (
+            zip(*rows) if rows else [()] * len(cls.COLUMNS))
+
+        table = pa.table(
+            {
+                'ranking':        pa.array(ranking, type=pa.string()),
+                'account_code':   pa.array(account_code, type=pa.int64()),
+                'account_nature': pa.array(account_nature, type=pa.string()),
+                'first_month':    pa.array([cls._to_number(value) for value in first_amount], type=pa.float64()),
+                'second_month':   pa.array([cls._to_number(value) for value in second_amount], type=pa.float64()),
+                'absolute_diff':  pa.array([cls._to_number(value) for value in absolute_diff], type=pa.float64()),
+                'percent_diff':   pa.array(percent_diff, type=pa.float64()),
+            },
+            metadata={
+                FinanceReportArrowFormatter.FIRST_MONTH:  metrics.first_month_date.strftime('%Y-%m'),
+                FinanceReportArrowFormatter.SECOND_MONTH: metrics.second_month_date.strftime('%Y-%m'),
+            }
+        )
+
+        return FinanceReportArrowFormatter._to_ipc_stream(table)
+
+
+class BaseMatrixReportFormatter(BaseReportFormatter):
+    """
+    Base class for formatting the months matrix in the compact layout: a row per metric and comparison (the month
+    values, then the absolute and the percentage differences per first month) and a column per month.
+    """
+    VALUES: str = 'value'
+    ABSOLUTE_DIFF: str = 'abs'
+    PERCENT_DIFF: str = 'pct'
+
+    METRIC_NAMES = {
+        'revenue':  BaseReportFormatter.REVENUES,
+        'expenses': BaseReportFormatter.EXPENSES,
+        'profit':   BaseReportFormatter.PROFITS,
+        'margin':   BaseReportFormatter.MARGINS,
+    }
+
+    @classmethod
+    def _month_labels(cls, metrics: fm.MonthsMatrixFinanceMetrics) -> List[str]:
+        return [cls._period_label(month) for month in metrics.months]
+
+    @classmethod
+    def _matrix_values(cls, metrics: fm.MonthsMatrixFinanceMetrics, name: str) -> tuple:
+        """
+        Get the month values, the absolute and the percentage differences of the metric, the amounts
+        converted from minor units.
+        """
+        values = [getattr(month, name) for month in metrics.months]
+        absolute_diff = metrics.absolute_diff[name]
+
+        if name != 'margin':
+            values = [cls._to_number(value) for value in values]
+            absolute_diff = cls._to_number(absolute_diff)
+
+        return values, absolute_diff, metrics.percent_diff[name]
+
+    @classmethod
+    def _rows(cls, metrics: fm.MonthsMatrixFinanceMetrics):
+        """
+        Yield the rows of the compact layout: metric, comparison, first month (None for the values) and the values
+        per month.
+        """
+        month_labels = cls._month_labels(metrics)
+
+        for name in metrics.METRICS:
+            values, absolute_diff, percent_diff = cls._matrix_values(metrics, name)
+
+            yield cls.METRIC_NAMES[name], cls.VALUES, None, values
+            for month_label, row in zip(month_labels, absolute_diff):
+                yield cls.METRIC_NAMES[name], cls.ABSOLUTE_DIFF, month_label, row
+            for month_label, row in zip(month_labels, percent_diff):
+                yield cls.METRIC_NAMES[name], cls.PERCENT_DIFF, month_label, row
+
+
+class MatrixReportFormatter(BaseMatrixReportFormatter):
+    """
+    A class responsible for formatting the months matrix into a CSV string.
+    """
+    REPORT_FORMAT: str = ReportFormat.CSV
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.MonthsMatrixFinanceMetrics) -> str:
+        """
+        Format the months matrix into a raw data string.
+
+        Args:
+            metrics (fm.MonthsMatrixFinanceMetrics): The months matrix.
+
+        Returns:
+            str: The formatted raw data string.
+        """
+        lines = [f'metric,comparison,month,{",".join(cls._month_labels(metrics))}\n']
+
+        for metric_name, comparison, month_label, values in cls._rows(metrics):
+            # The percentages and the margins with one decimal, as in the finance report
+            decimals = 1 if comparison == cls.PERCENT_DIFF or metric_name == cls.MARGINS else 2
+            lines.append(f'{metric_name},{comparison},{month_label or ""},'
+                         f'{",".join(f"{value:.{decimals}f}" for value in values)}\n')
+
+        return ''.join(lines)
+
+
+class MatrixReportJSONFormatter(BaseMatrixReportFormatter):
+    """
+    A class responsible for serializing the months matrix into JSON.
+
+    Every metric holds the month values and the matrices of the differences as arrays of rows, the rows are
+    the first months and the columns the second months, both in the order of `months`.
+    """
+    REPORT_FORMAT: str = ReportFormat.JSON
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.MonthsMatrixFinanceMetrics) -> bytes:
+        """
+        Format the months matrix into a JSON document.
+
+        Args:
+            metrics (fm.MonthsMatrixFinanceMetrics): The months matrix.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        obj = {'months': cls._month_labels(metrics)}
+
+        for name in metrics.METRICS:
+            values, absolute_diff, percent_diff = cls._matrix_values(metrics, name)
+            obj[name] = {
+                'values':        values,
+                'absolute_diff': absolute_diff,
+                'percent_diff':  percent_diff,
+            }
+
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class MatrixReportArrowFormatter(BaseMatrixReportFormatter):
+    """
+    A class responsible for serializing the months matrix into an Arrow IPC stream.
+
+    The table has the layout of the CSV report: the metric, comparison and month columns and a float64 column
+    per month.
+    """
+    REPORT_FORMAT: str = ReportFormat.ARROW
+
+    @classmethod
+    @log_function_call
+    def format(cls, metrics: fm.MonthsMatrixFinanceMetrics) -> bytes:
+        """
+        Format the months matrix into an Arrow IPC stream.
+
+        Args:
+            metrics (fm.MonthsMatrixFinanceMetrics): The months matrix.
+
+        Returns:
+            bytes: The Arrow IPC stream.
+        """
+        import pyarrow as pa
+
+        metric_names, comparisons, month_labels, rows = zip(*cls._rows(metrics))
+        columns = {
+            'metric':     pa.array(metric_names, type=pa.string()),
+            'comparison': pa.array(comparisons, type=pa.string()),
+            'month':      pa.array(month_labels, type=pa.string()),
+        }
+
+        for position, month_label in enumerate(cls._month_labels(metrics)):
+            columns[month_label] = pa.array([float(row[position]) for row in rows], type=pa.float64())
+
+        return FinanceReportArrowFormatter._to_ipc_stream(pa.table(columns))
+
+
+class TransactionsFormatter:
+    """
+    A class responsible for formatting the listed bookings (rows of TransactionsListData.COLUMNS).
+    """
+    COLUMNS = ('id', 'transaction_date', 'account_code', 'account_nature', 'transaction_type', 'amount')
+
+    _NATURES = {code: nature for nature, code in AccountNature.CODES.items()}
+    _TYPES = {code: transaction_type for transaction_type, code in TransactionType.CODES.items()}
+
+    @classmethod
+    def to_dicts(cls, rows: List[tuple]) -> List[dict]:
+        """
+        Convert the bookings into JSON objects, the amounts are converted from minor units.
+        """
+        return [
+            dict(zip(cls.COLUMNS, (transaction_id,
+                                   cls._format_date(month_key, day),
+                                   account_code,
+                                   cls._NATURES.get(nature_code),
+                                   cls._TYPES.get(type_code),
+                                   BaseReportFormatter._to_number(amount))))
+            for transaction_id, month_key, day, account_code, nature_code, type_code, amount in rows
+        ]
+
+    @classmethod
+    def to_csv(cls, rows: List[tuple], header: bool = False) -> str:
+        """
+        Convert the bookings into CSV lines, the amounts are converted from minor units exactly.
+        """
+        lines = [f'{",".join(cls.COLUMNS)}\n'] if header else []
+
+        lines.extend(
+            f'{transaction_id},{cls._format_date(month_key, day)},{account_code},'
+            f'{cls._NATURES.get(nature_code, "")},{cls._TYPES.get(type_code, "")},'
+            f'{BaseReportFormatter._to_decimal(amount)}\n'
+            for transaction_id, month_key, day, account_code, nature_code, type_code, amount in rows
+        )
+
+        return ''.join(lines)
+
+    @staticmethod
+    def _format_date(month_key: int, day: int) -> str:
+        return f'{month_key // 100:04d}-{month_key % 100:02d}-{day:02d}'
+
+
+REPORT_FORMATTERS = {
+    formatter.REPORT_FORMAT: formatter
+    for formatter in (FinanceReportFormatter, FinanceReportJSONFormatter, FinanceReportArrowFormatter)
+}
+
+ACCOUNTS_REPORT_FORMATTERS = {
+    formatter.REPORT_FORMAT: formatter
+    for formatter in (AccountsReportFormatter, AccountsReportJSONFormatter, AccountsReportArrowFormatter)
+}
+
+MOVERS_REPORT_FORMATTERS = {
+    formatter.REPORT_FORMAT: formatter
+    for formatter in (MoversReportFormatter, MoversReportJSONFormatter, MoversReportArrowFormatter)
+}
+
+MATRIX_REPORT_FORMATTERS = {
+    formatter.REPORT_FORMAT: formatter
+    for formatter in (MatrixReportFormatter, MatrixReportJSONFormatter, MatrixReportArrowFormatter)
+}
+
+
+def get_report_formatter(report_format: str = ReportFormat.CSV,
+                         formatters: dict = None) -> type[BaseReportFormatter]:
+    """
+    Get the report formatter class for the given report format.
+
+    Parameters:
+    - report_format (str): One of the ReportFormat values.
+    - formatters (dict): The formatters of the report kind, REPORT_FORMATTERS by default.
+
+    Returns:
+    - type[BaseReportFormatter]: The formatter class.
+    """
+    if formatters is None:
+        formatters = REPORT_FORMATTERS
+
+    try:
+        return formatters[report_format]
+    except KeyError:
+        raise ValueError(f'Unsupported report format "{report_format}"')
@@ -0,0 +1,154 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Size-rotated log file shared by the processes of the service (the forked workers append to the same file).
+
+    The size of the file, not the position of the process in it, decides the rollover, and a process reopens
+    the file when another process has rotated it.
+    """
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        self._reopen_if_rotated()
+        return super().shouldRollover(record)
+
+    def _reopen_if_rotated(self) -> None:
+        if self.stream is None:
+            return
+
+        try:
+            file_stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            file_stat = None
+
+        stream_stat = os.fstat(self.stream.fileno())
+
+        if file_stat is None or (file_stat.st_dev, file_stat.st_ino) != (stream_stat.st_dev, stream_stat.st_ino):
+            self.stream.close()
+            self.stream = self._open()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger: up to `rate` records per second with bursts of up to `burst` records.
+
+    The records above the limit are dropped before they are formatted, warnings and errors are never dropped.
+    """
+    def __init__(self, rate: float = 0, burst: int = 0):
+        """
+        Parameters:
+        - rate (float): The records per second of a logger, 0 - no limit.
+        - burst (int): The size of the bucket, at least one second of records by default.
+        """
+        super().__init__()
+        self._rate: float = rate
+        self._burst: float = max(burst, rate, 1)
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._dropped: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self._rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated_at = self._buckets.get(record.name, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - updated_at) * self._rate)
+
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now)
+                self._dropped[record.name] = self._dropped.get(record.name, 0) + 1
+                return False
+
+            self._buckets[record.name] = (tokens - 1, now)
+
+        return True
+
+    def dropped(self) -> dict[str, int]:
+        """
+        Get the numbers of the dropped records per logger.
+        """
+        with self._lock:
+            return dict(self._dropped)
+
+
+class QueueLogging:
+    """
+    Non-blocking logging: the loggers put the records into a queue, a background thread writes them.
+
+    The handlers configured on the loggers are moved behind a QueueListener, the loggers get a QueueHandler
+    instead, so the request threads never wait for the console or the disk. A forked process (e.g. a worker
+    of the production launcher) gets its own queue and listener thread.
+    """
+    _listener: logging.handlers.QueueListener = None
+    _queue_handler: logging.handlers.QueueHandler = None
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def start(cls, logger_names: list[str], filters: list[logging.Filter] = None) -> None:
+        """
+        Move the handlers of the loggers behind the queue, a running listener is stopped first.
+
+        Parameters:
+        - logger_names (list[str]): The loggers.
+        - filters (list[logging.Filter]): The filters applied on the logging thread, before the queue.
+        """
+        with cls._lock:
+            cls._stop()
+
+            handlers = []
+            for logger_name in logger_names:
+                for handler in logging.getLogger(logger_name).handlers:
+                    if handler not in handlers:
+                        handlers.append(handler)
+
+            cls._queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+            for log_filter in filters or []:
+                cls._queue_handler.addFilter(log_filter)
+
+            for logger_name in logger_names:
+                logging.getLogger(logger_name).handlers = [cls._queue_handler]
+
+            cls._listener = logging.handlers.QueueListener(cls._queue_handler.queue, *handlers,
+                                                           respect_handler_level=True)
+            cls._listener.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        """
+        Write the queued records and stop the listener thread.
+        """
+        with cls._lock:
+            cls._stop()
+
+    @classmethod
+    def _stop(cls) -> None:
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
+
+    @classmethod
+    def _restart_in_child(cls) -> None:
+        # The listener thread of the parent does not exist in the child, and its queue may be locked
+        cls._lock = threading.Lock()
+
+        if cls._listener is None:
+            return
+
+        cls._queue_handler.queue = queue.SimpleQueue()
+        cls._listener = logging.handlers.QueueListener(cls._queue_handler.queue, *cls._listener.handlers,
+                                                       respect_handler_level=True)
+        cls._listener.start()
+
+
+atexit.register(QueueLogging.stop)
+os.register_at_fork(after_in_child=QueueLogging._restart_in_child)
@@ -1,21 +1,38 @@
 import inspect
+from contextlib import ExitStack
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
 from datetime import date
 import logging
 
-import pandas as pd
 from sqlite3 import Error as SQLiteError
 from sqlalchemy.exc import SQLAlchemyError
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, Request, HTTPException, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 
 import src.config as cfg
 import src.services as services
+from src.formatters import ReportFormat
+from src.engines import ReportEngines
+from src.tenants import TenantStores, TenantPathMiddleware, TenantNotFoundError
+from src.reloads import StoreReloader
+from src.profiling import MemoryProfiler
+from src.utils import (DateRange, ComparisonMode, lazy_import, add_months, get_comparison_periods,
+                       get_last_day_of_the_month, get_month_key)
+from src.models import AccountNature
+from src.service_metrics import ServiceMetrics
+from src.single_flight import SingleFlight
 
 
+# Only the error handling of the reports uses pandas, it is loaded with the data
+pd = lazy_import('pandas')
+
 cfg.init_logging()
 logger = logging.getLogger(cfg.LOGGER_NAME)
 
 app = FastAPI()
+app.add_middleware(TenantPathMiddleware)
 
 
 @app.get("/")
@@ -23,18 +40,94 @@ def hello_handler():
     return {"msg": "Hello, World!"}
 
 
-@app.get("/report")
-def get_report(
-    first_date: date,
-    second_date: date,
-):
+def negotiate_report_format(accept: str | None, report_format: str | None) -> str:
+    """
+    Choose the report format from the `format` query parameter or the Accept header.
+
+    Raises:
+    - HTTPException: 406 if none of the supported formats is acceptable.
+    """
+    negotiated_format = ReportFormat.negotiate(accept, report_format)
+
+    if negotiated_format is None:
+        supported = ', '.join(ReportFormat.MEDIA_TYPES.values())
+        raise HTTPException(status_code=406, detail=f'Supported report formats: {supported}')
+
+    return negotiated_format
+
+
+report_flights = SingleFlight(coalesced_metric=ServiceMetrics.REPORT_REQUESTS_COALESCED)
+
+
+def get_etag(report_key: tuple, loaded_at: float | None) -> str:
+    """
+    Get the ETag of a report: the hash of the normalized request and the version of the loaded data.
+    """
+    # The load time distinguishes the data versions of the process restarts
+    return '"' + hashlib.sha1(repr((report_key, loaded_at)).encode()).hexdigest()[:32] + '"'
+
+
+def is_not_modified(headers, etag: str, last_modified: str) -> bool:
+    """
+    Check the conditional request headers, If-Modified-Since is ignored if If-None-Match is present.
+    """
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        # Weak comparison, as required for GET requests
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def build_report_response(request: Request, report_format: str, tenant: str | None, generate_report, *args) -> Response:
+    """
+    Run a report generation function on the tenant's data and wrap its result into a response
+    of the negotiated media type.
+
+    The response carries an ETag and a Last-Modified tied to the loaded data version. A conditional request
+    matching them is answered with 304 before the report is computed.
+
+    Raises:
+    - HTTPException: 404 for an unknown tenant, 500 if the data could not be loaded or queried.
+    """
     err_msg = ''
     err_status_code = 500
 
     report_data = ''
 
+    ServiceMetrics.increment(ServiceMetrics.REPORT_REQUESTS)
+
     try:
-        report_data = services.generate_finance_report(first_date, second_date)
+        with TenantStores.acquire(tenant) as store:
+            # The function itself tells the reports apart, the decorated functions may share their names
+            key = (generate_report, store.get_data_folder(), store.get_version(), args, report_format)
+
+            validators = {
+                # The ETag is the same in all the worker processes: built from the endpoint, not from the function
+                'ETag':          get_etag((request.url.path,) + key[1:], store.get_loaded_at()),
+                'Last-Modified': formatdate(store.get_loaded_at(), usegmt=True),
+                'Cache-Control': 'no-cache',
+                # The format is negotiated from Accept, the data is selected by the tenant header
+                'Vary':          'Accept, X-Tenant',
+            }
+            if is_not_modified(request.headers, validators['ETag'], validators['Last-Modified']):
+                ServiceMetrics.increment(ServiceMetrics.REPORT_REQUESTS_NOT_MODIFIED)
+                return Response(status_code=304, headers=validators)
+
+            # Concurrent identical requests on the same data version share one computation
+            with MemoryProfiler.stage(f'request/{generate_report.__name__}'):
+                report_data = report_flights.run(key, generate_report, *args, report_format)
+    except TenantNotFoundError as ex:
+        err_msg = f'{ex}'
+        err_status_code = 404
     except (SQLiteError, SQLAlchemyError) as ex:
         err_msg = 'Issue with SQL database'
         logger.critical(f'{ex}')
@@ -49,4 +142,226 @@ def get_report(
         logger.critical(err_msg)
         raise HTTPException(status_code=err_status_code, detail=err_msg)
 
-    return Response(report_data)
+    return Response(report_data, media_type=ReportFormat.MEDIA_TYPES[report_format], headers=validators)
+
+
+def get_report_periods(first_start: date | None,
+                       first_end: date | None,
+                       second_start: date | None,
+                       second_end: date | None) -> tuple[DateRange, DateRange]:
+    """
+    Build the ranges of days of a report from the range query parameters.
+
+    Raises:
+    - HTTPException: 422 if a range is incomplete or its start is after its end.
+    """
+    if None in (first_start, first_end, second_start, second_end):
+        raise HTTPException(status_code=422,
+                            detail='Either first_date and second_date or first_start, first_end, second_start '
+                                   'and second_end are required')
+
+    periods = DateRange(first_start, first_end), DateRange(second_start, second_end)
+
+    for period in periods:
+        if period.start_date > period.end_date:
+            raise HTTPException(status_code=422, detail=f'The range {period} ends before it starts')
+
+    return periods
+
+
+@app.get("/report")
+def get_report(
+    request: Request,
+    first_date: date | None = None,
+    second_date: date | None = None,
+    first_start: date | None = None,
+    first_end: date | None = None,
+    second_start: date | None = None,
+    second_end: date | None = None,
+    compare: str | None = None,
+    months: int = Query(default=3, ge=1, le=120),
+    engine: str | None = None,
+    report_format: str | None = Query(default=None, alias='format'),
+    accept: str | None = Header(default=None),
+    x_tenant: str | None = Header(default=None),
+):
+    report_format = negotiate_report_format(accept, report_format)
+
+    if compare is not None:
+        if compare not in ComparisonMode.MODES or first_date is None:
+            raise HTTPException(status_code=422,
+                                detail=f'compare requires first_date and one of: {", ".join(ComparisonMode.MODES)}')
+
+        # The reports of the dates of the same month are the same
+        months = months if compare == ComparisonMode.TRAILING else 1
+        try:
+            get_comparison_periods(first_date, compare, months)
+        except (ValueError, OverflowError):
+            raise HTTPException(status_code=422, detail='The compared periods are out of the supported dates')
+
+        return build_report_response(request, report_format, x_tenant, services.generate_comparison_report,
+                                     first_date.replace(day=1), compare, months)
+
+    if first_date is not None and second_date is not None:
+        # The engine override is for the diagnostics, the month reports of all the engines are the same
+        if engine is not None and engine not in ReportEngines.names():
+            raise HTTPException(status_code=422,
+                                detail=f'engine must be one of: {", ".join(ReportEngines.names())}')
+
+        return build_report_response(request, report_format, x_tenant, services.generate_finance_report,
+                                     first_date.replace(day=1), second_date.replace(day=1), engine)
+
+    first_period, second_period = get_report_periods(first_start, first_end, second_start, second_end)
+
+    return build_report_response(request, report_format, x_tenant, services.generate_finance_periods_report,
+                                 first_period, second_period)
+
+
+@app.get("/report/accounts")
+def get_accounts_report(
+    request: Request,
+    first_date: date,
+    second_date: date,
+    report_format: str | None = Query(default=None, alias='format'),
+    accept: str | None = Header(default=None),
+    x_tenant: str | None = Header(default=None),
+):
+    report_format = negotiate_report_format(accept, report_format)
+
+    return build_report_response(request, report_format, x_tenant, services.generate_accounts_report,
+                                 first_date.replace(day=1), second_date.replace(day=1))
+
+
+@app.get("/report/movers")
+def get_movers_report(
+    request: Request,
+    first_date: date,
+    second_date: date,
+    n: int = Query(default=10, ge=1, le=1000),
+    report_format: str | None = Query(default=None, alias='format'),
+    accept: str | None = Header(default=None),
+    x_tenant: str | None = Header(default=None),
+):
+    report_format = negotiate_report_format(accept, report_format)
+
+    return build_report_response(request, report_format, x_tenant, services.generate_movers_report,
+                                 first_date.replace(day=1), second_date.replace(day=1), n)
+
+
+@app.get("/report/matrix")
+def get_matrix_report(
+    request: Request,
+    year: int | None = Query(default=None, ge=1, le=9999),
+    first_date: date | None = None,
+    months: int = Query(default=12, ge=1, le=120),
+    report_format: str | None = Query(default=None, alias='format'),
+    accept: str | None = Header(default=None),
+    x_tenant: str | None = Header(default=None),
+):
+    """
+    Compare every month with every other month: the months of the year, or the months from first_date on.
+    """
+    report_format = negotiate_report_format(accept, report_format)
+
+    if (year is None) == (first_date is None):
+        raise HTTPException(status_code=422, detail='Either year or first_date is required')
+
+    if year is not None:
+        first_date, months = date(year, 1, 1), 12
+
+    try:
+        get_last_day_of_the_month(add_months(first_date, months - 1))
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=422, detail='The months are out of the supported dates')
+
+    return build_report_response(request, report_format, x_tenant, services.generate_matrix_report,
+                                 first_date.replace(day=1), months)
+
+
+@app.get("/transactions")
+def get_transactions(
+    month: date | None = None,
+    account: int | None = None,
+    nature: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    report_format: str = Query(default=ReportFormat.JSON, alias='format'),
+    x_tenant: str | None = Header(default=None),
+):
+    """
+    List the bookings ordered by transaction date and id, page by page, or export all of them as CSV.
+
+    A JSON page carries the cursor of the next page. The CSV export (format=csv) streams all the bookings
+    from the cursor on, the limit is ignored.
+    """
+    if nature is not None and nature not in AccountNature.CODES:
+        raise HTTPException(status_code=422, detail=f'nature must be one of: {", ".join(AccountNature.CODES)}')
+    if report_format not in (ReportFormat.JSON, ReportFormat.CSV):
+        raise HTTPException(status_code=422, detail=f'format must be {ReportFormat.JSON} or {ReportFormat.CSV}')
+
+    try:
+        after = services.parse_transactions_cursor(cursor) if cursor is not None else None
+    except ValueError as ex:
+        raise HTTPException(status_code=422, detail=f'{ex}')
+
+    if report_format == ReportFormat.JSON:
+        try:
+            with TenantStores.acquire(x_tenant):
+                return services.list_transactions(month, account, nature, after, limit)
+        except TenantNotFoundError as ex:
+            raise HTTPException(status_code=404, detail=f'{ex}')
+
+    # The store is kept from eviction until the export is sent, or abandoned before its first batch
+    stack = ExitStack()
+    try:
+        store = stack.enter_context(TenantStores.pin(x_tenant))
+    except TenantNotFoundError as ex:
+        raise HTTPException(status_code=404, detail=f'{ex}')
+
+    def stream_export():
+        batches = services.export_transactions(month, account, nature, after, store.get())
+        # The store is read under its read lock batch by batch, a month reload waits for a batch, not for the export
+        while True:
+            with store.reading():
+                batch = next(batches, None)
+            if batch is None:
+                break
+            yield batch
+
+    return StreamingResponse(stream_export(), media_type=ReportFormat.MEDIA_TYPES[ReportFormat.CSV],
+                             headers={'Content-Disposition': 'attachment; filename="transactions.csv"'},
+                             background=BackgroundTask(stack.close))
+
+
+@app.post("/admin/reload", status_code=202)
+def reload_store(month: date | None = None, x_tenant: str | None = Header(default=None)):
+    """
+    Reload the dataset of the tenant (or the default dataset) in the background, the current data keeps
+    being served until the reloaded data is swapped in. With a month, only the month is reloaded from its
+    month shard (e.g. bookings-2020-06.csv).
+    """
+    month_key = get_month_key(month) if month is not None else None
+
+    try:
+        started = StoreReloader.start(x_tenant, month_key)
+    except (TenantNotFoundError, FileNotFoundError) as ex:
+        raise HTTPException(status_code=404, detail=f'{ex}')
+
+    if not started:
+        raise HTTPException(status_code=409, detail='The store is already being reloaded')
+
+    return {'tenant': x_tenant, 'month': month_key, 'started': started}
+
+
+@app.get("/admin/memory")
+def get_memory_profile():
+    """
+    The memory profile of the load and request stages, see APP_MEMORY_PROFILING.
+    """
+    return MemoryProfiler.snapshot()
+
+
+@app.get("/metrics")
+def get_metrics():
+    return dict(ServiceMetrics.snapshot(),
+                log_records_dropped=sum(cfg.log_rate_limit_filter.dropped().values()))
@@ -1,15 +1,22 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime
 from typing import List
 from abc import ABC, abstractmethod
 
 import src.models as models
-from src.utils import log_function_call
+from src.utils import log_function_call, lazy_import, DateRange
+
+np = lazy_import('numpy')
 
 
 @dataclass
 class BaseFinanceMetrics:
-    """Base class for financial metrics."""
+    """
+    Base class for financial metrics.
+
+    Revenue, expenses and profit are amounts in integer minor units (cents), margin is a percentage.
+    Percentage differences hold percentages in all fields.
+    """
     revenue: float = 0
     expenses: float = 0
     profit: float = 0
@@ -31,6 +38,15 @@ class MonthFinanceMetrics(BaseFinanceMetrics):
         self.month_date = month_date
 
 
+@dataclass
+class PeriodFinanceMetrics(BaseFinanceMetrics):
+    """Class for financial metrics for an arbitrary range of days."""
+    period: DateRange = None
+
+    def __init__(self, period: DateRange):
+        self.period = period
+
+
 @dataclass
 class MonthsDifferenceFinanceMetrics(BaseFinanceMetrics):
     """Class for the difference between two MonthFinanceMetrics instances."""
@@ -51,21 +67,64 @@ class FinanceReportMetrics:
     percent_diff: MonthsDifferenceFinanceMetrics = None
 
 
+@dataclass
+class AccountReportMetrics(FinanceReportMetrics):
+    """Class for summarizing financial metrics of a single account for a report."""
+    account_code: int = None
+    account_nature: str = None
+
+
+@dataclass
+class AccountsReportMetrics:
+    """Class for summarizing per-account financial metrics for a report."""
+    first_month_date: date = None
+    second_month_date: date = None
+    accounts: List[AccountReportMetrics] = field(default_factory=list)
+
+
+@dataclass
+class AccountsMoversMetrics:
+    """Class for the accounts with the largest changes between two months, largest first."""
+    first_month_date: date = None
+    second_month_date: date = None
+    by_absolute_diff: List[AccountReportMetrics] = field(default_factory=list)
+    by_percent_diff: List[AccountReportMetrics] = field(default_factory=list)
+
+
+@dataclass
+class MonthsMatrixFinanceMetrics:
+    """
+    Class for the differences between every pair of months.
+
+    The diffs map the metric names (see METRICS) to square arrays: the item [i, j] compares the month i
+    (the first month) with the month j (the second month).
+    """
+    METRICS = ('revenue', 'expenses', 'profit', 'margin')
+
+    months: List[MonthFinanceMetrics] = field(default_factory=list)
+    absolute_diff: dict = field(default_factory=dict)
+    percent_diff: dict = field(default_factory=dict)
+
+
 class FinanceReportMetricsBuilder:
     @classmethod
     @log_function_call
-    def create_object(cls, first_date: date, second_date: date) -> FinanceReportMetrics:
+    def create_object(cls,
+                      first_date: date,
+                      second_date: date,
+                      report_class: type[FinanceReportMetrics] = FinanceReportMetrics) -> FinanceReportMetrics:
         """
         FinanceMetrics builder function - Create FinanceReportMetrics instance.
 
         Parameters:
         - first_date (date): The date for the first month.
         - second_date (date): The date for the second month.
+        - report_class (type[FinanceReportMetrics]): The report metrics class to instantiate.
 
         Returns:
         FinanceReportMetrics: The initialized FinanceReportMetrics instance.
         """
-        metrics = FinanceReportMetrics()
+        metrics = report_class()
 
         first_month = MonthFinanceMetrics(first_date)
         second_month = MonthFinanceMetrics(second_date)
@@ -78,6 +137,29 @@ class FinanceReportMetricsBuilder:
 
         return metrics
 
+    @classmethod
+    @log_function_call
+    def create_periods_object(cls, first_period: DateRange, second_period: DateRange) -> FinanceReportMetrics:
+        """
+        FinanceMetrics builder function - Create FinanceReportMetrics instance for two ranges of days.
+
+        Parameters:
+        - first_period (DateRange): The first range of days.
+        - second_period (DateRange): The second range of days.
+
+        Returns:
+        FinanceReportMetrics: The initialized FinanceReportMetrics instance.
+        """
+        metrics = FinanceReportMetrics()
+
+        metrics.first_month = PeriodFinanceMetrics(first_period)
+        metrics.second_month = PeriodFinanceMetrics(second_period)
+
+        metrics.absolute_diff = MonthsDifferenceFinanceMetrics(metrics.first_month, metrics.second_month)
+        metrics.percent_diff = MonthsDifferenceFinanceMetrics(metrics.first_month, metrics.second_month)
+
+        return metrics
+
 
 class BaseMetricsCalculator(ABC):
     @classmethod
@@ -142,6 +224,147 @@ class BaseMetricsCalculator(ABC):
             metrics.margin = (metrics.first_month.margin - metrics.second_month.margin)*100/abs(metrics.second_month.margin)
 
 
+class MatrixMetricsCalculator:
+    """
+    Calculates the differences between every pair of months at once, on the vectors of the month metrics.
+
+    The differences are the same as the ones of BaseMetricsCalculator, with the same zero-denominator rule:
+    the percentage difference to a zero metric is 0.
+    """
+    @classmethod
+    @log_function_call
+    def execute(cls, months_data: List[BaseFinanceMetrics], metrics: MonthsMatrixFinanceMetrics) -> None:
+        """
+        Executes the calculation of the months matrix.
+
+        Parameters:
+        - months_data (List[BaseFinanceMetrics]): The metrics of the months, in the order of metrics.months.
+        - metrics (MonthsMatrixFinanceMetrics): Object to store calculated finance metrics.
+
+        Returns:
+        - None
+        """
+        for month_data, month in zip(months_data, metrics.months):
+            month_data.copy_to(month)
+
+        for name in metrics.METRICS:
+            values = np.array([getattr(month, name) for month in metrics.months])
+
+            metrics.absolute_diff[name] = cls._calc_diff_absolute_matrix(values)
+            metrics.percent_diff[name] = cls._calc_diff_percentage_matrix(values)
+
+    @staticmethod
+    def _calc_diff_absolute_matrix(values: 'np.ndarray') -> 'np.ndarray':
+        # Broadcasting: the rows are the first months, the columns the second months
+        return values[:, None] - values[None, :]
+
+    @staticmethod
+    def _calc_diff_percentage_matrix(values: 'np.ndarray') -> 'np.ndarray':
+        first, second = values[:, None], values[None, :]
+        denominators = np.broadcast_to(np.abs(second), (len(values), len(values)))
+
+        percentages = np.zeros(denominators.shape)
+        np.divide((first - second) * 100, denominators, out=percentages, where=denominators != 0)
+
+        return percentages
+
+
+class MoversMetricsCalculator:
+    """
+    Selects the accounts with the largest absolute and percentage changes of their amount (the revenue of
+    an income account, the expenses of an expense account) between two months.
+
+    The N largest changes are selected with a partial selection over all the accounts, only the selected accounts
+    are sorted and get their report metrics. The percentage change to a zero amount is 0, as in the month reports.
+    """
+    @classmethod
+    @log_function_call
+    def execute(cls, accounts_amounts: 'np.ndarray', metrics: AccountsMoversMetrics, count: int) -> None:
+        """
+        Executes the selection of the movers.
+
+        Parameters:
+        - accounts_amounts (np.ndarray): A row per account: the account code, the account nature code and
+          the amounts of the first and the second month.
+        - metrics (AccountsMoversMetrics): Object to store the metrics of the selected accounts.
+        - count (int): The number of the accounts selected by each change.
+
+        Returns:
+        - None
+        """
+        codes, nature_codes, first_amounts, second_amounts = accounts_amounts.T
+
+        absolute_diff = first_amounts - second_amounts
+
+        denominators = np.abs(second_amounts)
+        percent_diff = np.zeros(len(accounts_amounts))
+        np.divide(absolute_diff * 100, denominators, out=percent_diff, where=denominators != 0)
+
+        for changes, movers in ((absolute_diff, metrics.by_absolute_diff), (percent_diff, metrics.by_percent_diff)):
+            for position in cls._get_top_positions(np.abs(changes), codes, count):
+                movers.append(cls._create_account_report(metrics, *accounts_amounts[position].tolist()))
+
+    @staticmethod
+    def _get_top_positions(keys: 'np.ndarray', codes: 'np.ndarray', count: int) -> 'np.ndarray':
+        """
+        Get the positions of the count largest keys, largest first, the equal keys ordered by account code.
+        """
+        if len(keys) <= count:
+            candidates = np.arange(len(keys))
+        else:
+            threshold = keys[np.argpartition(keys, len(keys) - count)[len(keys) - count]]
+            greater = np.flatnonzero(keys > threshold)
+
+            # The keys equal to the smallest selected one fill the rest in account code order, however many they are
+            tied = np.flatnonzero(keys == threshold)
+            rest = count - len(greater)
+            if len(tied) > rest:
+                tied = tied[np.argpartition(codes[tied], rest - 1)[:rest]]
+
+            candidates = np.concatenate((greater, tied))
+
+        return candidates[np.lexsort((codes[candidates], -keys[candidates]))][:count]
+
+    @staticmethod
+    def _create_account_report(metrics: AccountsMoversMetrics, account_code: int, nature_code: int,
+                               first_amount: int, second_amount: int) -> AccountReportMetrics:
+        account_nature = next(nature for nature, code in models.AccountNature.CODES.items() if code == nature_code)
+
+        account: AccountReportMetrics = FinanceReportMetricsBuilder.create_object(
+            metrics.first_month_date,
+            metrics.second_month_date,
+            AccountReportMetrics
+        )
+        account.account_code = account_code
+        account.account_nature = account_nature
+
+        FinanceMetricsSimpleCalculator.execute(
+            create_account_metrics(account_nature, first_amount),
+            create_account_metrics(account_nature, second_amount),
+            account
+        )
+
+        return account
+
+
+def create_account_metrics(account_nature: str, amount: int) -> BaseFinanceMetrics:
+    """
+    Get the month metrics of an account: its amount is the revenue of an income account or the expenses otherwise.
+    """
+    metrics = BaseFinanceMetrics()
+
+    if account_nature == models.AccountNature.INCOME:
+        metrics.revenue = amount
+    else:
+        metrics.expenses = amount
+
+    metrics.profit = metrics.revenue + metrics.expenses
+    if metrics.revenue != 0:
+        metrics.margin = metrics.profit * 100 / metrics.revenue
+
+    return metrics
+
+
 class FinanceMetricsSimpleCalculator(BaseMetricsCalculator):
     @classmethod
     def _calc_month_metrics(cls, data: BaseFinanceMetrics, metrics: BaseFinanceMetrics) -> None:
@@ -1,5 +1,5 @@
-from sqlalchemy import Table, select, MetaData, Column, Integer, String, ForeignKey, Float, DATETIME
-from sqlalchemy.orm import relationship, join, column_property, DeclarativeBase
+from sqlalchemy import Table, Index, select, MetaData, Column, Integer, SmallInteger, String, ForeignKey, Float, DATETIME
+from sqlalchemy.orm import relationship, DeclarativeBase
 
 
 class Base(DeclarativeBase):
@@ -10,9 +10,23 @@ metadata = MetaData()
 
 
 class AppTables:
+    # Decoding views over the compact physical tables, the ORM models are mapped to them
     ACCOUNT = 'account'
     TRANSACTION = 'transact'
 
+    # Physical tables
+    ACCOUNT_DATA = 'account_data'
+    # The bookings are stored in a table per month (e.g. transact_data_202006) listed in the partitions catalog,
+    # TRANSACTION_DATA is the view over all of them
+    TRANSACTION_DATA = 'transact_data'
+    TRANSACTION_PARTITIONS = 'transact_partitions'
+    DAILY_TOTALS = 'daily_totals'
+
+
+# Amounts are stored as integers in minor units (cents)
+AMOUNT_DECIMALS = 2
+AMOUNT_MINOR_UNITS = 10 ** AMOUNT_DECIMALS
+
 
 class AccountModelColumns:
     """
@@ -30,6 +44,48 @@ class TransactionModelColumns:
     TYPE = 'transaction_type'
     AMOUNT = 'amount'
     DATE = 'transaction_date'
+    MONTH_KEY = 'month_key'
+    NATURE = 'account_nature'
+
+
+class AccountDataColumns:
+    """
+    Class defining column names of the physical account table.
+    """
+    CODE = 'account_code'
+    NATURE_CODE = 'nature_code'
+
+
+class TransactionDataColumns:
+    """
+    Class defining column names of the physical transaction table.
+    """
+    CODE = 'account_code'
+    TYPE_CODE = 'type_code'
+    AMOUNT = 'amount'
+    MONTH_KEY = 'month_key'
+    DAY = 'day'
+    # The nature of the account resolved at ingest, the bookings of unknown accounts are not stored
+    NATURE_CODE = 'nature_code'
+
+
+class TransactionPartitionsColumns:
+    """
+    Class defining column names of the transaction partitions catalog.
+    """
+    MONTH_KEY = 'month_key'
+    TABLE_NAME = 'table_name'
+    ROWS = 'rows'
+
+
+class DailyTotalsColumns:
+    """
+    Class defining column names of the daily totals table.
+    """
+    MONTH_KEY = 'month_key'
+    DAY = 'day'
+    REVENUES = 'revenues'
+    EXPENSES = 'expenses'
 
 
 class TransactionType:
@@ -39,6 +95,12 @@ class TransactionType:
     DEBIT = 'debit'
     CREDIT = 'credit'
 
+    # Stored codes are the signs of the amounts in the totals, unknown types are stored as 0
+    CODES = {
+        CREDIT: 1,
+        DEBIT:  -1,
+    }
+
 
 class AccountNature:
     """
@@ -47,6 +109,127 @@ class AccountNature:
     INCOME = 'income'
     EXPENSE = 'expense'
 
+    # Unknown natures are stored as 0
+    CODES = {
+        INCOME:  1,
+        EXPENSE: 2,
+    }
+
+
+account_data_table = Table(
+    AppTables.ACCOUNT_DATA,
+    metadata,
+    Column('id', Integer, primary_key=True),
+    Column(AccountDataColumns.CODE, Integer, index=True),
+    Column(AccountDataColumns.NATURE_CODE, SmallInteger),
+)
+
+
+def transaction_partition_name(month_key: int) -> str:
+    return f'{AppTables.TRANSACTION_DATA}_{month_key}'
+
+
+def transaction_partition_table(month_key: int) -> Table:
+    """
+    The physical transaction table of the month, the partitions are not registered in the module metadata.
+
+    The (day, id) index orders the bookings of the month for the keyset pagination of the listings.
+    """
+    table_name = transaction_partition_name(month_key)
+
+    return Table(
+        table_name,
+        MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column(TransactionDataColumns.CODE, Integer),
+        Column(TransactionDataColumns.TYPE_CODE, SmallInteger),
+        Column(TransactionDataColumns.AMOUNT, Integer),
+        # yyyymm, e.g. 202006, the same in all the rows of the partition
+        Column(TransactionDataColumns.MONTH_KEY, Integer),
+        Column(TransactionDataColumns.DAY, SmallInteger),
+        Column(TransactionDataColumns.NATURE_CODE, SmallInteger),
+        Index(f'{table_name}_day_id', TransactionDataColumns.DAY, 'id'),
+    )
+
+
+TRANSACTION_DATA_COLUMNS = ['id', TransactionDataColumns.CODE, TransactionDataColumns.TYPE_CODE,
+                            TransactionDataColumns.AMOUNT, TransactionDataColumns.MONTH_KEY, TransactionDataColumns.DAY,
+                            TransactionDataColumns.NATURE_CODE]
+
+
+transaction_partitions_table = Table(
+    AppTables.TRANSACTION_PARTITIONS,
+    metadata,
+    Column(TransactionPartitionsColumns.MONTH_KEY, Integer, primary_key=True),
+    Column(TransactionPartitionsColumns.TABLE_NAME, String),
+    Column(TransactionPartitionsColumns.ROWS, Integer),
+)
+
+
+# Signed revenues and expenses per day, aggregated while the bookings are ingested
+daily_totals_table = Table(
+    AppTables.DAILY_TOTALS,
+    metadata,
+    Column(DailyTotalsColumns.MONTH_KEY, Integer, primary_key=True),
+    Column(DailyTotalsColumns.DAY, SmallInteger, primary_key=True),
+    Column(DailyTotalsColumns.REVENUES, Integer),
+    Column(DailyTotalsColumns.EXPENSES, Integer),
+)
+
+
+def _decode_sql(column: str, codes: dict) -> str:
+    cases = ' '.join(f"when {code} then '{name}'" for name, code in codes.items())
+    return f'case {column} {cases} end'
+
+
+ACCOUNT_VIEW_SQL = (
+    f'create view {AppTables.ACCOUNT} as '
+    f'select '
+        f'id, '
+        f'{AccountDataColumns.CODE} as {AccountModelColumns.CODE}, '
+        f'{_decode_sql(AccountDataColumns.NATURE_CODE, AccountNature.CODES)} as {AccountModelColumns.NATURE} '
+    f'from {AppTables.ACCOUNT_DATA}'
+)
+
+def transaction_data_view_sql(month_keys: list[int]) -> str:
+    """
+    The view over the partitions of the months, without partitions it is empty.
+    """
+    columns = ', '.join(TRANSACTION_DATA_COLUMNS)
+
+    if not month_keys:
+        empty_columns = ', '.join(f'0 as {column_name}' for column_name in TRANSACTION_DATA_COLUMNS)
+        return f'create view {AppTables.TRANSACTION_DATA} as select {empty_columns} where 0'
+
+    partitions = ' union all '.join(
+        f'select {columns} from {transaction_partition_name(month_key)}' for month_key in month_keys
+    )
+    return f'create view {AppTables.TRANSACTION_DATA} as {partitions}'
+
+
+def transaction_select_sql(table_name: str) -> str:
+    """
+    The select decoding the physical transaction table (a partition or the view over all of them) into the columns
+    of the transaction model.
+    """
+    return (
+        f'select '
+            f'id, '
+            f'{TransactionDataColumns.CODE} as {TransactionModelColumns.CODE}, '
+            f'{_decode_sql(TransactionDataColumns.TYPE_CODE, TransactionType.CODES)} as {TransactionModelColumns.TYPE}, '
+            f'{TransactionDataColumns.AMOUNT} as {TransactionModelColumns.AMOUNT}, '
+            f"printf('%04d-%02d-%02d 00:00:00.000000', "
+                f'{TransactionDataColumns.MONTH_KEY} / 100, '
+                f'{TransactionDataColumns.MONTH_KEY} % 100, '
+                f'{TransactionDataColumns.DAY}) as {TransactionModelColumns.DATE}, '
+            f'{TransactionDataColumns.MONTH_KEY} as {TransactionModelColumns.MONTH_KEY}, '
+            f'{_decode_sql(TransactionDataColumns.NATURE_CODE, AccountNature.CODES)} as {TransactionModelColumns.NATURE} '
+        f'from {table_name}'
+    )
+
+
+TRANSACTION_VIEW_SQL = f'create view {AppTables.TRANSACTION} as {transaction_select_sql(AppTables.TRANSACTION_DATA)}'
+
 
 class Account(Base):
     __tablename__ = AppTables.ACCOUNT
@@ -63,23 +246,19 @@ class Transaction(Base):
     id = Column(Integer, primary_key=True)
     account_code = Column(Integer, ForeignKey(f'{AppTables.ACCOUNT}.account_code'))
     transaction_type = Column(String)
-    amount = Column(Float)
-    transaction_date = Column(DATETIME, index=True)
-
-
-transaction_account_join = join(Transaction, Account)
+    # In minor units
+    amount = Column(Integer)
+    transaction_date = Column(DATETIME)
+    month_key = Column(Integer)
+    # Denormalized from the chart of accounts at ingest
+    account_nature = Column(String)
 
 
 class TransactionWithAccount(Base):
-    __table__ = transaction_account_join
-
-    id = column_property(Transaction.id)
-    account_code = column_property(Transaction.account_code, Account.account_code)
-    transaction_type = Transaction.transaction_type
-    amount = Transaction.amount
-    transaction_date = Transaction.transaction_date
-    account_nature = Account.account_nature
-    acc_id = column_property(Account.id)
+    """
+    A booking with the nature of its account, both are stored in the booking row, no join with the accounts.
+    """
+    __table__ = Transaction.__table__
 
     def __str__(self):
         return (f'account_code = {self.account_code}, '
@@ -0,0 +1,213 @@
+import os
+import sys
+import time
+import atexit
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+import orjson
+
+import src.config as cfg
+
+
+logger = logging.getLogger(cfg.LOGGER_NAME)
+
+
+class MemoryProfiler:
+    """
+    Opt-in memory profiling of the load and request stages, with tracemalloc and RSS sampling.
+
+    A stage records its peak and retained memory over the memory at its start: the Python allocations traced
+    by tracemalloc (the numpy and pandas buffers included) and the RSS of the process sampled every
+    RSS_SAMPLE_SECONDS, which also covers the SQLite pages. The stages nest, a nested stage is named after its
+    parents, e.g. load/transactions.
+
+    tracemalloc is process-wide: the stages of concurrent requests see the allocations of each other, and
+    the allocations of the ingest worker processes are not traced. Profile one request at a time for exact numbers.
+    """
+    ENABLED: bool = False
+    DUMP_FILE: str = cfg.MEMORY_PROFILE_FILE
+    RSS_SAMPLE_SECONDS: float = 0.01
+
+    _stages: dict[str, dict] = {}
+    _local = threading.local()
+
+    _rss_peak: int = 0
+    _sampler: threading.Thread = None
+    _sampling: threading.Event = threading.Event()
+    _started_tracing: bool = False
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, enabled: bool) -> None:
+        """
+        Start or stop profiling, the recorded stages are kept.
+        """
+        with cls._lock:
+            if enabled and not cls.ENABLED:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    cls._started_tracing = True
+
+                cls._rss_peak = cls._read_rss()
+                cls._sampling.set()
+                cls._sampler = threading.Thread(target=cls._sample_rss, name='rss-sampler', daemon=True)
+                cls._sampler.start()
+            elif not enabled and cls.ENABLED:
+                cls._sampling.clear()
+                cls._sampler.join()
+                cls._sampler = None
+
+                if cls._started_tracing:
+                    tracemalloc.stop()
+                    cls._started_tracing = False
+
+            cls.ENABLED = enabled
+
+    @classmethod
+    @contextmanager
+    def stage(cls, name: str):
+        """
+        Profile the memory of the code run in the context as the stage of the given name.
+        """
+        if not cls.ENABLED:
+            yield
+            return
+
+        stack = cls._get_stack()
+        parent = stack[-1] if stack else None
+
+        if parent is not None:
+            # The peaks are reset for the stage, the peaks of the parent so far are kept first
+            cls._update_peaks(parent)
+
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        rss = cls._read_rss()
+        cls._rss_peak = rss
+
+        frame = {
+            'name':      f'{parent["name"]}/{name}' if parent is not None else name,
+            'traced':    traced,
+            'peak':      traced,
+            'rss':       rss,
+            'rss_peak':  rss,
+            'start':     time.perf_counter(),
+        }
+        stack.append(frame)
+
+        try:
+            yield
+        finally:
+            stack.pop()
+
+            cls._update_peaks(frame)
+            traced_end, _ = tracemalloc.get_traced_memory()
+            rss_end = cls._read_rss()
+
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], frame['peak'])
+                parent['rss_peak'] = max(parent['rss_peak'], frame['rss_peak'], rss_end)
+
+            cls._record(frame, traced_end, rss_end)
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """
+        Get the profile: the current memory and the stages by name.
+        """
+        traced, traced_peak = tracemalloc.get_traced_memory()
+
+        with cls._lock:
+            stages = {name: dict(stats) for name, stats in cls._stages.items()}
+
+        return {
+            'enabled':           cls.ENABLED,
+            'traced_bytes':      traced,
+            'traced_peak_bytes': traced_peak,
+            'rss_bytes':         cls._read_rss(),
+            'stages':            stages,
+        }
+
+    @classmethod
+    def dump(cls, file_path: str | None = None) -> str:
+        """
+        Write the profile to a JSON file, DUMP_FILE by default.
+
+        Returns:
+        - str: The path of the file.
+        """
+        file_path = file_path or cls.DUMP_FILE
+
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(cls.snapshot(), option=orjson.OPT_INDENT_2))
+
+        return file_path
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._stages.clear()
+
+    @classmethod
+    def _get_stack(cls) -> list[dict]:
+        stack = getattr(cls._local, 'stack', None)
+        if stack is None:
+            stack = cls._local.stack = []
+        return stack
+
+    @classmethod
+    def _update_peaks(cls, frame: dict) -> None:
+        frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+        frame['rss_peak'] = max(frame['rss_peak'], cls._rss_peak)
+
+    @classmethod
+    def _record(cls, frame: dict, traced_end: int, rss_end: int) -> None:
+        with cls._lock:
+            stats = cls._stages.setdefault(frame['name'], {
+                'calls':              0,
+                'seconds':            0.0,
+                'peak_bytes':         0,
+                'retained_bytes':     0,
+                'rss_peak_bytes':     0,
+                'rss_retained_bytes': 0,
+            })
+
+            # The peaks are the largest of all the calls, the retained memory is the one of the last call
+            stats['calls'] += 1
+            stats['seconds'] += time.perf_counter() - frame['start']
+            stats['peak_bytes'] = max(stats['peak_bytes'], frame['peak'] - frame['traced'])
+            stats['retained_bytes'] = traced_end - frame['traced']
+            stats['rss_peak_bytes'] = max(stats['rss_peak_bytes'], max(frame['rss_peak'], rss_end) - frame['rss'])
+            stats['rss_retained_bytes'] = rss_end - frame['rss']
+
+    @classmethod
+    def _sample_rss(cls) -> None:
+        while cls._sampling.is_set():
+            cls._rss_peak = max(cls._rss_peak, cls._read_rss())
+            time.sleep(cls.RSS_SAMPLE_SECONDS)
+
+    @staticmethod
+    def _read_rss() -> int:
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            # No procfs: the peak RSS of the process instead, in bytes on macOS and in kilobytes elsewhere
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _dump_at_exit():
+    if MemoryProfiler.DUMP_FILE and MemoryProfiler.ENABLED:
+        logger.info(f'Memory profile is written to {MemoryProfiler.dump()}')
+
+
+if cfg.MEMORY_PROFILING:
+    MemoryProfiler.configure(True)
+
+atexit.register(_dump_at_exit)
@@ -0,0 +1,112 @@
+import os
+import time
+import signal
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import src.config as cfg
+from src.tenants import TenantStores
+from src.data_adapters import DataLoader, SQLEngine, TRANSACTIONS_FILE
+from src.service_metrics import ServiceMetrics
+
+
+logger = logging.getLogger(cfg.LOGGER_NAME)
+
+
+class StoreReloader:
+    """
+    Background reloads of the data stores (see TenantStores.reload) or of a month of a store (see
+    DataLoader.reload_month), started by POST /admin/reload.
+
+    The reloads run one at a time on a background thread: at most one store is loaded next to the serving
+    stores. A reload of a store already being reloaded is not started again.
+
+    A worker of the prefork server does not reload its own stores, its siblings would keep serving the previous
+    data: the reload is requested from the server (SIGUSR1), which reloads the data and recycles all the workers.
+    """
+    # The pid of the prefork server supervising this worker process, None when serving in a single process
+    _supervisor_pid: int | None = None
+
+    _executor: ThreadPoolExecutor = None
+    _running: set[str | None] = set()
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, supervisor_pid: int | None) -> None:
+        cls._supervisor_pid = supervisor_pid
+
+    @classmethod
+    def start(cls, tenant: str | None = None, month_key: int | None = None) -> bool:
+        """
+        Start reloading the store of the tenant (or the default store), or only a month of it, in the background.
+
+        Parameters:
+        - tenant (str | None): The tenant, the default store if None.
+        - month_key (int | None): The month as yyyymm, the whole store if None.
+
+        Raises:
+        - TenantNotFoundError: if there is no dataset for the tenant.
+        - FileNotFoundError: if there is no month shard of the month.
+
+        Returns:
+        - bool: False if the store is already being reloaded.
+        """
+        tenant = tenant or None
+        data_folder = TenantStores.get_data_folder(tenant) if tenant else SQLEngine.default_store().get_data_folder()
+
+        if month_key is not None:
+            month_file = DataLoader.get_month_file(month_key, TRANSACTIONS_FILE)
+            if not os.path.isfile(os.path.join(data_folder, month_file)):
+                raise FileNotFoundError(f'There is no bookings file {month_file} of the month')
+
+        if cls._supervisor_pid is not None:
+            # The server reloads the whole data, the recycled workers load the tenant stores again on their first use
+            os.kill(cls._supervisor_pid, signal.SIGUSR1)
+            logger.info(f'Reload of the store of tenant {tenant} is requested from the server')
+            return True
+
+        with cls._lock:
+            if tenant in cls._running:
+                return False
+
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reload')
+
+            cls._running.add(tenant)
+
+        cls._executor.submit(cls._reload, tenant, month_key)
+
+        return True
+
+    @classmethod
+    def wait(cls) -> None:
+        """
+        Wait until the started reloads are completed.
+        """
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @classmethod
+    def _reload(cls, tenant: str | None, month_key: int | None) -> None:
+        try:
+            start = time.perf_counter()
+
+            if month_key is None:
+                TenantStores.reload(tenant)
+            else:
+                with TenantStores.pin(tenant) as store:
+                    DataLoader.reload_month(month_key, engine=store)
+
+            ServiceMetrics.increment(ServiceMetrics.STORE_RELOADS)
+            ServiceMetrics.increment(ServiceMetrics.STORE_RELOAD_SECONDS, time.perf_counter() - start)
+        except Exception:
+            ServiceMetrics.increment(ServiceMetrics.STORE_RELOAD_ERRORS)
+            logger.exception(f'Reload of the store of tenant {tenant} failed')
+        finally:
+            with cls._lock:
+                cls._running.discard(tenant)
@@ -0,0 +1,51 @@
+import threading
+
+
+class ServiceMetrics:
+    """
+    Registry of the process-wide service counters, exposed on GET /metrics.
+    """
+    REPORT_REQUESTS = 'report_requests'
+    REPORT_REQUESTS_COALESCED = 'report_requests_coalesced'
+    REPORT_REQUESTS_NOT_MODIFIED = 'report_requests_not_modified'
+    INGEST_ROWS = 'ingest_rows'
+    INGEST_ORPHAN_ROWS = 'ingest_orphan_rows'
+    SHADOW_RUNS = 'shadow_runs'
+    SHADOW_MISMATCHES = 'shadow_mismatches'
+    SHADOW_ERRORS = 'shadow_errors'
+    SHADOW_DROPPED = 'shadow_dropped'
+    SHADOW_SKIPPED = 'shadow_skipped'
+    SHADOW_PRIMARY_SECONDS = 'shadow_primary_seconds'
+    SHADOW_SECONDARY_SECONDS = 'shadow_secondary_seconds'
+    STORE_RELOADS = 'store_reloads'
+    STORE_RELOAD_ERRORS = 'store_reload_errors'
+    STORE_RELOAD_SECONDS = 'store_reload_seconds'
+
+    _counters: dict[str, int | float] = {}
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def increment(cls, name: str, value: int | float = 1) -> None:
+        with cls._lock:
+            cls._counters[name] = cls._counters.get(name, 0) + value
+
+    @classmethod
+    def set(cls, name: str, value: int | float) -> None:
+        with cls._lock:
+            cls._counters[name] = value
+
+    @classmethod
+    def get(cls, name: str) -> int | float:
+        with cls._lock:
+            return cls._counters.get(name, 0)
+
+    @classmethod
+    def snapshot(cls) -> dict[str, int | float]:
+        with cls._lock:
+            return dict(cls._counters)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._counters.clear()
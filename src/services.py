@@ -1,38 +1,312 @@
 from src.utils import log_function_call
-from src.controllers import FinanceReportServiceController
-from src.formatters import FinanceReportFormatter
-from src.metrics import FinanceReportMetrics, FinanceMetricsExtCalculator, FinanceMetricsSimpleCalculator
+from src.controllers import (FinanceReportServiceController, AccountsReportServiceController,
+                             AccountsMoversServiceController, ComparisonReportServiceController,
+                             MatrixReportServiceController)
+from src.formatters import (ReportFormat, get_report_formatter, ACCOUNTS_REPORT_FORMATTERS, MOVERS_REPORT_FORMATTERS,
+                            MATRIX_REPORT_FORMATTERS, TransactionsFormatter)
+from src.metrics import (FinanceReportMetrics, FinanceMetricsSimpleCalculator, MoversMetricsCalculator,
+                         MatrixMetricsCalculator)
 from src.data_adapters import DataLoader, SQLEngine, ACCOUNTS_FILE, TRANSACTIONS_FILE
-from src.data_helpers import TransactionsMonthData, MetricsMonthData
+from src.data_helpers import (AccountsMetricsMonthsData, RangeMetricsData, PeriodsMetricsMonthsData,
+                              AccountsAmountsMonthsData, TransactionsListData)
+from src.engines import ReportEngines
+from src.shadow import ShadowEngine
+from src.profiling import MemoryProfiler
+from src.utils import DateRange, add_months
 from datetime import date
+from typing import Iterator
+from sqlalchemy import Engine
+import itertools
+import time
 
 
 @log_function_call
-def generate_finance_report(first_date: date, second_date: date) -> str:
+def generate_finance_report(first_date: date,
+                            second_date: date,
+                            engine: str | None = None,
+                            report_format: str = ReportFormat.CSV) -> str | bytes:
     """
     Generate a finance report based on the specified date range.
 
     Parameters:
     - first_date (date): The first month of the report.
     - second_date (date): The second month of the report.
+    - engine (str | None): One of the ReportEngines names, the configured engine by default.
+    - report_format (str): The output format, one of the ReportFormat values.
 
     Returns:
-    str: A formatted finance report as a string.
+    str | bytes: A formatted finance report (CSV as a string, JSON and Arrow as bytes).
     """
+    formatter = get_report_formatter(report_format)
+
+    DataLoader.load(engine=SQLEngine, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+
+    report_controller = ReportEngines.get(engine).create_controller()
+
+    start = time.perf_counter()
+    with MemoryProfiler.stage('metrics'):
+        report_metrics = report_controller.calculate_metrics(first_date, second_date)
+
+    # A sample of the reports is cross-checked with the shadow engine
+    ShadowEngine.submit(first_date, second_date, report_metrics, time.perf_counter() - start)
+
+    with MemoryProfiler.stage('format'):
+        raw_data = formatter.format(report_metrics)
+
+    return raw_data
+
+
+@log_function_call
+def generate_finance_periods_report(first_period: DateRange,
+                                    second_period: DateRange,
+                                    report_format: str = ReportFormat.CSV) -> str | bytes:
+    """
+    Generate a finance report comparing two arbitrary ranges of days (e.g. week-to-date, quarter-to-date).
+
+    The range totals are looked up in the cumulative daily totals index, whatever the length of the ranges.
+
+    Parameters:
+    - first_period (DateRange): The first range of days.
+    - second_period (DateRange): The second range of days.
+    - report_format (str): The output format, one of the ReportFormat values.
+
+    Returns:
+    str | bytes: A formatted finance report.
+    """
+    formatter = get_report_formatter(report_format)
 
     DataLoader.load(engine=SQLEngine, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
 
-    # report_controller = FinanceReportServiceController(
-    #     data_source_class=TransactionsMonthData,
-    #     metrics_calculator_calc=FinanceMetricsExtCalculator
-    # )
     report_controller = FinanceReportServiceController(
-        data_source_class=MetricsMonthData,
+        data_source_class=RangeMetricsData,
         metrics_calculator_calc=FinanceMetricsSimpleCalculator
     )
 
-    report_metrics = report_controller.calculate_metrics(first_date, second_date)
+    with MemoryProfiler.stage('metrics'):
+        report_metrics = report_controller.calculate_periods_metrics(first_period, second_period)
+
+    with MemoryProfiler.stage('format'):
+        raw_data = formatter.format(report_metrics)
+
+    return raw_data
+
+
+@log_function_call
+def generate_comparison_report(month_date: date,
+                               mode: str,
+                               months_count: int = 1,
+                               report_format: str = ReportFormat.CSV) -> str | bytes:
+    """
+    Generate a finance report comparing the month with the previous month or the same month last year,
+    or the trailing months with the months before them.
+
+    Parameters:
+    - month_date (date): A date within the month of the report.
+    - mode (str): One of the ComparisonMode values.
+    - months_count (int): The number of months in the periods of the trailing mode.
+    - report_format (str): The output format, one of the ReportFormat values.
+
+    Returns:
+    str | bytes: A formatted finance report.
+    """
+    formatter = get_report_formatter(report_format)
+
+    DataLoader.load(engine=SQLEngine, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+
+    report_controller = ComparisonReportServiceController(
+        data_source_class=PeriodsMetricsMonthsData,
+        metrics_calculator_calc=FinanceMetricsSimpleCalculator
+    )
+
+    with MemoryProfiler.stage('metrics'):
+        report_metrics = report_controller.calculate_metrics(month_date, mode, months_count)
+
+    with MemoryProfiler.stage('format'):
+        raw_data = formatter.format(report_metrics)
+
+    return raw_data
+
+
+@log_function_call
+def generate_accounts_report(first_date: date, second_date: date, report_format: str = ReportFormat.CSV) -> str | bytes:
+    """
+    Generate a per-account finance report (revenues and expenses drill-down) for two months.
+
+    Parameters:
+    - first_date (date): The first month of the report.
+    - second_date (date): The second month of the report.
+    - report_format (str): The output format, one of the ReportFormat values.
+
+    Returns:
+    str | bytes: A formatted per-account finance report.
+    """
+    formatter = get_report_formatter(report_format, ACCOUNTS_REPORT_FORMATTERS)
+
+    DataLoader.load(engine=SQLEngine, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+
+    report_controller = AccountsReportServiceController(
+        data_source_class=AccountsMetricsMonthsData,
+        metrics_calculator_calc=FinanceMetricsSimpleCalculator
+    )
+
+    with MemoryProfiler.stage('metrics'):
+        report_metrics = report_controller.calculate_metrics(first_date, second_date)
+
+    with MemoryProfiler.stage('format'):
+        raw_data = formatter.format(report_metrics)
+
+    return raw_data
+
+
+@log_function_call
+def generate_movers_report(first_date: date,
+                           second_date: date,
+                           count: int = 10,
+                           report_format: str = ReportFormat.CSV) -> str | bytes:
+    """
+    Generate a report of the accounts with the largest absolute and percentage changes between two months.
+
+    Parameters:
+    - first_date (date): The first month of the report.
+    - second_date (date): The second month of the report.
+    - count (int): The number of the accounts selected by each change.
+    - report_format (str): The output format, one of the ReportFormat values.
+
+    Returns:
+    str | bytes: A formatted movers report.
+    """
+    formatter = get_report_formatter(report_format, MOVERS_REPORT_FORMATTERS)
+
+    DataLoader.load(engine=SQLEngine, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+
+    report_controller = AccountsMoversServiceController(
+        data_source_class=AccountsAmountsMonthsData,
+        metrics_calculator_calc=MoversMetricsCalculator
+    )
+
+    with MemoryProfiler.stage('metrics'):
+        report_metrics = report_controller.calculate_metrics(first_date, second_date, count)
+
+    with MemoryProfiler.stage('format'):
+        raw_data = formatter.format(report_metrics)
+
+    return raw_data
+
+
+@log_function_call
+def generate_matrix_report(first_date: date, months_count: int = 12, report_format: str = ReportFormat.CSV) -> str | bytes:
+    """
+    Generate a report comparing every month with every other month of the consecutive months.
+
+    The metrics of the months are aggregated once, the differences of all the pairs are derived from them.
+
+    Parameters:
+    - first_date (date): A date within the first month.
+    - months_count (int): The number of months, e.g. 12 for a year.
+    - report_format (str): The output format, one of the ReportFormat values.
+
+    Returns:
+    str | bytes: A formatted months matrix report.
+    """
+    formatter = get_report_formatter(report_format, MATRIX_REPORT_FORMATTERS)
+
+    DataLoader.load(engine=SQLEngine, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+
+    report_controller = MatrixReportServiceController(
+        data_source_class=PeriodsMetricsMonthsData,
+        metrics_calculator_calc=MatrixMetricsCalculator
+    )
+
+    first_date = first_date.replace(day=1)
+    with MemoryProfiler.stage('metrics'):
+        report_metrics = report_controller.calculate_metrics([add_months(first_date, i) for i in range(months_count)])
 
-    raw_data = FinanceReportFormatter.format(report_metrics)
+    with MemoryProfiler.stage('format'):
+        raw_data = formatter.format(report_metrics)
 
     return raw_data
+
+
+# The bookings are exported in batches of that many rows
+TRANSACTIONS_EXPORT_BATCH_ROWS = 10000
+
+
+def format_transactions_cursor(row: tuple) -> str:
+    """
+    Get the cursor of the page following the booking: its transaction date and id, e.g. 2020-06-03_1234.
+    """
+    transaction_id, month_key, day = row[:3]
+    return f'{month_key // 100:04d}-{month_key % 100:02d}-{day:02d}_{transaction_id}'
+
+
+def parse_transactions_cursor(cursor: str) -> tuple[date, int]:
+    """
+    Parse the cursor of a page into the transaction date and the id of the last booking of the previous page.
+
+    Raises:
+    - ValueError: if the cursor is malformed.
+    """
+    transaction_date, separator, transaction_id = cursor.partition('_')
+    if not separator:
+        raise ValueError(f'Invalid cursor "{cursor}"')
+
+    return date.fromisoformat(transaction_date), int(transaction_id)
+
+
+@log_function_call
+def list_transactions(month_date: date | None = None,
+                      account_code: int | None = None,
+                      nature: str | None = None,
+                      after: tuple[date, int] | None = None,
+                      limit: int = 100) -> dict:
+    """
+    Get a page of the bookings ordered by transaction date and id.
+
+    Parameters:
+    - month_date (date | None): A date within the month of the bookings, all the months if None.
+    - account_code (int | None): The account of the bookings.
+    - nature (str | None): The nature of the accounts of the bookings.
+    - after (tuple[date, int] | None): The position of the page, parsed from the cursor of the previous page.
+    - limit (int): The page size.
+
+    Returns:
+    dict: The bookings and the cursor of the next page, None on the last page.
+    """
+    # One booking more tells whether there is a next page
+    rows = TransactionsListData.get(month_date, account_code, nature, after, limit + 1)
+    next_cursor = format_transactions_cursor(rows[limit - 1]) if len(rows) > limit else None
+
+    return {
+        'transactions': TransactionsFormatter.to_dicts(rows[:limit]),
+        'next_cursor':  next_cursor,
+    }
+
+
+@log_function_call
+def export_transactions(month_date: date | None = None,
+                        account_code: int | None = None,
+                        nature: str | None = None,
+                        after: tuple[date, int] | None = None,
+                        sql_engine: Engine | None = None) -> Iterator[str]:
+    """
+    Export all the bookings ordered by transaction date and id as CSV, batch by batch in constant memory.
+
+    Parameters:
+    - sql_engine (Engine | None): The engine of the store, the generator may run outside of the request context.
+
+    Yields:
+    str: The CSV lines of a batch of the bookings, the first batch starts with the header.
+    """
+    rows = TransactionsListData.iter(month_date, account_code, nature, after,
+                                     batch_rows=TRANSACTIONS_EXPORT_BATCH_ROWS, sql_engine=sql_engine)
+
+    header = True
+    while True:
+        batch = list(itertools.islice(rows, TRANSACTIONS_EXPORT_BATCH_ROWS))
+        if batch or header:
+            yield TransactionsFormatter.to_csv(batch, header)
+
+        if len(batch) < TRANSACTIONS_EXPORT_BATCH_ROWS:
+            break
+
+        header = False
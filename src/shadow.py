@@ -0,0 +1,149 @@
+import math
+import time
+import random
+import logging
+import threading
+import contextvars
+import dataclasses
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+import src.config as cfg
+import src.metrics as fm
+from src.engines import ReportEngines
+from src.data_adapters import SQLEngine, DataStore
+from src.service_metrics import ServiceMetrics
+
+
+logger = logging.getLogger(cfg.LOGGER_NAME)
+
+
+class ShadowEngine:
+    """
+    Shadow mode: a sample of the finance reports is computed again by a second engine and the metrics are compared.
+
+    The second engine runs on a background thread, after the response is computed, so it never delays the
+    response. The sampled reports above MAX_PENDING waiting for the background thread are not compared.
+    The runs, the mismatches and the seconds spent by each engine are counted in the ServiceMetrics.
+    """
+    SAMPLE_RATE: float = cfg.SHADOW_SAMPLE_RATE
+    TOLERANCE: float = cfg.SHADOW_TOLERANCE
+    MAX_PENDING: int = cfg.SHADOW_MAX_PENDING
+
+    ENGINE: str = cfg.SHADOW_ENGINE
+
+    _executor: ThreadPoolExecutor = None
+    _pending: int = 0
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def submit(cls, first_date: date, second_date: date, metrics: fm.FinanceReportMetrics, seconds: float) -> bool:
+        """
+        Compare the metrics of the primary engine with the second engine, if the report is sampled.
+
+        Parameters:
+        - first_date (date): The first month of the report.
+        - second_date (date): The second month of the report.
+        - metrics (fm.FinanceReportMetrics): The metrics calculated by the primary engine.
+        - seconds (float): The time spent by the primary engine.
+
+        Returns:
+        - bool: True if the report is going to be compared.
+        """
+        if cls.SAMPLE_RATE <= 0 or random.random() >= cls.SAMPLE_RATE:
+            return False
+
+        # The background thread queries the store of the request (e.g. of the tenant), it is not cleared
+        # by a reload until compared
+        store = SQLEngine.store()
+        if not store.retain():
+            return False
+
+        with cls._lock:
+            if cls._pending >= cls.MAX_PENDING:
+                ServiceMetrics.increment(ServiceMetrics.SHADOW_DROPPED)
+                store.release()
+                return False
+
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+
+            cls._pending += 1
+
+        context = contextvars.copy_context()
+        version = store.get_version()
+
+        cls._executor.submit(context.run, cls._compare, first_date, second_date, metrics, seconds, store, version)
+
+        return True
+
+    @classmethod
+    def wait(cls) -> None:
+        """
+        Wait until the submitted reports are compared.
+        """
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @classmethod
+    def _compare(cls, first_date: date, second_date: date, metrics: fm.FinanceReportMetrics, seconds: float,
+                 store: DataStore, version: int) -> None:
+        try:
+            start = time.perf_counter()
+
+            # Read under the read lock of the store as the requests are, the month reloads wait for the comparison
+            with store.reading():
+                controller = ReportEngines.get(cls.ENGINE).create_controller()
+                shadow_metrics = controller.calculate_metrics(first_date, second_date)
+
+            shadow_seconds = time.perf_counter() - start
+
+            if store.get_version() != version:
+                # The data was reloaded in between, the engines did not see the same data
+                ServiceMetrics.increment(ServiceMetrics.SHADOW_SKIPPED)
+                return
+
+            ServiceMetrics.increment(ServiceMetrics.SHADOW_RUNS)
+            ServiceMetrics.increment(ServiceMetrics.SHADOW_PRIMARY_SECONDS, seconds)
+            ServiceMetrics.increment(ServiceMetrics.SHADOW_SECONDARY_SECONDS, shadow_seconds)
+
+            differences = get_differences(dataclasses.asdict(metrics), dataclasses.asdict(shadow_metrics),
+                                          cls.TOLERANCE)
+            if differences:
+                ServiceMetrics.increment(ServiceMetrics.SHADOW_MISMATCHES)
+                logger.warning(f'Shadow engine mismatch for {first_date} and {second_date}: {differences}')
+        except Exception:
+            ServiceMetrics.increment(ServiceMetrics.SHADOW_ERRORS)
+            logger.exception(f'Shadow engine failed for {first_date} and {second_date}')
+        finally:
+            store.release()
+            with cls._lock:
+                cls._pending -= 1
+
+
+def get_differences(primary: dict, shadow: dict, tolerance: float, path: str = '') -> list[str]:
+    """
+    Compare two metrics converted to dicts, the numbers are compared within the relative or absolute tolerance.
+
+    Returns:
+    - list[str]: The paths of the fields that differ, e.g. 'first_month.revenue'.
+    """
+    differences = []
+
+    for name, value in primary.items():
+        field_path = f'{path}.{name}' if path else name
+        shadow_value = shadow.get(name)
+
+        if isinstance(value, dict) and isinstance(shadow_value, dict):
+            differences.extend(get_differences(value, shadow_value, tolerance, field_path))
+        elif isinstance(value, (int, float)) and isinstance(shadow_value, (int, float)):
+            if not math.isclose(value, shadow_value, rel_tol=tolerance, abs_tol=tolerance):
+                differences.append(field_path)
+        elif value != shadow_value:
+            differences.append(field_path)
+
+    return differences
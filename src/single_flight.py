@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+from src.service_metrics import ServiceMetrics
+
+
+class SingleFlight:
+    """
+    Deduplication of concurrent identical calls.
+
+    The first caller of a key runs the function, the callers arriving with the same key while it runs wait
+    for its result (or its exception) instead of running the function again. Nothing is cached: a call arriving
+    after the result is ready runs the function again.
+    """
+    def __init__(self, coalesced_metric: str = None):
+        """
+        Parameters:
+        - coalesced_metric (str): The ServiceMetrics counter of the calls that waited for another caller's result.
+        """
+        self._coalesced_metric: str = coalesced_metric
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: Hashable, func: Callable, *args) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            if self._coalesced_metric is not None:
+                ServiceMetrics.increment(self._coalesced_metric)
+            return future.result()
+
+        try:
+            result = func(*args)
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,291 @@
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from src.data_adapters import DataStore, DataLoader, SQLEngine, ACCOUNTS_FILE, TRANSACTIONS_FILE
+import src.config as cfg
+
+
+logger = logging.getLogger(cfg.LOGGER_NAME)
+
+TENANT_HEADER = 'x-tenant'
+TENANT_PATH_PREFIX = '/tenants/'
+
+TENANT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class TenantNotFoundError(LookupError):
+    pass
+
+
+class TenantStores:
+    """
+    Registry of the per-tenant data stores.
+
+    A tenant store is loaded lazily on its first use from TENANTS_FOLDER/<tenant>/. When the loaded stores take
+    more memory than TENANTS_MEMORY_BUDGET, the least recently used ones are evicted and loaded again on their
+    next use. Stores used by in-flight requests or retained otherwise are never evicted.
+
+    A store is reloaded into a new store while the current one keeps serving, then the new store is swapped in
+    and the current one is cleared after its in-flight requests (see reload).
+    """
+    _tenants_folder: str = cfg.TENANTS_FOLDER
+    _memory_budget: int = cfg.TENANTS_MEMORY_BUDGET
+
+    _stores: OrderedDict[str, DataStore] = OrderedDict()
+    _sizes: dict[str, int] = {}
+    _in_use: dict[str, int] = {}
+    _load_locks: dict[str, threading.Lock] = {}
+    _default_load_lock = threading.Lock()
+
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, tenants_folder: str = None, memory_budget: int = None) -> None:
+        """
+        Change the tenants folder and/or the memory budget, all loaded stores are released.
+        """
+        cls.clear()
+
+        if tenants_folder is not None:
+            cls._tenants_folder = tenants_folder
+        if memory_budget is not None:
+            cls._memory_budget = memory_budget
+
+    @classmethod
+    @contextmanager
+    def acquire(cls, tenant: str | None = None):
+        """
+        Activate the store of the tenant for the current context, loading it first if needed.
+
+        Without a tenant the default store of the data folder is used. The store is read under its read lock,
+        its month reloads wait until the context is left.
+
+        Raises:
+        - TenantNotFoundError: if there is no dataset for the tenant.
+        """
+        # The store stays active for the whole request, even if a reload swaps in a new one meanwhile
+        with cls.pin(tenant) as store, store.reading(), SQLEngine.use(store):
+            yield store
+
+    @classmethod
+    @contextmanager
+    def pin(cls, tenant: str | None = None):
+        """
+        Load the store of the tenant if needed and keep it from being evicted, without activating it for the context.
+
+        Unlike acquire it can be left from another thread or context, e.g. by a response streamed
+        after the request handler returned.
+
+        Raises:
+        - TenantNotFoundError: if there is no dataset for the tenant.
+        """
+        if not tenant:
+            store = SQLEngine.default_store()
+            # The store may have been retired by a reload in between, the swapped in store is used then
+            while not store.retain():
+                store = SQLEngine.default_store()
+
+            try:
+                with cls._default_load_lock:
+                    if store.get() is None:
+                        DataLoader.load(engine=store, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+
+                yield store
+            finally:
+                store.release()
+            return
+
+        store, load_lock = cls._pin(tenant)
+        try:
+            with load_lock:
+                if store.get() is None:
+                    DataLoader.load(engine=store, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+                    cls._loaded(tenant, store)
+
+            yield store
+        finally:
+            store.release()
+            cls._unpin(tenant)
+
+    @classmethod
+    def reload(cls, tenant: str | None = None) -> DataStore:
+        """
+        Load the dataset of the tenant (or the default dataset) into a new store and swap it in.
+
+        The current store keeps serving while the new one is loaded. The requests started after the swap use
+        the new store, the replaced store is cleared when the requests using it are completed, without
+        waiting for them.
+
+        Raises:
+        - TenantNotFoundError: if there is no dataset for the tenant.
+
+        Returns:
+        - DataStore: The new store.
+        """
+        if tenant:
+            store = DataStore(cls.get_data_folder(tenant))
+        else:
+            store = DataStore(SQLEngine.default_store().get_data_folder())
+
+        DataLoader.load(engine=store, acc_file=ACCOUNTS_FILE, trans_file=TRANSACTIONS_FILE)
+
+        if tenant:
+            old_store = cls._swap(tenant, store)
+        else:
+            old_store = SQLEngine.swap(store)
+
+        logger.info(f'Store of {store.get_data_folder()} is reloaded, data version {store.get_version()}')
+
+        if old_store is not None:
+            old_store.retire()
+
+        return store
+
+    @classmethod
+    def loaded_tenants(cls) -> list[str]:
+        """
+        Get the tenants with loaded stores, least recently used first.
+        """
+        with cls._lock:
+            return [tenant for tenant, store in cls._stores.items() if store.get() is not None]
+
+    @classmethod
+    def memory_size(cls) -> int:
+        with cls._lock:
+            return sum(cls._sizes.values())
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Release all the loaded stores. The stores in use (pinned by in-flight requests or retained otherwise) are
+        retired: they are cleared by the release of their last user. The pins are still counted until left.
+        """
+        with cls._lock:
+            stores = list(cls._stores.values())
+
+            cls._stores.clear()
+            cls._sizes.clear()
+            cls._load_locks.clear()
+
+        for store in stores:
+            store.retire()
+
+    @classmethod
+    def get_data_folder(cls, tenant: str) -> str:
+        """
+        Get the data folder of the tenant.
+
+        Raises:
+        - TenantNotFoundError: if there is no dataset for the tenant.
+        """
+        if not TENANT_NAME_PATTERN.match(tenant):
+            raise TenantNotFoundError(f'Unknown tenant "{tenant}"')
+
+        data_folder = os.path.join(cls._tenants_folder, tenant)
+
+        for data_file in (ACCOUNTS_FILE, TRANSACTIONS_FILE):
+            if not os.path.isfile(os.path.join(data_folder, data_file)):
+                raise TenantNotFoundError(f'Unknown tenant "{tenant}"')
+
+        return data_folder
+
+    @classmethod
+    def _pin(cls, tenant: str) -> tuple[DataStore, threading.Lock]:
+        with cls._lock:
+            store = cls._stores.get(tenant)
+            if store is None:
+                store = DataStore(cls.get_data_folder(tenant))
+                cls._stores[tenant] = store
+                cls._load_locks[tenant] = threading.Lock()
+
+            # The stores of the registry are never retired: they are swapped out or cleared under the lock first
+            store.retain()
+
+            cls._stores.move_to_end(tenant)
+            cls._in_use[tenant] = cls._in_use.get(tenant, 0) + 1
+
+            return store, cls._load_locks[tenant]
+
+    @classmethod
+    def _unpin(cls, tenant: str) -> None:
+        with cls._lock:
+            cls._in_use[tenant] -= 1
+            if cls._in_use[tenant] == 0:
+                del cls._in_use[tenant]
+
+    @classmethod
+    def _swap(cls, tenant: str, store: DataStore) -> DataStore | None:
+        size = store.memory_size()
+
+        with cls._lock:
+            old_store = cls._stores.get(tenant)
+
+            cls._stores[tenant] = store
+            cls._stores.move_to_end(tenant)
+            cls._load_locks.setdefault(tenant, threading.Lock())
+            cls._sizes[tenant] = size
+            cls._evict(keep=tenant)
+
+        return old_store
+
+    @classmethod
+    def _loaded(cls, tenant: str, store: DataStore) -> None:
+        size = store.memory_size()
+        logger.info(f'Tenant "{tenant}" store is loaded, {size} bytes')
+
+        with cls._lock:
+            # A store released by clear while it was loaded is not registered again
+            if cls._stores.get(tenant) is not store:
+                return
+
+            cls._sizes[tenant] = size
+            cls._evict(keep=tenant)
+
+    @classmethod
+    def _evict(cls, keep: str) -> None:
+        """
+        Evict the least recently used idle stores until the loaded stores fit into the memory budget.
+
+        A store is idle when no request pins it and nothing else retains it.
+        """
+        total_size = sum(cls._sizes.values())
+
+        for tenant in list(cls._stores):
+            if total_size <= cls._memory_budget:
+                break
+
+            # The stores retained outside of the requests, e.g. by the shadow engine, are in use as well
+            if tenant == keep or tenant in cls._in_use or cls._stores[tenant].in_use():
+                continue
+
+            total_size -= cls._sizes.pop(tenant, 0)
+            cls._stores.pop(tenant).clear()
+            del cls._load_locks[tenant]
+
+            logger.info(f'Tenant "{tenant}" store is evicted')
+
+
+class TenantPathMiddleware:
+    """
+    ASGI middleware addressing a tenant by path prefix: /tenants/<tenant>/report is served as /report
+    with the X-Tenant header set to <tenant>.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'].startswith(TENANT_PATH_PREFIX):
+            tenant, _, path = scope['path'][len(TENANT_PATH_PREFIX):].partition('/')
+
+            scope = dict(scope)
+            scope['path'] = f'/{path}'
+            scope['raw_path'] = scope['path'].encode()
+            scope['headers'] = [
+                (name, value) for name, value in scope['headers'] if name != TENANT_HEADER.encode()
+            ] + [(TENANT_HEADER.encode(), tenant.encode())]
+
+        await self.app(scope, receive, send)
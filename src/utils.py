@@ -1,4 +1,10 @@
+import sys
 import logging
+import functools
+import threading
+import importlib.util
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 import calendar
 import src.config as cfg
@@ -6,6 +12,73 @@ import src.config as cfg
 logger = logging.getLogger(cfg.LOGGER_NAME)
 
 
+@dataclass(frozen=True)
+class DateRange:
+    """
+    A range of days, both ends included.
+    """
+    start_date: date
+    end_date: date
+
+    def __str__(self):
+        return f'{self.start_date.isoformat()}..{self.end_date.isoformat()}'
+
+
+class ComparisonMode:
+    """
+    Enumeration defining the report comparison modes, the periods are relative to the month of the report.
+    """
+    PREVIOUS_MONTH = 'previous_month'
+    PREVIOUS_YEAR = 'previous_year'
+    # The N months up to the month of the report vs the N months before them
+    TRAILING = 'trailing'
+
+    MODES = [PREVIOUS_MONTH, PREVIOUS_YEAR, TRAILING]
+
+
+def get_comparison_periods(month_date: date, mode: str, months_count: int = 1) -> tuple[DateRange, DateRange]:
+    """
+    Get the periods compared in the given comparison mode.
+
+    Parameters:
+    - month_date (date): A date within the month of the report.
+    - mode (str): One of the ComparisonMode values.
+    - months_count (int): The number of months in the periods of the trailing mode.
+
+    Returns:
+    - tuple[DateRange, DateRange]: The period of the report and the period it is compared to.
+    """
+    if mode == ComparisonMode.PREVIOUS_MONTH:
+        first_months, offset = 1, 1
+    elif mode == ComparisonMode.PREVIOUS_YEAR:
+        first_months, offset = 1, 12
+    elif mode == ComparisonMode.TRAILING:
+        first_months, offset = months_count, months_count
+    else:
+        raise ValueError(f'Unknown comparison mode "{mode}", supported modes: {", ".join(ComparisonMode.MODES)}')
+
+    def get_months_range(last_month_date: date, count: int) -> DateRange:
+        return DateRange(add_months(last_month_date, 1 - count), get_last_day_of_the_month(last_month_date).date())
+
+    return (get_months_range(month_date, first_months),
+            get_months_range(add_months(month_date, -offset), first_months))
+
+
+def add_months(dt: date, months: int) -> date:
+    """
+    Get the first day of the month the given number of months before or after the month of a given date.
+
+    Parameters:
+    - dt (date): The input date.
+    - months (int): The number of months, negative to go back.
+
+    Returns:
+    - date: The first day of the month.
+    """
+    month_index = dt.year * 12 + dt.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
 def get_first_day_of_the_month(dt: date) -> datetime:
     """
     Get the date with the first day of the month for a given date.
@@ -32,6 +105,19 @@ def get_last_day_of_the_month(dt: date) -> datetime:
     return datetime.combine((dt + timedelta(days=32)).replace(day=1) - timedelta(days=1), datetime.max.time())
 
 
+def get_month_key(dt: date) -> int:
+    """
+    Get the integer key of the month for a given date.
+
+    Parameters:
+    - dt (date): The input date.
+
+    Returns:
+    - int: The month key in the yyyymm form, e.g. 202006.
+    """
+    return dt.year * 100 + dt.month
+
+
 def get_month_name(month_date: date) -> str:
     """
     Get the name of the month for a given date.
@@ -48,7 +134,77 @@ def get_month_name(month_date: date) -> str:
     return month_name
 
 
+def lazy_import(name: str):
+    """
+    Import a module lazily: the module is executed on the first access to one of its attributes.
+
+    Heavy modules (pandas, numpy) imported this way do not slow down the start of the service and of the tools
+    that do not need them.
+
+    Parameters:
+    - name (str): The full name of the module.
+
+    Returns:
+    - module: The module, loaded or not yet.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    return module
+
+
+class ReadWriteLock:
+    """
+    Many readers or one writer. A waiting writer blocks the new readers, so the writers are not starved;
+    a thread must not take the read lock again while it holds it.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers: int = 0
+        self._writing: bool = False
+        self._writers_waiting: int = 0
+
+    @contextmanager
+    def reading(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._writing and not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._condition:
+            self._writers_waiting += 1
+            try:
+                self._condition.wait_for(lambda: not self._writing and not self._readers)
+            finally:
+                self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
 def log_function_call(func):
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         # Check if the function is a method within a class
         def get_class_name(obj):
@@ -66,11 +222,13 @@ def log_function_call(func):
             class_name = get_class_name(args[0])
 
         if class_name:
-            logger.info(f'Calling {class_name}.{func.__name__} with arguments: {args[1:]} and keyword arguments: {kwargs}')
+            logger.info('Calling %s.%s with arguments: %s and keyword arguments: %s',
+                        class_name, func.__name__, args[1:], kwargs)
         else:
-            logger.info(f'Calling {func.__name__} with arguments: {args} and keyword arguments: {kwargs}')
+            logger.info('Calling %s with arguments: %s and keyword arguments: %s', func.__name__, args, kwargs)
 
         result = func(*args, **kwargs)
-        logger.debug(f"{func.__name__} returned: {result}")
+        # Lazy formatting: the arguments are not formatted when the record is filtered out
+        logger.debug('%s returned: %s', func.__name__, result)
         return result
     return wrapper
@@ -1,13 +1,229 @@
 #!/usr/bin/env python3
+import gc
 import os
+import random
+import time
+import signal
+import logging
 import uvicorn
 
-if __name__ == "__main__":
+from src.log_handlers import QueueLogging
+
+# dev:        a single process reloaded on the source changes
+# production: the data is loaded once in the parent process, the workers are forked from it and share the loaded
+#             pages copy-on-write
+MODE_DEV = 'dev'
+MODE_PRODUCTION = 'production'
+
+APP = 'src.main:app'
+HOST = os.getenv('APP_HOST', '0.0.0.0')
+PORT = int(os.getenv('APP_PORT', 8000))
+MODE = os.getenv('APP_MODE', MODE_PRODUCTION)
+WORKERS = int(os.getenv('APP_WORKERS', 1))
+# A worker is recycled (gracefully restarted) after that many requests plus a random jitter, 0 - never
+WORKER_MAX_REQUESTS = int(os.getenv('APP_WORKER_MAX_REQUESTS', 0))
+WORKER_MAX_REQUESTS_JITTER = int(os.getenv('APP_WORKER_MAX_REQUESTS_JITTER', 0))
+# The in-flight requests of a stopping worker are given that many seconds to complete
+WORKER_GRACEFUL_TIMEOUT = int(os.getenv('APP_WORKER_GRACEFUL_TIMEOUT', 30))
+# The tenants loaded before the workers are forked, comma-separated
+PRELOAD_TENANTS = [tenant for tenant in os.getenv('APP_PRELOAD_TENANTS', '').split(',') if tenant]
+
 
+logger = logging.getLogger('app')
+
+
+def run_dev():
     uvicorn.run(
-        "src.main:app",
-        host=os.getenv("APP_HOST", "0.0.0.0"),
-        port=int(os.getenv("APP_PORT", 8000)),
-        workers=int(os.getenv("APP_WORKERS", 1)),
+        APP,
+        host=HOST,
+        port=PORT,
         reload=True,
     )
+
+
+class PreforkServer:
+    """
+    Production server: the data is loaded once, then the workers are forked and serve on the shared socket.
+
+    The workers that exit (recycled after WORKER_MAX_REQUESTS or crashed) are replaced by new forks of the
+    parent, so they get the preloaded data without loading it again. SIGHUP recycles all the workers one by one,
+    SIGUSR1 reloads the preloaded data in the parent and then recycles the workers, SIGTERM and SIGINT stop them
+    gracefully. The recycles and the reloads are only requested by the signal handlers, they are run by the
+    supervising loop.
+    """
+    # The supervising loop checks the exited workers and the requests of the signals at that interval
+    SUPERVISE_SECONDS: float = 0.5
+
+    def __init__(self, workers: int):
+        self._workers_count: int = workers
+        self._workers: set[int] = set()
+        self._stopping: bool = False
+        self._recycle: list[int] = []
+        self._recycle_requested: bool = False
+        self._reload_requested: bool = False
+
+        # log_config=None: the access log propagates to the queued handlers of the service (src.config)
+        self._config = uvicorn.Config(APP, host=HOST, port=PORT, timeout_graceful_shutdown=WORKER_GRACEFUL_TIMEOUT,
+                                      log_config=None)
+        self._socket = None
+
+    def run(self):
+        self._preload()
+
+        self._socket = self._config.bind_socket()
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._recycle_all)
+        signal.signal(signal.SIGUSR1, self._reload_all)
+
+        for _ in range(self._workers_count):
+            self._spawn()
+
+        self._supervise()
+
+    def _preload(self):
+        """
+        Import the application and load the datasets in the parent process, before the workers are forked.
+        """
+        import src.main
+        from src.tenants import TenantStores
+
+        for tenant in [None] + PRELOAD_TENANTS:
+            # The auto engine is measured by the load, once, before the fork
+            with TenantStores.pin(tenant):
+                pass
+
+        logger.info(f'Preloaded the data of {len(PRELOAD_TENANTS)} tenant(s) and the default dataset')
+
+        self._freeze()
+
+    @staticmethod
+    def _freeze():
+        # The preloaded objects are not tracked by the GC of the workers, so it does not write to their pages
+        gc.collect()
+        gc.freeze()
+
+    def _spawn(self):
+        pid = os.fork()
+
+        if pid == 0:
+            self._run_worker()
+
+        self._workers.add(pid)
+        logger.info(f'Worker {pid} started')
+
+    def _run_worker(self):
+        from src.reloads import StoreReloader
+
+        # POST /admin/reload reloads the data of all the workers through the server
+        StoreReloader.configure(supervisor_pid=os.getppid())
+
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        # The worker data is reloaded by its replacement, forked after the parent reloaded the data
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        # uvicorn re-raises the stop signal after the graceful shutdown, it is handled by _exit_worker
+        signal.signal(signal.SIGTERM, self._exit_worker)
+        signal.signal(signal.SIGINT, self._exit_worker)
+
+        if WORKER_MAX_REQUESTS > 0:
+            self._config.limit_max_requests = WORKER_MAX_REQUESTS + random.randint(0, WORKER_MAX_REQUESTS_JITTER)
+
+        exit_code = 0
+        try:
+            uvicorn.Server(self._config).run(sockets=[self._socket])
+        except BaseException:
+            logger.exception('Worker failed')
+            exit_code = 1
+        finally:
+            # os._exit skips the atexit handlers, the queued log records are written first
+            QueueLogging.stop()
+            os._exit(exit_code)
+
+    @staticmethod
+    def _exit_worker(signal_number, frame):
+        QueueLogging.stop()
+
+        signal.signal(signal_number, signal.SIG_DFL)
+        os.kill(os.getpid(), signal_number)
+
+    def _supervise(self):
+        while self._workers:
+            if not self._stopping and self._reload_requested:
+                self._reload_requested = False
+                self._reload()
+                self._recycle_requested = True
+
+            if not self._stopping and self._recycle_requested:
+                self._recycle_requested = False
+                self._recycle = list(self._workers)
+                self._recycle_next()
+
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+
+            if pid == 0:
+                # The wait is resumed after a signal handler (PEP 475): poll, so the requests of the signals are seen
+                time.sleep(self.SUPERVISE_SECONDS)
+                continue
+
+            self._workers.discard(pid)
+            logger.info(f'Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}')
+
+            if not self._stopping:
+                self._spawn()
+                self._recycle_next()
+
+        self._socket.close()
+
+    def _stop(self, signal_number, frame):
+        self._stopping = True
+
+        for pid in self._workers:
+            os.kill(pid, signal.SIGTERM)
+
+    def _recycle_all(self, signal_number, frame):
+        """
+        Request to restart the workers one by one: the next one is stopped when the replacement of the previous one
+        is started.
+        """
+        self._recycle_requested = True
+
+    def _reload_all(self, signal_number, frame):
+        """
+        Request to reload the preloaded data, then to recycle the workers.
+        """
+        self._reload_requested = True
+
+    def _reload(self):
+        """
+        Reload the preloaded data into new stores: the replacements of the workers are forked with the reloaded
+        data. The current workers keep serving the data they were forked with meanwhile.
+        """
+        from src.tenants import TenantStores
+
+        gc.unfreeze()
+
+        for tenant in [None] + PRELOAD_TENANTS:
+            try:
+                TenantStores.reload(tenant)
+            except Exception:
+                logger.exception(f'Reload of the data of tenant {tenant} failed, the loaded data is kept')
+
+        self._freeze()
+
+    def _recycle_next(self):
+        while self._recycle:
+            pid = self._recycle.pop()
+            if pid in self._workers:
+                os.kill(pid, signal.SIGTERM)
+                break
+
+
+if __name__ == "__main__":
+    if MODE == MODE_DEV:
+        run_dev()
+    else:
+        PreforkServer(WORKERS).run()
@@ -1,10 +1,18 @@
+import os
+import shutil
+
 import pytest
 from fastapi import FastAPI
 from starlette.testclient import TestClient
 
 import logging
 import src.config as cfg
+import src.data_adapters as db
 from src.main import app as orig_app
+from src.log_handlers import QueueLogging
+
+# The months moved from the bookings file into their month shards by the month_shards_folder fixture
+SHARD_MONTHS = (202005, 202006)
 
 
 @pytest.fixture
@@ -19,7 +27,76 @@ def client(app: FastAPI) -> TestClient:
     return TestClient(app)
 
 
+@pytest.fixture
+def queue_logging():
+    """
+    Give the test its own queue: the queue logging of the service is restored afterwards.
+    """
+    listener, queue_handler = QueueLogging._listener, QueueLogging._queue_handler
+
+    yield QueueLogging
+
+    QueueLogging.stop()
+    QueueLogging._listener, QueueLogging._queue_handler = listener, queue_handler
+    if listener is not None:
+        # The records queued by the service meanwhile are written by the restarted listener
+        listener.start()
+
+
+@pytest.fixture
+def month_shards_folder(tmp_path):
+    """
+    A data folder with the bookings of SHARD_MONTHS in their month shards, the other months in the bookings file.
+    """
+    shutil.copy(os.path.join(db.DATA_FOLDER, db.ACCOUNTS_FILE), tmp_path)
+
+    with open(os.path.join(db.DATA_FOLDER, db.TRANSACTIONS_FILE)) as f:
+        header, *lines = f.readlines()
+
+    files_lines = {db.TRANSACTIONS_FILE: []}
+    files_lines.update((db.DataLoader.get_month_file(month_key), []) for month_key in SHARD_MONTHS)
+    for line in lines:
+        month_file = db.DataLoader.get_month_file(int(line.rstrip()[-10:-3].replace('-', '')))
+        files_lines[month_file if month_file in files_lines else db.TRANSACTIONS_FILE].append(line)
+
+    for file_name, file_lines in files_lines.items():
+        with open(tmp_path / file_name, 'w') as f:
+            f.writelines([header] + file_lines)
+
+    return tmp_path
+
+
+@pytest.fixture
+def month_shards_store(month_shards_folder):
+    """
+    The default store replaced by a store of the month_shards_folder, the bookings are the same.
+    """
+    store = db.DataStore(str(month_shards_folder))
+    db.DataLoader.load(engine=store)
+
+    previous_store = db.SQLEngine.swap(store)
+    yield store
+    db.SQLEngine.swap(previous_store)
+    store.retire()
+
+
+def pytest_addoption(parser):
+    parser.addoption('--run-slow', action='store_true', default=False, help='Run the tests marked as slow as well')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-slow'):
+        return
+
+    skip_slow = pytest.mark.skip(reason='A slow test, run with --run-slow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip_slow)
+
+
 def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: a long-running test, skipped without --run-slow')
+
     log_lvl = 'ERROR'
 
     app_logger = logging.getLogger(cfg.LOGGER_NAME)
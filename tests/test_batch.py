@@ -0,0 +1,78 @@
+import time
+import logging
+from datetime import date
+
+import src.batch as batch
+import src.services as services
+from src.batch import BatchReports, parse_month_pair, get_range_month_pairs
+from src.formatters import ReportFormat
+from src.utils import ComparisonMode
+
+
+def test_batch_reports(monkeypatch, tmp_path):
+    # The pairs are split into chunks computed by both workers
+    monkeypatch.setattr(BatchReports, 'CHUNK_PAIRS', 2)
+    month_pairs = get_range_month_pairs(date(2020, 2, 1), date(2020, 12, 1))
+
+    stats = BatchReports.run(month_pairs, str(tmp_path), workers=2)
+
+    eq = (stats.reports == len(month_pairs) == len(list(tmp_path.iterdir())) and
+          stats.bytes > 0)
+    for first_date, second_date in month_pairs:
+        with open(tmp_path / BatchReports.get_file_name(first_date, second_date, ReportFormat.CSV), newline='') as f:
+            eq = eq and f.read() == services.generate_finance_report(first_date, second_date)
+
+    assert eq
+
+
+class SlowFileHandler(logging.FileHandler):
+    def emit(self, record):
+        # The records are still queued when the worker is done with its tasks
+        time.sleep(0.2)
+        super().emit(record)
+
+
+def log_reports(month_pairs, output_folder, report_format, engine):
+    logging.getLogger('test_batch_worker_logging').info('chunk of %s', month_pairs[0][0])
+    return len(month_pairs), 0
+
+
+def test_batch_worker_logging(monkeypatch, tmp_path, queue_logging):
+    handler = SlowFileHandler(str(tmp_path / 'batch.log'))
+    logger = logging.getLogger('test_batch_worker_logging')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+
+    # A chunk per worker task, every task logs a record just before its worker exits
+    monkeypatch.setattr(BatchReports, 'CHUNK_PAIRS', 1)
+    monkeypatch.setattr(batch, '_generate_reports', log_reports)
+    month_pairs = get_range_month_pairs(date(2020, 2, 1), date(2020, 5, 1))
+
+    queue_logging.start([logger.name])
+    try:
+        BatchReports.run(month_pairs, str(tmp_path / 'reports'), workers=2)
+    finally:
+        queue_logging.stop()
+        logger.handlers = []
+        handler.close()
+
+    with open(tmp_path / 'batch.log') as f:
+        records = sorted(f.read().splitlines())
+
+    eq = records == [f'chunk of {first_date}' for first_date, _ in month_pairs]
+    assert eq
+
+
+def test_batch_month_pairs():
+    eq = (parse_month_pair('2020-06:2020-05') == (date(2020, 6, 1), date(2020, 5, 1)) and
+          parse_month_pair('2020-06-15:2019-06-15') == (date(2020, 6, 1), date(2019, 6, 1)) and
+          get_range_month_pairs(date(2020, 11, 15), date(2021, 1, 1)) == [
+              (date(2020, 11, 1), date(2020, 10, 1)),
+              (date(2020, 12, 1), date(2020, 11, 1)),
+              (date(2021, 1, 1), date(2020, 12, 1)),
+          ] and
+          get_range_month_pairs(date(2020, 6, 1), date(2020, 6, 1), ComparisonMode.PREVIOUS_YEAR) == [
+              (date(2020, 6, 1), date(2019, 6, 1)),
+          ])
+    assert eq
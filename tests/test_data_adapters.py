@@ -1,5 +1,11 @@
+import os
+import time
+import shutil
+import threading
 import pandas as pd
+import pytest
 import src.data_adapters as db
+from src.service_metrics import ServiceMetrics
 
 
 ACCOUNTS_FILE_FULL_PATH = db.ACCOUNTS_FILE
@@ -37,3 +43,192 @@ def test_accounts_data_file_read():
 def test_transactions_data_file_read():
     result: pd.DataFrame = db.DataLoader._read_file(TRANSACTIONS_FILE_FULL_PATH)
     assert result is not None
+
+
+def test_parse_minor_units():
+    amounts = pd.Series(['353,22', '427,9', '14', '-0,58', '-1156,07'])
+
+    result = db.DataLoader._parse_minor_units(amounts)
+
+    eq = result.tolist() == [35322, 42790, 1400, -58, -115607]
+    assert eq
+
+
+def test_parse_invalid_minor_units():
+    amounts = pd.Series(['353,22', '1,005'])
+
+    try:
+        db.DataLoader._parse_minor_units(amounts)
+        raised = False
+    except pd.errors.DataError:
+        raised = True
+
+    assert raised
+
+
+def test_parallel_transactions_read(tmp_path, monkeypatch):
+    with open(os.path.join(db.DATA_FOLDER, TRANSACTIONS_FILE_FULL_PATH)) as f:
+        header, *rows = f.readlines()
+
+    # The bookings split into the main file and two shards
+    for file_name, file_rows in (('bookings.csv', rows[:2000]),
+                                 ('bookings-2.csv', rows[2000:4500]),
+                                 ('bookings-3.csv', rows[4500:])):
+        with open(tmp_path / file_name, 'w') as f:
+            f.writelines([header] + file_rows)
+
+    monkeypatch.setattr(db.DataLoader, 'PARALLEL_MIN_RANGE_BYTES', 1024)
+
+    def read_all(*args, **kwargs):
+        return pd.concat(db.DataLoader._iter_transactions(*args, **kwargs), ignore_index=True)
+
+    expected = read_all(TRANSACTIONS_FILE_FULL_PATH, workers=1)
+    sharded = read_all(TRANSACTIONS_FILE_FULL_PATH, str(tmp_path), workers=1)
+    parallel = read_all(TRANSACTIONS_FILE_FULL_PATH, str(tmp_path), workers=2, parallel_min_bytes=0)
+
+    ranges = db.DataLoader._split_file(str(tmp_path / 'bookings.csv'), 8)
+
+    eq = (len(ranges) > 1 and
+          expected.equals(sharded) and
+          expected.equals(parallel))
+    assert eq
+
+
+def test_streaming_load(monkeypatch):
+    monkeypatch.setattr(db.DataLoader, 'CHUNK_ROWS', 500)
+
+    store = db.DataStore()
+    orphan_rows_before = ServiceMetrics.get(ServiceMetrics.INGEST_ORPHAN_ROWS)
+
+    try:
+        stats = db.DataLoader.load(engine=store)
+
+        with store.get().connect() as conn:
+            stored_rows = conn.exec_driver_sql(f'select count(*) from {db.AppTables.TRANSACTION_DATA}').scalar()
+            orphan_rows = conn.exec_driver_sql(
+                f'select count(*) from {db.AppTables.TRANSACTION_DATA} ts '
+                f'where ts.account_code not in (select account_code from {db.AppTables.ACCOUNT_DATA})'
+            ).scalar()
+            wrong_natures = conn.exec_driver_sql(
+                f'select count(*) from {db.AppTables.TRANSACTION_DATA} ts, {db.AppTables.ACCOUNT_DATA} ac '
+                f'where ts.account_code = ac.account_code and ts.nature_code != ac.nature_code'
+            ).scalar()
+            daily_totals = conn.exec_driver_sql(
+                f'select sum(revenues), sum(expenses) from {db.AppTables.DAILY_TOTALS}'
+            ).first()
+            bookings_totals = conn.exec_driver_sql(
+                f'select '
+                    f'sum(iif(ts.nature_code = 1, ts.type_code * ts.amount, 0)), '
+                    f'sum(iif(ts.nature_code = 2, ts.type_code * ts.amount, 0)) '
+                f'from {db.AppTables.TRANSACTION_DATA} ts'
+            ).first()
+    finally:
+        store.clear()
+
+    eq = (stats.rows == len(db.DataLoader._read_file(TRANSACTIONS_FILE_FULL_PATH)) and
+          stats.orphan_rows > 0 and
+          stored_rows == stats.rows - stats.orphan_rows and
+          orphan_rows == 0 and
+          wrong_natures == 0 and
+          ServiceMetrics.get(ServiceMetrics.INGEST_ORPHAN_ROWS) - orphan_rows_before == stats.orphan_rows and
+          tuple(daily_totals) == tuple(bookings_totals))
+    assert eq
+
+
+def test_month_partitions(month_shards_folder):
+    def get_catalog(conn) -> dict:
+        return dict(conn.exec_driver_sql(f'select month_key, rows from {db.AppTables.TRANSACTION_PARTITIONS}').all())
+
+    june_file = month_shards_folder / db.DataLoader.get_month_file(202006)
+    store = db.DataStore(str(month_shards_folder))
+
+    try:
+        db.DataLoader.load(engine=store)
+
+        with store.get().connect() as conn:
+            catalog = get_catalog(conn)
+            stored_rows = conn.exec_driver_sql(f'select count(*) from {db.AppTables.TRANSACTION_DATA}').scalar()
+            june_rows = conn.exec_driver_sql('select count(*) from transact_data_202006').scalar()
+
+        # The June bookings are removed from the month shard and the month is reloaded
+        june_lines = june_file.read_text().splitlines(keepends=True)
+        june_file.write_text(june_lines[0])
+
+        reloaded_rows = db.DataLoader.reload_month(202006, engine=store)
+
+        with store.get().connect() as conn:
+            reloaded_catalog = get_catalog(conn)
+            june_totals = conn.exec_driver_sql(
+                f'select count(*) from {db.AppTables.DAILY_TOTALS} where month_key = 202006'
+            ).scalar()
+            reloaded_stored_rows = conn.exec_driver_sql(f'select count(*) from {db.AppTables.TRANSACTION_DATA}').scalar()
+
+        # Then put back, the reloaded bookings get new ids following the ids of the loaded bookings
+        june_file.write_text(''.join(june_lines))
+
+        restored_rows = db.DataLoader.reload_month(202006, engine=store)
+
+        with store.get().connect() as conn:
+            restored_catalog = get_catalog(conn)
+            max_other_id = conn.exec_driver_sql(
+                f'select max(id) from {db.AppTables.TRANSACTION_DATA} where month_key != 202006'
+            ).scalar()
+            june_min_id = conn.exec_driver_sql('select min(id) from transact_data_202006').scalar()
+    finally:
+        store.clear()
+
+    eq = (len(catalog) == 12 and
+          sum(catalog.values()) == stored_rows and
+          catalog[202006] == june_rows and
+          reloaded_rows == 0 and
+          reloaded_catalog == {month_key: rows for month_key, rows in catalog.items() if month_key != 202006} and
+          june_totals == 0 and
+          reloaded_stored_rows == stored_rows - june_rows and
+          restored_rows == june_rows and
+          restored_catalog == catalog and
+          june_min_id > max_other_id)
+    assert eq
+
+
+def test_reload_month_without_month_shard():
+    store = db.DataStore()
+
+    try:
+        db.DataLoader.load(engine=store)
+        with pytest.raises(FileNotFoundError):
+            db.DataLoader.reload_month(202006, engine=store)
+    finally:
+        store.clear()
+
+
+def test_connection_checkout_serialized():
+    store = db.DataStore()
+    store.init()
+    events = []
+
+    def read():
+        with store.get().connect() as conn:
+            events.append('second')
+            conn.exec_driver_sql('select 1').scalar()
+
+    try:
+        with store.get().connect() as conn:
+            # The connection is returned by the first close, a nested checkout would share it unserialized
+            try:
+                store.get().connect()
+                nested_refused = False
+            except RuntimeError:
+                nested_refused = True
+
+            thread = threading.Thread(target=read)
+            thread.start()
+            time.sleep(0.1)
+            events.append('first')
+            conn.exec_driver_sql('select 1').scalar()
+
+        thread.join()
+    finally:
+        store.clear()
+
+    eq = nested_refused and events == ['first', 'second']
+    assert eq
@@ -1,9 +1,10 @@
 import logging
-from datetime import date
+from datetime import date, datetime
 
 import src.data_adapters as da
 import src.data_helpers as dh
 import src.metrics as m
+import src.utils as utils
 
 
 def test_get_month_data():
@@ -43,9 +44,9 @@ def test_get_month_metrics():
         metrics = dh.MetricsMonthData.get(dt)
 
         etalon = m.BaseFinanceMetrics()
-        etalon.revenue = 13393.15
-        etalon.expenses = -34633.91
-        etalon.profit = -21240.76
+        etalon.revenue = 1339315
+        etalon.expenses = -3463391
+        etalon.profit = -2124076
         etalon.margin = -158.6
 
         eq = compare_metrics(metrics, etalon)
@@ -57,3 +58,119 @@ def test_get_month_metrics():
         da.SQLEngine.clear()
 
     assert compare_metrics(metrics, etalon)
+
+
+def test_get_accounts_months_metrics():
+    try:
+        da.DataLoader.load(engine=da.SQLEngine, acc_file=da.ACCOUNTS_FILE, trans_file=da.TRANSACTIONS_FILE)
+
+        first_dt = date(year=2020, month=6, day=15)
+        second_dt = date(year=2020, month=5, day=15)
+
+        accounts = dh.AccountsMetricsMonthsData.get(first_dt, second_dt)
+        first_metrics = dh.MetricsMonthData.get(first_dt)
+        second_metrics = dh.MetricsMonthData.get(second_dt)
+    except Exception as ex:
+        logging.critical(msg='', exc_info=ex)
+        raise ex
+    finally:
+        da.SQLEngine.clear()
+
+    account_codes = [account[0] for account in accounts]
+
+    eq = (account_codes == sorted(set(account_codes)) and
+          sum(account[2].revenue for account in accounts) == first_metrics.revenue and
+          sum(account[2].expenses for account in accounts) == first_metrics.expenses and
+          sum(account[3].revenue for account in accounts) == second_metrics.revenue and
+          sum(account[3].expenses for account in accounts) == second_metrics.expenses)
+    assert eq
+
+
+def test_month_data_decoding_views():
+    try:
+        da.DataLoader.load(engine=da.SQLEngine, acc_file=da.ACCOUNTS_FILE, trans_file=da.TRANSACTIONS_FILE)
+
+        transactions = dh.TransactionsMonthData.get(date(year=2020, month=1, day=15))
+    except Exception as ex:
+        logging.critical(msg='', exc_info=ex)
+        raise ex
+    finally:
+        da.SQLEngine.clear()
+
+    # The second booking of bookings.csv: 4152,debit,"353,22",2020-01-02
+    transaction = next(transaction for transaction in transactions if transaction.id == 1)
+
+    eq = (transaction.account_code == 4152 and
+          transaction.transaction_type == 'debit' and
+          transaction.amount == 35322 and
+          transaction.transaction_date == datetime(year=2020, month=1, day=2) and
+          transaction.account_nature == 'expense')
+    assert eq
+
+
+def test_month_metrics_engines_agree():
+    try:
+        da.DataLoader.load(engine=da.SQLEngine, acc_file=da.ACCOUNTS_FILE, trans_file=da.TRANSACTIONS_FILE)
+
+        dt = date(year=2020, month=6, day=15)
+
+        sql_metrics = dh.MetricsMonthData.get(dt)
+
+        ext_metrics = m.BaseFinanceMetrics()
+        m.FinanceMetricsExtCalculator._calc_month_metrics(dh.TransactionsMonthData.get(dt), ext_metrics)
+    except Exception as ex:
+        logging.critical(msg='', exc_info=ex)
+        raise ex
+    finally:
+        da.SQLEngine.clear()
+
+    # Integer minor units: the totals of both engines are bit-exact
+    eq = (sql_metrics.revenue == ext_metrics.revenue and
+          sql_metrics.expenses == ext_metrics.expenses and
+          sql_metrics.profit == ext_metrics.profit)
+    assert eq
+
+
+def test_daily_totals_month_metrics():
+    try:
+        da.DataLoader.load(engine=da.SQLEngine, acc_file=da.ACCOUNTS_FILE, trans_file=da.TRANSACTIONS_FILE)
+
+        months = [date(year=2020, month=month, day=1) for month in range(1, 13)] + [date(year=1999, month=1, day=1)]
+
+        metrics = [dh.MetricsMonthData.get(dt) for dt in months]
+        totals_metrics = [dh.DailyTotalsMonthData.get(dt) for dt in months]
+    finally:
+        da.SQLEngine.clear()
+
+    eq = metrics == totals_metrics
+    assert eq
+
+
+def test_range_metrics():
+    try:
+        da.DataLoader.load(engine=da.SQLEngine, acc_file=da.ACCOUNTS_FILE, trans_file=da.TRANSACTIONS_FILE)
+
+        june = dh.RangeMetricsData.get(utils.DateRange(date(2020, 6, 1), date(2020, 6, 30)))
+        june_month = dh.MetricsMonthData.get(date(2020, 6, 15))
+
+        # Ranges across the month boundary and outside the ledger
+        ranges = [(date(2020, 5, 20), date(2020, 6, 10)), (date(2019, 12, 1), date(2020, 1, 15)),
+                  (date(1999, 1, 1), date(1999, 12, 31)), (date(2020, 6, 10), date(2020, 6, 10))]
+        range_totals = [da.SQLEngine.get_daily_index().get(start_date, end_date) for start_date, end_date in ranges]
+
+        with da.SQLEngine.get().connect() as conn:
+            scanned_totals = [tuple(conn.exec_driver_sql(
+                f'select '
+                    f'coalesce(sum(iif(ac.nature_code = 1, ts.type_code * ts.amount, 0)), 0), '
+                    f'coalesce(sum(iif(ac.nature_code = 2, ts.type_code * ts.amount, 0)), 0) '
+                f'from {da.AppTables.TRANSACTION_DATA} ts, {da.AppTables.ACCOUNT_DATA} ac '
+                f'where ts.account_code = ac.account_code '
+                    f'and ts.month_key * 100 + ts.day between ? and ?',
+                (int(start_date.strftime('%Y%m%d')), int(end_date.strftime('%Y%m%d')))
+            ).first()) for start_date, end_date in ranges]
+    finally:
+        da.SQLEngine.clear()
+
+    eq = (june == june_month and
+          range_totals == scanned_totals)
+    assert eq
@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.services as services
+import src.data_adapters as db
+from src.engines import ReportEngines
+
+
+def test_report_engines_agree():
+    reports = {
+        name: services.generate_finance_report(date(2020, 6, 1), date(2020, 5, 1), name)
+        for name in ReportEngines.names()
+    }
+
+    eq = len(set(reports.values())) == 1
+    assert eq
+
+
+def test_auto_report_engine(monkeypatch):
+    monkeypatch.setattr(ReportEngines, 'AUTO_MIN_ROWS', 0)
+    monkeypatch.setattr(ReportEngines, 'AUTO_MEASURE_RUNS', 1)
+
+    # The engine is measured by the load and published with the store
+    store = db.DataStore()
+    try:
+        db.DataLoader.load(engine=store)
+        auto_engine = store.get_auto_engine()
+        with db.SQLEngine.use(store):
+            auto_name = ReportEngines.get(ReportEngines.AUTO).name
+    finally:
+        store.clear()
+
+    eq = auto_engine in ReportEngines.AUTO_CANDIDATES and auto_name == auto_engine
+    assert eq
+
+
+def test_auto_report_engine_small_data(monkeypatch):
+    monkeypatch.setattr(ReportEngines, 'AUTO_MIN_ROWS', 10 ** 9)
+
+    store = db.DataStore()
+    try:
+        db.DataLoader.load(engine=store)
+        auto_engine = store.get_auto_engine()
+    finally:
+        store.clear()
+
+    eq = auto_engine == ReportEngines.SQL
+    assert eq
+
+
+def test_auto_report_engine_not_measured_by_requests(monkeypatch):
+    def select_auto_name():
+        raise AssertionError('The auto engine is measured by a request')
+
+    monkeypatch.setattr(ReportEngines, 'select_auto_name', select_auto_name)
+
+    report = services.generate_finance_report(date(2020, 6, 1), date(2020, 5, 1), ReportEngines.AUTO)
+
+    eq = report == services.generate_finance_report(date(2020, 6, 1), date(2020, 5, 1), ReportEngines.SQL)
+    assert eq
+
+
+def test_unknown_report_engine(client: TestClient):
+    response = client.get('/report?first_date=2020-06-01&second_date=2020-05-01&engine=unknown')
+
+    with pytest.raises(ValueError):
+        ReportEngines.get('unknown')
+
+    eq = response.status_code == 422
+    assert eq
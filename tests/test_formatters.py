@@ -1,5 +1,9 @@
 from datetime import date
-from src.formatters import FinanceReportFormatter
+
+import orjson
+
+from src.formatters import (FinanceReportFormatter, FinanceReportJSONFormatter, FinanceReportArrowFormatter,
+                            ReportFormat)
 
 
 def test_finance_report_stream_header_formatter():
@@ -76,3 +80,48 @@ def test_finance_report_stream_margins_formatter():
 
     eq = value == example_value
     assert eq
+
+
+def _create_report_metrics():
+    import src.metrics as fm
+
+    metrics = fm.FinanceReportMetricsBuilder.create_object(date(year=2020, month=6, day=2), date(year=2020, month=5, day=3))
+    metrics.first_month.revenue = 111
+    metrics.second_month.revenue = 222
+    metrics.absolute_diff.revenue = -111
+    metrics.percent_diff.revenue = -50.0
+
+    return metrics
+
+
+def test_report_format_negotiation():
+    eq = (ReportFormat.negotiate(None, None) == ReportFormat.CSV and
+          ReportFormat.negotiate('*/*', None) == ReportFormat.CSV and
+          ReportFormat.negotiate('application/json', None) == ReportFormat.JSON and
+          ReportFormat.negotiate('text/csv;q=0.5, application/vnd.apache.arrow.stream', None) == ReportFormat.ARROW and
+          ReportFormat.negotiate('application/json', 'csv') == ReportFormat.CSV and
+          ReportFormat.negotiate('text/html', None) is None and
+          ReportFormat.negotiate(None, 'xml') is None)
+    assert eq
+
+
+def test_finance_report_json_formatter():
+    value = orjson.loads(FinanceReportJSONFormatter.format(_create_report_metrics()))
+
+    eq = (value['first_month'] == {'month': '2020-06', 'revenue': 1.11, 'expenses': 0, 'profit': 0, 'margin': 0} and
+          value['second_month']['month'] == '2020-05' and
+          value['absolute_diff']['revenue'] == -1.11 and
+          value['percent_diff']['revenue'] == -50.0)
+    assert eq
+
+
+def test_finance_report_arrow_formatter():
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(FinanceReportArrowFormatter.format(_create_report_metrics())).read_all()
+
+    eq = (table.column('metric').to_pylist() == ['Revenues', 'Expenses', 'Profits', 'Margins'] and
+          table.column('first_month').to_pylist() == [1.11, 0, 0, 0] and
+          table.column('percent_diff').to_pylist() == [-50.0, 0, 0, 0] and
+          table.schema.metadata[b'second_month'] == b'2020-05')
+    assert eq
@@ -0,0 +1,46 @@
+import os
+import re
+import subprocess
+import sys
+
+import src.data_adapters as da
+
+
+# The cumulative import time of src.main, in microseconds. Without pandas it takes about 1s on a slow CI runner.
+IMPORT_TIME_BUDGET_US = 2_500_000
+# The number of the modules imported by src.main, about 570 without pandas and numpy, which add about 500 more
+IMPORT_MODULES_BUDGET = 700
+
+LAZY_MODULES = ('pandas', 'numpy')
+
+
+def import_main() -> dict[str, int]:
+    """
+    Import src.main in a fresh interpreter with -X importtime.
+
+    Returns:
+        dict[str, int]: The cumulative import times of the imported modules in microseconds, a module per item.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+                            cwd=da.BASE_DIR, env=dict(os.environ, PYTHONPATH=str(da.BASE_DIR)),
+                            capture_output=True, text=True, check=True)
+
+    import_times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)', line)
+        if match:
+            import_times[match.group(2)] = int(match.group(1))
+
+    return import_times
+
+
+def test_main_import_time():
+    import_times = import_main()
+
+    eagerly_imported = [module_name for module_name in import_times
+                        if module_name.split('.')[0] in LAZY_MODULES]
+
+    eq = (eagerly_imported == [] and
+          import_times['src.main'] <= IMPORT_TIME_BUDGET_US and
+          len(import_times) <= IMPORT_MODULES_BUDGET)
+    assert eq, f'src.main imports {len(import_times)} modules in {import_times["src.main"]}us'
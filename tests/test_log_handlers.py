@@ -0,0 +1,87 @@
+import os
+import logging
+import threading
+
+import src.config as cfg
+from src.log_handlers import QueueLogging, RateLimitFilter, SharedRotatingFileHandler
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record.getMessage())
+        self.threads.add(threading.current_thread().name)
+
+
+def test_rate_limit_filter():
+    log_filter = RateLimitFilter(rate=0.001, burst=3)
+
+    def make_record(name, level):
+        return logging.LogRecord(name, level, __file__, 0, 'message', None, None)
+
+    passed = [log_filter.filter(make_record('hot', logging.INFO)) for _ in range(10)]
+    warnings = [log_filter.filter(make_record('hot', logging.WARNING)) for _ in range(3)]
+    other = log_filter.filter(make_record('other', logging.INFO))
+
+    eq = (passed == [True] * 3 + [False] * 7 and
+          warnings == [True] * 3 and
+          other and
+          log_filter.dropped() == {'hot': 7})
+    assert eq
+
+
+def test_shared_rotating_file_handler(tmp_path):
+    file_name = str(tmp_path / 'app.log')
+    handlers = [SharedRotatingFileHandler(file_name, maxBytes=100, backupCount=2) for _ in range(2)]
+    logger = logging.getLogger('test_shared_rotating_file_handler')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    try:
+        # Every handler plays a process appending to the same file
+        for i in range(6):
+            logger.handlers = [handlers[i % 2]]
+            logger.warning('%s', str(i) * 40)
+    finally:
+        logger.handlers = []
+        for handler in handlers:
+            handler.close()
+
+    lines = []
+    for name in (file_name + '.2', file_name + '.1', file_name):
+        with open(name) as log_file:
+            lines.extend(log_file.read().split())
+
+    eq = (lines == [str(i) * 40 for i in range(6)] and
+          all(os.path.getsize(name) <= 100 for name in (file_name, file_name + '.1', file_name + '.2')))
+    assert eq
+
+
+def test_queue_logging(queue_logging):
+    handler = ListHandler()
+    logger = logging.getLogger('test_queue_logging')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+
+    queue_logging.start([logger.name], filters=[RateLimitFilter(rate=0.001, burst=2)])
+    for i in range(5):
+        logger.info('record %s', i)
+    logger.error('failure')
+    queue_logging.stop()
+
+    eq = (handler.records == ['record 0', 'record 1', 'failure'] and
+          threading.current_thread().name not in handler.threads)
+    assert eq
+
+
+def test_queue_logging_restored():
+    # The service loggers still write through the running listener of the service
+    eq = (QueueLogging._listener is not None and
+          QueueLogging._listener._thread is not None and
+          QueueLogging._queue_handler in logging.getLogger(cfg.LOGGER_NAME).handlers)
+    assert eq
@@ -3,6 +3,8 @@ from datetime import date, datetime
 from typing import List
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 import src.models as models
 import src.metrics as metrics
 
@@ -25,3 +27,64 @@ def test_metrics_obj_copy():
                 m1.margin == m2.margin)
 
     assert compare(metrics1, metrics2)
+
+
+def test_matrix_metrics_calculator():
+    month_dates = [date(2020, month, 1) for month in range(1, 5)]
+    # The zero metrics follow the zero-denominator rule of the month reports
+    months_data = []
+    for revenue, expenses in ((100, -50), (0, -30), (250, 0), (-80, -120)):
+        month_data = metrics.BaseFinanceMetrics(revenue, expenses, revenue + expenses)
+        month_data.margin = month_data.profit * 100.0 / revenue if revenue else 0
+        months_data.append(month_data)
+
+    matrix = metrics.MonthsMatrixFinanceMetrics(months=[metrics.MonthFinanceMetrics(d) for d in month_dates])
+    metrics.MatrixMetricsCalculator.execute(months_data, matrix)
+
+    eq = True
+    for i, first_date in enumerate(month_dates):
+        for j, second_date in enumerate(month_dates):
+            report = metrics.FinanceReportMetricsBuilder.create_object(first_date, second_date)
+            metrics.FinanceMetricsSimpleCalculator.execute(months_data[i], months_data[j], report)
+
+            for name in matrix.METRICS:
+                eq = (eq and
+                      matrix.absolute_diff[name][i, j] == getattr(report.absolute_diff, name) and
+                      matrix.percent_diff[name][i, j] == getattr(report.percent_diff, name))
+
+    assert eq
+
+
+def test_movers_metrics_calculator():
+    income, expense = models.AccountNature.CODES[models.AccountNature.INCOME], models.AccountNature.CODES[models.AccountNature.EXPENSE]
+    accounts_amounts = np.array([
+        # account code, nature code, first amount, second amount
+        [1, income, 100, 50],
+        [2, expense, -300, -100],
+        [3, income, 500, 0],
+        [4, income, 150, 100],
+        [5, expense, -10, -30],
+    ])
+
+    movers = metrics.AccountsMoversMetrics(date(2020, 6, 1), date(2020, 5, 1))
+    metrics.MoversMetricsCalculator.execute(accounts_amounts, movers, 2)
+
+    eq = ([account.account_code for account in movers.by_absolute_diff] == [3, 2] and
+          # 1 and 2 change by 100% and 200%, 3 has no percentage change from 0
+          [account.account_code for account in movers.by_percent_diff] == [2, 1] and
+          movers.by_absolute_diff[1].absolute_diff.expenses == -200 and
+          movers.by_percent_diff[0].percent_diff.expenses == -200)
+    assert eq
+
+
+def test_top_positions_ties():
+    rng = np.random.default_rng(0)
+    # Mostly unchanged accounts: the zero changes tie at the threshold
+    keys = np.where(rng.random(10000) < 0.99, 0, rng.integers(-50, 50, 10000))
+    codes = rng.permutation(10000) + 1000
+
+    top = metrics.MoversMetricsCalculator._get_top_positions(keys, codes, 150)
+    expected = np.lexsort((codes, -keys))[:150]
+
+    eq = top.tolist() == expected.tolist()
+    assert eq
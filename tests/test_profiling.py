@@ -0,0 +1,105 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+import orjson
+from starlette.testclient import TestClient
+
+import src.data_adapters as db
+from src.profiling import MemoryProfiler
+
+
+REPORT_URL = '/report?first_date=2020-06-15&second_date=2020-05-15'
+
+# Loading the bookings chunk by chunk keeps the peak within the budget, whatever the size of the ledger
+LEDGER_ROWS = 1_000_000
+LOAD_PEAK_BUDGET_BYTES = 64 * 1024 * 1024
+# The process grows by the in-memory DB of the ledger (about 40 MB) and the chunks in flight,
+# not by the parsed ledger
+LOAD_RSS_PEAK_BUDGET_BYTES = 128 * 1024 * 1024
+
+
+@pytest.fixture
+def profiler():
+    MemoryProfiler.clear()
+    MemoryProfiler.configure(True)
+    yield MemoryProfiler
+    MemoryProfiler.configure(False)
+    MemoryProfiler.clear()
+
+
+@pytest.fixture
+def ledger_folder(tmp_path):
+    generate_ledger(tmp_path, LEDGER_ROWS)
+    return tmp_path
+
+
+def generate_ledger(data_folder, rows: int) -> None:
+    shutil.copy(os.path.join(db.DATA_FOLDER, db.ACCOUNTS_FILE), data_folder)
+    account_codes = pd.read_csv(os.path.join(db.DATA_FOLDER, db.ACCOUNTS_FILE))['account_code'].to_numpy()
+
+    rng = np.random.default_rng(0)
+    cents = pd.Series(rng.integers(1, 10 ** 6, rows))
+
+    pd.DataFrame({
+        'account_code':     account_codes[rng.integers(0, len(account_codes), rows)],
+        'transaction_type': np.where(rng.integers(0, 2, rows) == 1, 'credit', 'debit'),
+        'amount':           (cents // 100).astype(str) + ',' + (cents % 100).astype(str).str.zfill(2),
+        'transaction_date': (pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')).strftime('%Y-%m-%d'),
+    }).to_csv(os.path.join(data_folder, db.TRANSACTIONS_FILE), index=False)
+
+
+def test_profile_stages(client: TestClient, profiler, tmp_path):
+    store = db.DataStore()
+    try:
+        db.DataLoader.load(engine=store)
+    finally:
+        store.clear()
+
+    response = client.get(REPORT_URL)
+    profile = client.get('/admin/memory').json()
+
+    dump_file = profiler.dump(str(tmp_path / 'memory.json'))
+    with open(dump_file, 'rb') as f:
+        dumped_stages = orjson.loads(f.read())['stages']
+
+    stages = profile['stages']
+    eq = (response.status_code == 200 and
+          profile['enabled'] and
+          {'load', 'load/accounts', 'load/transactions', 'load/transactions/read', 'load/transactions/insert',
+           'load/daily_index', 'request/generate_finance_report', 'request/generate_finance_report/metrics',
+           'request/generate_finance_report/format'} <= stages.keys() and
+          stages['load']['peak_bytes'] >= stages['load/transactions']['peak_bytes'] > 0 and
+          stages['load']['rss_peak_bytes'] >= stages['load']['rss_retained_bytes'] and
+          dumped_stages.keys() == stages.keys())
+    assert eq
+
+
+def test_profile_disabled(client: TestClient):
+    client.get(REPORT_URL)
+    profile = client.get('/admin/memory').json()
+
+    eq = not profile['enabled'] and profile['stages'] == {}
+    assert eq
+
+
+@pytest.mark.slow
+def test_load_peak_memory_budget(ledger_folder, profiler, monkeypatch):
+    # The ledger is generated before the profiling starts. The bookings are parsed in this process: tracemalloc
+    # does not see the memory of the parsing processes, whatever APP_INGEST_WORKERS is
+    monkeypatch.setattr(db.DataLoader, 'WORKERS', 1)
+
+    store = db.DataStore(str(ledger_folder))
+    try:
+        stats = db.DataLoader.load(engine=store)
+    finally:
+        store.clear()
+
+    load_stage = profiler.snapshot()['stages']['load']
+
+    eq = (stats.rows == LEDGER_ROWS and
+          load_stage['peak_bytes'] <= LOAD_PEAK_BUDGET_BYTES and
+          load_stage['rss_peak_bytes'] <= LOAD_RSS_PEAK_BUDGET_BYTES)
+    assert eq, f'The load peak is {load_stage["peak_bytes"]} bytes, {load_stage["rss_peak_bytes"]} bytes of RSS'
@@ -0,0 +1,95 @@
+import signal
+import threading
+from datetime import date
+
+from starlette.testclient import TestClient
+
+import src.services as services
+import src.data_adapters as db
+import src.reloads as reloads
+from src.reloads import StoreReloader
+from src.tenants import TenantStores
+from src.service_metrics import ServiceMetrics
+
+
+REPORT_URL = '/report?first_date=2020-06-15&second_date=2020-05-15'
+
+
+def test_reload_swaps_store():
+    with TenantStores.acquire(None) as old_store:
+        old_version = old_store.get_version()
+        report = services.generate_finance_report(date(2020, 6, 1), date(2020, 5, 1))
+
+        reload_thread = threading.Thread(target=TenantStores.reload)
+        reload_thread.start()
+        # The reload does not wait for the in-flight request
+        reload_thread.join()
+
+        # The in-flight request keeps its store until it is completed
+        in_flight_report = services.generate_finance_report(date(2020, 6, 1), date(2020, 5, 1))
+        retired = db.SQLEngine.default_store() is not old_store and old_store.get() is not None
+
+    with TenantStores.acquire(None) as new_store:
+        new_report = services.generate_finance_report(date(2020, 6, 1), date(2020, 5, 1))
+
+    eq = (retired and in_flight_report == report and new_report == report and
+          new_store is not old_store and new_store.get_version() > old_version and
+          old_store.get() is None and not old_store.retain())
+    assert eq
+
+
+def test_reload_endpoint(client: TestClient):
+    before = client.get(REPORT_URL)
+    reloads = ServiceMetrics.get(ServiceMetrics.STORE_RELOADS)
+
+    response = client.post('/admin/reload')
+    StoreReloader.wait()
+
+    after = client.get(REPORT_URL)
+
+    eq = (response.status_code == 202 and
+          ServiceMetrics.get(ServiceMetrics.STORE_RELOADS) == reloads + 1 and
+          after.content == before.content and after.headers['ETag'] != before.headers['ETag'])
+    assert eq
+
+
+def test_reload_month_endpoint(client: TestClient, month_shards_store):
+    before = client.get(REPORT_URL)
+    reloads = ServiceMetrics.get(ServiceMetrics.STORE_RELOADS)
+
+    response = client.post('/admin/reload?month=2020-06-15')
+    StoreReloader.wait()
+
+    after = client.get(REPORT_URL)
+    # Only May and June have month shards
+    missing_shard = client.post('/admin/reload?month=2020-07-01')
+
+    eq = (response.status_code == 202 and response.json()['month'] == 202006 and
+          ServiceMetrics.get(ServiceMetrics.STORE_RELOADS) == reloads + 1 and
+          db.SQLEngine.default_store() is month_shards_store and
+          after.content == before.content and after.headers['ETag'] != before.headers['ETag'] and
+          missing_shard.status_code == 404)
+    assert eq
+
+
+def test_reload_unknown_tenant(client: TestClient):
+    response = client.post('/admin/reload', headers={'X-Tenant': 'delta'})
+
+    eq = response.status_code == 404
+    assert eq
+
+
+def test_reload_endpoint_prefork_worker(client: TestClient, monkeypatch):
+    signals = []
+    monkeypatch.setattr(StoreReloader, '_supervisor_pid', 4321)
+    monkeypatch.setattr(reloads.os, 'kill', lambda pid, signal_number: signals.append((pid, signal_number)))
+
+    store = db.SQLEngine.default_store()
+    response = client.post('/admin/reload')
+    StoreReloader.wait()
+
+    # The worker leaves the reload to the server instead of reloading its own store
+    eq = (response.status_code == 202 and
+          signals == [(4321, signal.SIGUSR1)] and
+          db.SQLEngine.default_store() is store)
+    assert eq
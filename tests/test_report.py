@@ -1,4 +1,5 @@
 from datetime import date
+import src.services as services
 from starlette.testclient import TestClient
 
 
@@ -14,3 +15,160 @@ def test_report(client: TestClient, file_regression):
     response = client.get(f'/report?first_date={first_date_default.isoformat()}&second_date={second_date_default.isoformat()}')
 
     file_regression.check(response.content, extension=".csv", binary=True)
+
+
+def test_report_json(client: TestClient):
+    response = client.get('/report?first_date=2020-06-15&second_date=2020-05-15', headers={'Accept': 'application/json'})
+    report = response.json()
+
+    eq = (response.status_code == 200 and
+          response.headers['content-type'] == 'application/json' and
+          round(report['first_month']['revenue'], 2) == 13393.15 and
+          round(report['percent_diff']['margin'], 1) == -984.4)
+    assert eq
+
+
+def test_report_not_acceptable(client: TestClient):
+    response = client.get('/report?first_date=2020-06-15&second_date=2020-05-15&format=xml')
+
+    assert response.status_code == 406
+
+
+def test_accounts_report(client: TestClient):
+    response = client.get('/report/accounts?first_date=2020-06-15&second_date=2020-05-15&format=json')
+    report = response.json()
+
+    account = next(account for account in report['accounts'] if account['account_code'] == 2152)
+
+    eq = (response.status_code == 200 and
+          report['first_month'] == '2020-06' and
+          account['account_nature'] == 'expense' and
+          account['second_month'] == {'revenue': 0, 'expenses': -633.55} and
+          account['absolute_diff']['expenses'] == 633.55 and
+          account['percent_diff']['expenses'] == 100.0)
+    assert eq
+
+
+def test_movers_report(client: TestClient):
+    movers = client.get('/report/movers?first_date=2020-06-15&second_date=2020-05-15&n=5&format=json').json()
+    accounts = client.get('/report/accounts?first_date=2020-06-15&second_date=2020-05-15&format=json').json()
+
+    # The amount of an account is its revenue or its expenses, the other one is 0
+    def changes(account, diff):
+        return abs(account[diff]['revenue'] + account[diff]['expenses']), -account['account_code']
+
+    expected_by_absolute_diff = sorted(accounts['accounts'], key=lambda a: changes(a, 'absolute_diff'), reverse=True)
+    expected_by_percent_diff = sorted(accounts['accounts'], key=lambda a: changes(a, 'percent_diff'), reverse=True)
+
+    eq = ([mover['account_code'] for mover in movers['by_absolute_diff']] ==
+          [account['account_code'] for account in expected_by_absolute_diff[:5]] and
+          [mover['account_code'] for mover in movers['by_percent_diff']] ==
+          [account['account_code'] for account in expected_by_percent_diff[:5]] and
+          client.get('/report/movers?first_date=2020-06-15&second_date=2020-05-15&n=0').status_code == 422)
+    assert eq
+
+
+def test_matrix_report(client: TestClient):
+    matrix = client.get('/report/matrix?year=2020&format=json').json()
+    june, may = matrix['months'].index('2020-06'), matrix['months'].index('2020-05')
+
+    report = client.get('/report?first_date=2020-06-15&second_date=2020-05-15&format=json').json()
+
+    csv_lines = client.get('/report/matrix?first_date=2020-03-15&months=3').text.splitlines()
+
+    eq = (len(matrix['months']) == 12 and
+          all(matrix[name]['absolute_diff'][june][may] == report['absolute_diff'][name] and
+              matrix[name]['percent_diff'][june][may] == report['percent_diff'][name] and
+              matrix[name]['values'][june] == report['first_month'][name]
+              for name in ('revenue', 'expenses', 'profit', 'margin')) and
+          csv_lines[0] == 'metric,comparison,month,2020-03,2020-04,2020-05' and
+          # A row of values, 3 rows of absolute and 3 rows of percentage differences per metric
+          len(csv_lines) == 1 + 4 * 7 and
+          client.get('/report/matrix').status_code == 422 and
+          client.get('/report/matrix?first_date=9999-06-01&months=12').status_code == 422)
+    assert eq
+
+
+def test_report_ranges(client: TestClient):
+    months = client.get('/report?first_date=2020-06-15&second_date=2020-05-15&format=json').json()
+    ranges = client.get('/report?first_start=2020-06-01&first_end=2020-06-30'
+                        '&second_start=2020-05-01&second_end=2020-05-31&format=json').json()
+    month_to_date = client.get('/report?first_start=2020-06-01&first_end=2020-06-15'
+                               '&second_start=2020-05-01&second_end=2020-05-15')
+
+    metric_names = ['revenue', 'expenses', 'profit', 'margin']
+
+    eq = (ranges['first_month']['start'] == '2020-06-01' and
+          all(ranges['first_month'][name] == months['first_month'][name] for name in metric_names) and
+          ranges['percent_diff'] == months['percent_diff'] and
+          month_to_date.status_code == 200 and
+          month_to_date.text.startswith(',"2020-06-01..2020-06-15","2020-05-01..2020-05-15"'))
+    assert eq
+
+
+def test_report_invalid_ranges(client: TestClient):
+    incomplete = client.get('/report?first_start=2020-06-01&first_end=2020-06-30&second_start=2020-05-01')
+    reversed_range = client.get('/report?first_start=2020-06-30&first_end=2020-06-01'
+                                '&second_start=2020-05-01&second_end=2020-05-31')
+
+    assert incomplete.status_code == 422 and reversed_range.status_code == 422
+
+
+def test_report_comparisons(client: TestClient):
+    months = client.get('/report?first_date=2020-06-15&second_date=2020-05-15&format=json').json()
+    previous_month = client.get('/report?first_date=2020-06-15&compare=previous_month&format=json').json()
+    trailing = client.get('/report?first_date=2020-06-15&compare=trailing&months=3&format=json').json()
+    unknown_mode = client.get('/report?first_date=2020-06-15&compare=previous_week')
+    out_of_range = client.get('/report?first_date=0001-06-15&compare=previous_year')
+    # The whole months are labelled as in the month report
+    months_csv = client.get('/report?first_date=2020-06-15&second_date=2020-05-15').text
+    previous_month_csv = client.get('/report?first_date=2020-06-15&compare=previous_month').text
+    trailing_csv = client.get('/report?first_date=2020-06-15&compare=trailing&months=3').text
+
+    eq = (previous_month['percent_diff'] == months['percent_diff'] and
+          previous_month['first_month']['month'] == months['first_month']['month'] == '2020-06' and
+          previous_month_csv == months_csv and
+          trailing['first_month']['month'] == '2020-04..2020-06' and
+          trailing['first_month']['start'] == '2020-04-01' and
+          trailing['second_month']['end'] == '2020-03-31' and
+          trailing_csv.startswith(',"2020-04..2020-06","2020-01..2020-03",') and
+          round(trailing['first_month']['revenue'], 2) == 47349.86 and
+          unknown_mode.status_code == 422 and
+          out_of_range.status_code == 422)
+    assert eq
+
+
+def test_metrics(client: TestClient):
+    client.get('/report?first_date=2020-06-15&second_date=2020-05-15')
+    metrics = client.get('/metrics').json()
+
+    eq = (metrics['report_requests'] >= 1 and
+          metrics['log_records_dropped'] >= 0)
+    assert eq
+
+
+def test_report_not_modified(client: TestClient, monkeypatch):
+    url = '/report?first_date=2020-06-15&second_date=2020-05-15'
+
+    response = client.get(url)
+    etag, last_modified = response.headers['etag'], response.headers['last-modified']
+
+    def generate_finance_report(*args):
+        raise AssertionError('The report must not be computed')
+
+    monkeypatch.setattr(services, 'generate_finance_report', generate_finance_report)
+
+    not_modified = client.get(url.replace('-15&', '-01&'), headers={'If-None-Match': f'W/{etag}, "other"'})
+    not_modified_since = client.get(url, headers={'If-Modified-Since': last_modified})
+    monkeypatch.undo()
+
+    other_month = client.get('/report?first_date=2020-07-15&second_date=2020-05-15', headers={'If-None-Match': etag})
+
+    eq = (not_modified.status_code == 304 and
+          not_modified.content == b'' and
+          not_modified.headers['etag'] == etag and
+          response.headers['vary'] == not_modified.headers['vary'] == 'Accept, X-Tenant' and
+          not_modified_since.status_code == 304 and
+          other_month.status_code == 200 and
+          other_month.headers['etag'] != etag)
+    assert eq
@@ -0,0 +1,63 @@
+import time
+from datetime import date
+
+import src.services as services
+from src.data_adapters import SQLEngine
+from src.engines import ReportEngines
+from src.service_metrics import ServiceMetrics
+from src.shadow import ShadowEngine, get_differences
+
+
+def test_shadow_engine(monkeypatch):
+    monkeypatch.setattr(ShadowEngine, 'SAMPLE_RATE', 1)
+
+    before = ServiceMetrics.snapshot()
+
+    services.generate_finance_report(date(2020, 6, 1), date(2020, 5, 1))
+    services.generate_finance_report(date(2020, 1, 1), date(2019, 12, 1))
+    ShadowEngine.wait()
+
+    after = ServiceMetrics.snapshot()
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    eq = (delta(ServiceMetrics.SHADOW_RUNS) == 2 and
+          delta(ServiceMetrics.SHADOW_MISMATCHES) == 0 and
+          delta(ServiceMetrics.SHADOW_ERRORS) == 0 and
+          delta(ServiceMetrics.SHADOW_PRIMARY_SECONDS) > 0 and
+          delta(ServiceMetrics.SHADOW_SECONDARY_SECONDS) > 0)
+    assert eq
+
+
+def test_shadow_engine_waits_for_reload(monkeypatch):
+    monkeypatch.setattr(ShadowEngine, 'SAMPLE_RATE', 1)
+
+    metrics = ReportEngines.get().create_controller().calculate_metrics(date(2020, 6, 1), date(2020, 5, 1))
+    before = ServiceMetrics.snapshot().get(ServiceMetrics.SHADOW_RUNS, 0)
+
+    # As a month reload does, the comparison reads the store once it is written
+    with SQLEngine.default_store().writing():
+        ShadowEngine.submit(date(2020, 6, 1), date(2020, 5, 1), metrics, 0)
+        time.sleep(0.2)
+        runs_while_writing = ServiceMetrics.snapshot().get(ServiceMetrics.SHADOW_RUNS, 0) - before
+
+    ShadowEngine.wait()
+
+    eq = runs_while_writing == 0 and ServiceMetrics.snapshot().get(ServiceMetrics.SHADOW_RUNS, 0) - before == 1
+    assert eq
+
+
+def test_shadow_engine_not_sampled(monkeypatch):
+    monkeypatch.setattr(ShadowEngine, 'SAMPLE_RATE', 0)
+
+    eq = ShadowEngine.submit(date(2020, 6, 1), date(2020, 5, 1), None, 0) is False
+    assert eq
+
+
+def test_get_differences():
+    primary = {'first_month': {'revenue': 100, 'margin': 12.5, 'month_date': date(2020, 6, 1)}, 'profit': 1.0}
+    shadow = {'first_month': {'revenue': 100.0, 'margin': 12.6, 'month_date': date(2020, 6, 1)}, 'profit': 1.0 + 1e-12}
+
+    eq = get_differences(primary, shadow, 1e-9) == ['first_month.margin']
+    assert eq
@@ -0,0 +1,99 @@
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.requests import Request
+
+from src.service_metrics import ServiceMetrics
+from src.single_flight import SingleFlight
+from src.formatters import ReportFormat
+import src.main as main
+
+
+COALESCED_METRIC = 'test_coalesced'
+
+
+def test_single_flight_coalesces():
+    flights = SingleFlight(coalesced_metric=COALESCED_METRIC)
+    release = threading.Event()
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        release.wait(timeout=5)
+        return value * 2
+
+    coalesced_before = ServiceMetrics.get(COALESCED_METRIC)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(flights.run, 'key', compute, 21) for _ in range(8)]
+
+        # Wait until all the followers are waiting for the leader
+        while ServiceMetrics.get(COALESCED_METRIC) - coalesced_before < 7:
+            threading.Event().wait(0.01)
+        release.set()
+
+        results = [future.result() for future in futures]
+
+    eq = (calls == [21] and
+          results == [42] * 8 and
+          flights.in_flight() == 0 and
+          flights.run('key', compute, 1) == 2)
+    assert eq
+
+
+def test_single_flight_shares_exception():
+    flights = SingleFlight(coalesced_metric=COALESCED_METRIC)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(timeout=5)
+        raise ValueError('no data')
+
+    coalesced_before = ServiceMetrics.get(COALESCED_METRIC)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flights.run, 'key', compute)
+        while flights.in_flight() == 0:
+            threading.Event().wait(0.01)
+        follower = executor.submit(flights.run, 'key', compute)
+
+        # Wait until the follower is waiting for the leader
+        while ServiceMetrics.get(COALESCED_METRIC) - coalesced_before < 1:
+            threading.Event().wait(0.01)
+        release.set()
+
+        errors = []
+        for future in (leader, follower):
+            try:
+                future.result()
+            except ValueError as ex:
+                errors.append(str(ex))
+
+    eq = errors == ['no data', 'no data'] and len(calls) == 1
+    assert eq
+
+
+def test_report_flights_tell_functions_apart():
+    started = threading.Barrier(2, timeout=5)
+
+    def report_function(body: str):
+        # Both functions are named as the undecorated wrapper of a decorator
+        def wrapper(*args):
+            started.wait()
+            return body
+        return wrapper
+
+    def build_response(generate_report):
+        request = Request({'type': 'http', 'method': 'GET', 'path': '/report', 'query_string': b'', 'headers': []})
+        return main.build_report_response(request, ReportFormat.CSV, None, generate_report, date(2020, 6, 1))
+
+    # The same arguments: the reports would share a computation if they were keyed by the function name
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(build_response, report_function('first'))
+        second = executor.submit(build_response, report_function('second'))
+
+    eq = first.result().body == b'first' and second.result().body == b'second'
+    assert eq
@@ -0,0 +1,113 @@
+import gc
+import signal
+
+import pytest
+
+import start_app
+import src.data_adapters as db
+
+
+class FakeSocket:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    A prefork server with fake worker processes: the forks, the exits and the signals of the workers are recorded.
+    """
+    server = start_app.PreforkServer(workers=2)
+    server._socket = FakeSocket()
+
+    pids = iter(range(101, 200))
+    server.killed = []
+    # The exited worker pids, and the signal handlers run by the parent while it waits
+    server.events = []
+
+    def waitpid(pid, options):
+        if not server.events:
+            raise ChildProcessError()
+
+        event = server.events.pop(0)
+        if callable(event):
+            # No worker exited meanwhile
+            event()
+            return 0, 0
+        return event, 0
+
+    monkeypatch.setattr(server, 'SUPERVISE_SECONDS', 0)
+    monkeypatch.setattr(start_app.os, 'fork', lambda: next(pids))
+    monkeypatch.setattr(start_app.os, 'waitpid', waitpid)
+    monkeypatch.setattr(start_app.os, 'kill', lambda pid, signal_number: server.killed.append((pid, signal_number)))
+
+    return server
+
+
+def test_prefork_preload():
+    server = start_app.PreforkServer(workers=1)
+
+    try:
+        server._preload()
+        eq = db.SQLEngine.default_store().get_version() is not None and gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+    assert eq
+
+
+def test_prefork_recycle(server):
+    for _ in range(2):
+        server._spawn()
+
+    # The workers are restarted one by one, then the server is stopped
+    server.events = [lambda: server._recycle_all(signal.SIGHUP, None), 102, 101,
+                     lambda: server._stop(signal.SIGTERM, None), 103, 104]
+
+    server._supervise()
+
+    # The next worker is stopped once the replacement of the previous one is forked, the stop reaches all of them
+    eq = (server.killed[:2] == [(102, signal.SIGTERM), (101, signal.SIGTERM)] and
+          set(server.killed[2:]) == {(103, signal.SIGTERM), (104, signal.SIGTERM)} and
+          server._workers == set() and
+          server._socket.closed)
+    assert eq
+
+
+def test_prefork_replaces_crashed_worker(server):
+    server._spawn()
+
+    server.events = [101, lambda: server._stop(signal.SIGTERM, None), 102]
+
+    server._supervise()
+
+    # The crashed worker is replaced, the replacement is stopped with the server
+    eq = server.killed == [(102, signal.SIGTERM)] and server._workers == set()
+    assert eq
+
+
+def test_prefork_reload(server):
+    server._spawn()
+    version = db.SQLEngine.default_store().get_version()
+    handled = []
+
+    def reload_all():
+        server._reload_all(signal.SIGUSR1, None)
+        # The signal handler only requests the reload
+        handled.append(server._reload_requested and db.SQLEngine.default_store().get_version() == version)
+
+    server.events = [reload_all, 101, lambda: server._stop(signal.SIGTERM, None), 102]
+
+    try:
+        server._supervise()
+    finally:
+        gc.unfreeze()
+
+    # The data is reloaded by the supervising loop, then the worker is replaced by a fork with the reloaded data
+    eq = (handled == [True] and
+          db.SQLEngine.default_store().get_version() != version and
+          server.killed == [(101, signal.SIGTERM), (102, signal.SIGTERM)] and
+          not server._reload_requested)
+    assert eq
@@ -0,0 +1,103 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.data_adapters as db
+from src.tenants import TenantStores
+
+
+REPORT_URL = '/report?first_date=2020-06-15&second_date=2020-05-15'
+EXPECTED_REPORT_FILE = os.path.join(os.path.dirname(__file__), 'test_report', 'test_report.csv')
+
+STRESS_THREADS = 32
+STRESS_REQUESTS = 400
+
+
+@pytest.fixture
+def expected_report() -> bytes:
+    with open(EXPECTED_REPORT_FILE, 'rb') as f:
+        return f.read()
+
+
+def fire_requests(client: TestClient, requests_count: int, during=None) -> tuple[list, float]:
+    """
+    Fire the requests from STRESS_THREADS threads at once, `during` runs in another thread meanwhile.
+
+    Returns:
+        tuple[list, float]: The (status code, content) of the responses and the requests per second.
+    """
+    start_barrier = threading.Barrier(STRESS_THREADS + (1 if during else 0))
+
+    def get_report(i):
+        if i < STRESS_THREADS:
+            start_barrier.wait()
+        response = client.get(REPORT_URL)
+        return response.status_code, response.content
+
+    def run_during():
+        start_barrier.wait()
+        during()
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=STRESS_THREADS + 1) as executor:
+        during_future = executor.submit(run_during) if during else None
+        responses = list(executor.map(get_report, range(requests_count)))
+        if during_future is not None:
+            during_future.result()
+
+    return responses, requests_count / (time.perf_counter() - start)
+
+
+def test_stress_cold_start(client: TestClient, expected_report: bytes, record_property):
+    # The first requests find no data and load it concurrently
+    db.SQLEngine.clear()
+
+    responses, requests_per_second = fire_requests(client, STRESS_REQUESTS)
+    record_property('cold_start_requests_per_second', round(requests_per_second))
+
+    eq = responses == [(200, expected_report)] * STRESS_REQUESTS
+    assert eq
+
+
+def test_stress_warm(client: TestClient, expected_report: bytes, record_property):
+    with TenantStores.acquire(None):
+        pass
+
+    responses, requests_per_second = fire_requests(client, STRESS_REQUESTS)
+    record_property('warm_requests_per_second', round(requests_per_second))
+
+    eq = responses == [(200, expected_report)] * STRESS_REQUESTS
+    assert eq
+
+
+def test_stress_month_reload(client: TestClient, expected_report: bytes, record_property, month_shards_store):
+    def reload_months():
+        for _ in range(5):
+            db.DataLoader.reload_month(202006, engine=month_shards_store)
+            db.DataLoader.reload_month(202005, engine=month_shards_store)
+
+    responses, requests_per_second = fire_requests(client, STRESS_REQUESTS, during=reload_months)
+    record_property('month_reload_requests_per_second', round(requests_per_second))
+
+    eq = responses == [(200, expected_report)] * STRESS_REQUESTS
+    assert eq
+
+
+def test_stress_store_reload(client: TestClient, expected_report: bytes, record_property):
+    with TenantStores.acquire(None):
+        pass
+
+    def reload_stores():
+        for _ in range(3):
+            TenantStores.reload()
+
+    responses, requests_per_second = fire_requests(client, STRESS_REQUESTS, during=reload_stores)
+    record_property('store_reload_requests_per_second', round(requests_per_second))
+
+    eq = responses == [(200, expected_report)] * STRESS_REQUESTS
+    assert eq
@@ -0,0 +1,127 @@
+import shutil
+
+import pytest
+from starlette.testclient import TestClient
+
+import src.data_adapters as da
+from src.tenants import TenantStores
+
+
+REPORT_URL = '/report?first_date=2020-06-15&second_date=2020-05-15'
+
+
+@pytest.fixture
+def tenants_folder(tmp_path):
+    for tenant in ('alpha', 'beta', 'gamma'):
+        tenant_folder = tmp_path / tenant
+        tenant_folder.mkdir()
+        shutil.copy(f'{da.DATA_FOLDER}/{da.ACCOUNTS_FILE}', tenant_folder)
+        shutil.copy(f'{da.DATA_FOLDER}/{da.TRANSACTIONS_FILE}', tenant_folder)
+
+    # Only the header of bookings: the beta ledger is empty
+    with open(tmp_path / 'beta' / da.TRANSACTIONS_FILE, 'r+') as f:
+        header = f.readline()
+        f.seek(0)
+        f.write(header)
+        f.truncate()
+
+    previous_folder, previous_budget = TenantStores._tenants_folder, TenantStores._memory_budget
+
+    TenantStores.configure(tenants_folder=str(tmp_path))
+    yield tmp_path
+    TenantStores.configure(tenants_folder=previous_folder, memory_budget=previous_budget)
+
+
+def test_tenant_report(client: TestClient, tenants_folder):
+    default_response = client.get(REPORT_URL)
+    header_response = client.get(REPORT_URL, headers={'X-Tenant': 'alpha'})
+    prefix_response = client.get(f'/tenants/alpha{REPORT_URL}')
+    empty_response = client.get(f'/tenants/beta{REPORT_URL}')
+
+    eq = (header_response.content == default_response.content and
+          prefix_response.content == default_response.content and
+          empty_response.content.splitlines()[1] == b'Revenues,0.00,0.00,0.00,0.0%' and
+          TenantStores.loaded_tenants() == ['alpha', 'beta'])
+    assert eq
+
+
+def test_unknown_tenant(client: TestClient, tenants_folder):
+    responses = [
+        client.get(REPORT_URL, headers={'X-Tenant': 'delta'}),
+        client.get(f'/tenants/bad.name{REPORT_URL}'),
+    ]
+
+    assert all(response.status_code == 404 for response in responses)
+
+
+def test_tenant_stores_eviction(tenants_folder):
+    with TenantStores.acquire('alpha') as store:
+        alpha_size = store.memory_size()
+
+    # Room for two stores only, the budget is restored by the fixture
+    TenantStores._memory_budget = alpha_size * 2
+
+    with TenantStores.acquire('beta'):
+        pass
+    with TenantStores.acquire('alpha'):
+        pass
+    with TenantStores.acquire('gamma') as gamma_store:
+        eq = (gamma_store is da.SQLEngine.store() and
+              TenantStores.loaded_tenants() == ['alpha', 'gamma'])
+
+    assert eq
+
+
+def test_tenant_reload(client: TestClient, tenants_folder):
+    before = client.get(REPORT_URL, headers={'X-Tenant': 'alpha'})
+
+    with TenantStores.acquire('alpha') as old_store:
+        pass
+    new_store = TenantStores.reload('alpha')
+
+    after = client.get(REPORT_URL, headers={'X-Tenant': 'alpha'})
+
+    eq = (after.content == before.content and after.headers['ETag'] != before.headers['ETag'] and
+          new_store is not old_store and old_store.get() is None and
+          TenantStores.loaded_tenants() == ['alpha'])
+    assert eq
+
+
+def test_tenant_stores_eviction_keeps_retained(tenants_folder):
+    with TenantStores.acquire('alpha') as alpha_store:
+        alpha_size = alpha_store.memory_size()
+
+    TenantStores._memory_budget = alpha_size
+
+    # Retained after the request, as by the shadow engine comparing a report of the tenant
+    alpha_store.retain()
+    try:
+        with TenantStores.acquire('gamma'):
+            pass
+        retained_loaded = alpha_store.get() is not None
+    finally:
+        alpha_store.release()
+
+    # Evicted by the next load once released
+    with TenantStores.acquire('beta'):
+        pass
+
+    eq = retained_loaded and alpha_store.get() is None and 'alpha' not in TenantStores.loaded_tenants()
+    assert eq
+
+
+def test_tenant_stores_clear_keeps_pinned(tenants_folder):
+    with TenantStores.acquire('alpha') as old_store:
+        TenantStores.clear()
+        # The in-flight request keeps reading its store
+        still_loaded = old_store.get() is not None and old_store.memory_size() > 0
+
+    with TenantStores.acquire('alpha') as new_store:
+        pass
+
+    eq = (still_loaded and
+          old_store.get() is None and
+          new_store is not old_store and
+          TenantStores.loaded_tenants() == ['alpha'] and
+          not TenantStores._in_use)
+    assert eq
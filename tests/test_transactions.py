@@ -0,0 +1,70 @@
+from fastapi.testclient import TestClient
+
+import src.services as services
+import src.data_adapters as db
+
+
+def get_all_pages(client: TestClient, url: str) -> list[dict]:
+    transactions, cursor = [], None
+
+    while True:
+        page = client.get(url + (f'&cursor={cursor}' if cursor else '')).json()
+        transactions.extend(page['transactions'])
+
+        cursor = page['next_cursor']
+        if cursor is None:
+            return transactions
+
+
+def test_transactions_pages(client: TestClient):
+    transactions = get_all_pages(client, '/transactions?limit=100')
+
+    export = client.get('/transactions?format=csv')
+    header, *lines = export.text.splitlines()
+
+    keys = [(transaction['transaction_date'], transaction['id']) for transaction in transactions]
+
+    eq = (len(transactions) == 1268 and
+          keys == sorted(set(keys)) and
+          header == 'id,transaction_date,account_code,account_nature,transaction_type,amount' and
+          [int(line.split(',')[0]) for line in lines] == [transaction['id'] for transaction in transactions] and
+          export.headers['content-type'].startswith('text/csv'))
+    assert eq
+
+
+def test_transactions_filters(client: TestClient):
+    transactions = get_all_pages(client, '/transactions?month=2020-06-15&nature=expense&limit=7')
+    account_code = transactions[0]['account_code']
+    account_transactions = client.get(f'/transactions?account={account_code}&limit=1000').json()['transactions']
+
+    eq = (len(transactions) > 7 and
+          all(transaction['transaction_date'].startswith('2020-06-') for transaction in transactions) and
+          all(transaction['account_nature'] == 'expense' for transaction in transactions) and
+          all(transaction['account_code'] == account_code for transaction in account_transactions) and
+          len(account_transactions) > 0)
+    assert eq
+
+
+def test_transactions_cursor(client: TestClient):
+    first_page = client.get('/transactions?limit=5').json()
+    second_page = client.get(f'/transactions?limit=5&cursor={first_page["next_cursor"]}').json()
+    both_pages = client.get('/transactions?limit=10').json()
+
+    eq = (first_page['transactions'] + second_page['transactions'] == both_pages['transactions'] and
+          services.parse_transactions_cursor(first_page['next_cursor'])[1] == first_page['transactions'][-1]['id'] and
+          client.get('/transactions?cursor=2020-06-01').status_code == 422 and
+          client.get('/transactions?nature=assets').status_code == 422)
+    assert eq
+
+
+def test_transactions_last_page(client: TestClient):
+    transactions = get_all_pages(client, '/transactions?month=2020-06-15&limit=100')
+    # The last booking of the month ends the page without a cursor to an empty page
+    full_page = client.get(f'/transactions?month=2020-06-15&limit={len(transactions)}').json()
+
+    client.get('/transactions?format=csv')
+
+    eq = (full_page['transactions'] == transactions and
+          full_page['next_cursor'] is None and
+          not db.SQLEngine.default_store().in_use())
+    assert eq
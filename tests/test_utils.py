@@ -34,3 +34,23 @@ def test_get_month_name():
 
     eq = month_name == 'June'
     assert eq
+
+
+def test_get_month_key():
+    date_val = date(year=2020, month=6, day=15)
+    month_key = utils.get_month_key(date_val)
+
+    eq = month_key == 202006
+    assert eq
+
+
+def test_get_comparison_periods():
+    dt = date(year=2020, month=1, day=15)
+
+    eq = (utils.get_comparison_periods(dt, utils.ComparisonMode.PREVIOUS_MONTH) ==
+          (utils.DateRange(date(2020, 1, 1), date(2020, 1, 31)), utils.DateRange(date(2019, 12, 1), date(2019, 12, 31))) and
+          utils.get_comparison_periods(dt, utils.ComparisonMode.PREVIOUS_YEAR) ==
+          (utils.DateRange(date(2020, 1, 1), date(2020, 1, 31)), utils.DateRange(date(2019, 1, 1), date(2019, 1, 31))) and
+          utils.get_comparison_periods(dt, utils.ComparisonMode.TRAILING, 3) ==
+          (utils.DateRange(date(2019, 11, 1), date(2020, 1, 31)), utils.DateRange(date(2019, 8, 1), date(2019, 10, 31))))
+    assert eq